@@ -0,0 +1,54 @@
+"""
+Healthcare Intelligence Platform - API Dependencies
+Per-request resolution of the vector store collection
+"""
+
+from typing import Iterator, NamedTuple, Optional
+from fastapi import HTTPException, Query
+
+from vectorstore.collection_manager import CollectionManager
+from vectorstore.faiss_store import FAISSStore, RetiredStoreError
+
+collections = CollectionManager()
+
+
+def _pin_collection(name: Optional[str], create: bool) -> Iterator[FAISSStore]:
+    try:
+        store = collections.acquire(name, create=create)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Collection not found: {name}")
+    
+    try:
+        yield store
+    finally:
+        collections.release(name, store)
+
+
+def collection_store(
+    collection: Optional[str] = Query(None, description="Collection name (default collection if omitted)")
+) -> Iterator[FAISSStore]:
+    """The requested collection's store, kept loaded until the request finishes."""
+    yield from _pin_collection(collection, create=False)
+
+
+class PinnedCollection(NamedTuple):
+    """A collection's store pinned for the request, with the name it was resolved from."""
+    name: Optional[str]
+    store: FAISSStore
+
+
+def writable_collection(
+    collection: Optional[str] = Query(None, description="Collection name (created if missing)")
+) -> Iterator[PinnedCollection]:
+    """Like collection_store, creating the collection on first write; also gives its name."""
+    pinned = _pin_collection(collection, create=True)
+    store = next(pinned)
+    try:
+        yield PinnedCollection(collection, store)
+    except RetiredStoreError as e:
+        # The index version was switched while the request was writing
+        raise HTTPException(status_code=503, detail=str(e))
+    finally:
+        pinned.close()
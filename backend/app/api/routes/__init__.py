@@ -2,6 +2,6 @@
 Healthcare Intelligence Platform - API Routes Package
 """
 
-from . import documents, search, agents, analytics
+from . import documents, search, agents, analytics, index_versions
 
-__all__ = ["documents", "search", "agents", "analytics"]
+__all__ = ["documents", "search", "agents", "analytics", "index_versions"]
@@ -3,7 +3,7 @@ Healthcare Intelligence Platform - Document Routes
 Handles document upload, processing, and retrieval
 """
 
-from fastapi import APIRouter, UploadFile, File, HTTPException, BackgroundTasks
+from fastapi import APIRouter, UploadFile, File, HTTPException, BackgroundTasks, Depends, Query
 from fastapi.responses import JSONResponse
 from pydantic import BaseModel
 from typing import List, Optional
@@ -11,16 +11,16 @@ from datetime import datetime
 import uuid
 from loguru import logger
 
+from app.api.dependencies import PinnedCollection, collections, writable_collection
 from core.document_processor import DocumentProcessor
 from core.embeddings import EmbeddingService
-from vectorstore.faiss_store import FAISSStore
+from vectorstore.faiss_store import RetiredStoreError
 
 router = APIRouter()
 
 # Initialize services
 doc_processor = DocumentProcessor()
 embedding_service = EmbeddingService()
-vector_store = FAISSStore()
 
 
 class DocumentResponse(BaseModel):
@@ -46,7 +46,8 @@ documents_db = {}
 @router.post("/upload", response_model=DocumentResponse)
 async def upload_document(
     background_tasks: BackgroundTasks,
-    file: UploadFile = File(...)
+    file: UploadFile = File(...),
+    target: PinnedCollection = Depends(writable_collection)
 ):
     """
     Upload a clinical document for processing.
@@ -55,7 +56,12 @@ async def upload_document(
     - PDF files
     - Text files (.txt)
     - Word documents (.docx)
+    
+    With ?collection=name the document goes into that collection, which is
+    created on first upload.
     """
+    vector_store = target.store
+    
     # Validate file type
     allowed_types = [".pdf", ".txt", ".docx"]
     file_ext = "." + file.filename.split(".")[-1].lower() if "." in file.filename else ""
@@ -81,8 +87,8 @@ async def upload_document(
         chunks = doc_processor.chunk_text(text_content)
         logger.info(f"📝 Created {len(chunks)} chunks")
         
-        # Generate embeddings
-        embeddings = embedding_service.embed_texts(chunks)
+        # Generate embeddings (chunks already stored are not re-embedded)
+        embeddings = vector_store.embed_new_chunks(chunks, embedding_service.embed_texts)
         logger.info(f"🧠 Generated {len(embeddings)} embeddings")
         
         # Store in vector database
@@ -96,6 +102,7 @@ async def upload_document(
         # Store document metadata
         documents_db[doc_id] = {
             "id": doc_id,
+            "collection": target.name,
             "filename": file.filename,
             "status": "processed",
             "uploaded_at": datetime.now().isoformat(),
@@ -112,17 +119,23 @@ async def upload_document(
             message=f"Successfully processed {file.filename}"
         )
         
+    except RetiredStoreError:
+        raise  # answered with 503 by writable_collection
     except Exception as e:
         logger.error(f"❌ Error processing document: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error processing document: {str(e)}")
 
 
 @router.get("/", response_model=DocumentListResponse)
-async def list_documents():
+async def list_documents(collection: Optional[str] = Query(None, description="Only this collection")):
     """List all uploaded documents."""
+    documents = [
+        doc for doc in documents_db.values()
+        if collection is None or doc.get("collection") == collection
+    ]
     return DocumentListResponse(
-        total=len(documents_db),
-        documents=list(documents_db.values())
+        total=len(documents),
+        documents=documents
     )
 
 
@@ -135,13 +148,17 @@ async def get_document(doc_id: str):
 
 
 @router.delete("/{doc_id}")
-async def delete_document(doc_id: str):
-    """Delete a document by ID."""
+def delete_document(doc_id: str):
+    """Delete a document by ID (from the collection it was uploaded to)."""
     if doc_id not in documents_db:
         raise HTTPException(status_code=404, detail="Document not found")
     
     # Remove from vector store
-    vector_store.delete_document(doc_id)
+    try:
+        with collections.use(documents_db[doc_id].get("collection")) as vector_store:
+            vector_store.delete_document(doc_id)
+    except RetiredStoreError as e:
+        raise HTTPException(status_code=503, detail=str(e))
     
     # Remove from memory
     del documents_db[doc_id]
@@ -150,17 +167,18 @@ async def delete_document(doc_id: str):
 
 
 @router.post("/sample")
-async def load_sample_documents():
-    """Load sample clinical documents for testing."""
+async def load_sample_documents(target: PinnedCollection = Depends(writable_collection)):
+    """Load sample clinical documents for testing (into ?collection=name if given)."""
     from data.sample_documents import SAMPLE_DOCUMENTS
     
+    vector_store = target.store
     loaded = []
     for doc in SAMPLE_DOCUMENTS:
         doc_id = str(uuid.uuid4())
         
         # Process and store
         chunks = doc_processor.chunk_text(doc["content"])
-        embeddings = embedding_service.embed_texts(chunks)
+        embeddings = vector_store.embed_new_chunks(chunks, embedding_service.embed_texts)
         
         vector_store.add_documents(
             doc_id=doc_id,
@@ -171,6 +189,7 @@ async def load_sample_documents():
         
         documents_db[doc_id] = {
             "id": doc_id,
+            "collection": target.name,
             "filename": doc["title"],
             "status": "processed",
             "uploaded_at": datetime.now().isoformat(),
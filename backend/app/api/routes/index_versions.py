@@ -0,0 +1,78 @@
+"""
+Healthcare Intelligence Platform - Index Version Routes
+Lists, activates and rolls back versioned vector indexes
+"""
+
+import asyncio
+from fastapi import APIRouter, HTTPException
+from loguru import logger
+
+from app.config import get_settings
+from vectorstore.faiss_store import FAISSStore
+from vectorstore.versions import IndexVersions, StaleVersionError
+
+router = APIRouter()
+
+settings = get_settings()
+versions = IndexVersions(settings.faiss_index_path, keep=settings.index_versions_keep)
+
+
+def require_unsharded():
+    """Index versions cover the in-process store; shard workers keep their own directories."""
+    if settings.vector_shards:
+        raise HTTPException(status_code=400, detail="Index versions are not available with VECTOR_SHARDS set")
+
+
+@router.get("/versions")
+async def list_versions():
+    """List index versions (new ones are built offline with scripts.build_index_version)."""
+    return {
+        "current": versions.current(),
+        "previous": versions.previous(),
+        "versions": versions.list_versions()
+    }
+
+
+@router.post("/versions/{version}/activate")
+async def activate_version(version: str, force: bool = False):
+    """
+    Switch the API to another index version without downtime.
+    
+    The version is loaded and warmed next to the live index, then swapped
+    in atomically. Refused (409) if the live index changed after the version
+    was built from it, unless force is set.
+    """
+    require_unsharded()
+    try:
+        return await asyncio.to_thread(versions.activate, version, force)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Index version not found: {version}")
+    except StaleVersionError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"❌ Activating index version {version} failed: {e}")
+        raise HTTPException(status_code=500, detail=f"Activation error: {str(e)}")
+
+
+@router.post("/rollback")
+async def rollback_version():
+    """Switch back to the previously active index version."""
+    require_unsharded()
+    try:
+        return await asyncio.to_thread(versions.rollback)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"❌ Index rollback failed: {e}")
+        raise HTTPException(status_code=500, detail=f"Rollback error: {str(e)}")
+
+
+@router.post("/checkpoint")
+async def checkpoint_index():
+    """Checkpoint the live index, so a version built next includes every change so far."""
+    require_unsharded()
+    store = FAISSStore()
+    await asyncio.to_thread(store.checkpoint)
+    return {"version": versions.current(), "lsn": store.lsn}
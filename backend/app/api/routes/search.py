@@ -3,20 +3,33 @@ Healthcare Intelligence Platform - Search Routes
 Handles semantic search across clinical documents
 """
 
-from fastapi import APIRouter, HTTPException, Query
+import asyncio
+import time
+import numpy as np
+from fastapi import APIRouter, Depends, HTTPException, Query
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 from loguru import logger
 
+from app.api.dependencies import collection_store, collections
+from app.config import get_settings
 from core.embeddings import EmbeddingService
+from core.reranker import Reranker
 from vectorstore.faiss_store import FAISSStore
+from vectorstore.mmr import maximal_marginal_relevance
 from llm.rag_pipeline import RAGPipeline
 
 router = APIRouter()
 
+# semantic: dense vectors only; keyword: BM25 only (no embedding model);
+# hybrid: both, fused with reciprocal rank fusion; two_stage: dense vectors,
+# scoring only the chunks of the documents with the closest centroids
+SEARCH_MODES = ("semantic", "hybrid", "keyword", "two_stage")
+
 # Initialize services
+settings = get_settings()
 embedding_service = EmbeddingService()
-vector_store = FAISSStore()
+reranker = Reranker()
 rag_pipeline = RAGPipeline()
 
 
@@ -25,14 +38,25 @@ class SearchQuery(BaseModel):
     query: str
     top_k: int = 5
     use_rag: bool = True
+    mode: str = "semantic"
+    document_ids: Optional[List[str]] = None
+    metadata_filter: Optional[Dict[str, Any]] = None
+    candidate_documents: Optional[int] = None  # two_stage mode, defaults to TWO_STAGE_DOCUMENTS
+    rerank: Optional[bool] = None  # defaults to RERANK_ENABLED
+    rerank_candidates: Optional[int] = None
+    rerank_budget_ms: Optional[float] = None
+    mmr: Optional[bool] = None  # defaults to MMR_ENABLED
+    mmr_lambda: Optional[float] = None
 
 
 class SearchResult(BaseModel):
     """Individual search result."""
     chunk_id: str
     document_id: str
+    document_ids: List[str] = []
     content: str
     score: float
+    rerank_score: Optional[float] = None
     metadata: dict
 
 
@@ -43,29 +67,180 @@ class SearchResponse(BaseModel):
     total_results: int
     rag_summary: Optional[str] = None
     latency_ms: float
+    mode: str = "semantic"
+    retrieval_latency_ms: Optional[float] = None
+    reranked: bool = False
+    rerank_latency_ms: Optional[float] = None
+    rerank_skipped: Optional[str] = None
+    diversified: bool = False
 
 
-@router.post("/semantic", response_model=SearchResponse)
-async def semantic_search(search_query: SearchQuery):
+class BatchSearchQuery(BaseModel):
+    """Batch search model: many query strings sharing one set of options."""
+    queries: List[str]
+    top_k: int = 5
+    document_ids: Optional[List[str]] = None
+    metadata_filter: Optional[Dict[str, Any]] = None
+
+
+class BatchSearchItem(BaseModel):
+    """Results for one query of a batch."""
+    query: str
+    results: List[SearchResult]
+    total_results: int
+
+
+class BatchSearchResponse(BaseModel):
+    """Batch search response model."""
+    results: List[BatchSearchItem]
+    total_queries: int
+    latency_ms: float
+
+
+def diversify(results: List[Dict[str, Any]], top_k: int, lambda_mult: float, scaled: bool) -> List[Dict[str, Any]]:
     """
-    Perform semantic search across clinical documents.
+    Pick top_k results by Maximal Marginal Relevance over their stored vectors.
     
-    Uses sentence embeddings to find contextually similar content,
-    not just keyword matches.
+    Args:
+        results: Candidates, each with its "embedding"
+        top_k: Number of results to keep
+        lambda_mult: Trade-off between relevance (1.0) and diversity (0.0)
+        scaled: Relevance is rerank_score, or a score that is not a cosine
+            similarity (BM25, fused ranks); it is min-max scaled to [0, 1]
+            so it is comparable with the similarities between chunks
     """
-    import time
-    start_time = time.time()
+    vectors = np.stack([r["embedding"] for r in results])
+    relevance = np.array([r.get("rerank_score", r["score"]) for r in results], dtype=np.float32)
+    if scaled:
+        span = relevance.max() - relevance.min()
+        relevance = (relevance - relevance.min()) / span if span > 0 else np.ones_like(relevance)
+    order = maximal_marginal_relevance(None, vectors, top_k, lambda_mult, relevance=relevance)
+    return [results[i] for i in order]
+
+
+def retrieve(
+    search_query: SearchQuery,
+    vector_store: FAISSStore,
+    fetch_k: int,
+    rerank: bool,
+    mmr: bool,
+    mmr_lambda: float,
+    start_time: float
+):
+    """
+    Embed the query, search the store, and re-rank and diversify the results.
     
-    try:
-        logger.info(f"🔍 Semantic search: '{search_query.query}'")
-        
+    Blocking (model and index calls), so handlers run it on a worker thread.
+    
+    Returns:
+        (results, rerank info, retrieval latency in ms)
+    """
+    if search_query.mode == "semantic":
         # Generate query embedding
         query_embedding = embedding_service.embed_query(search_query.query)
         
         # Search vector store
         results = vector_store.search(
             query_embedding=query_embedding,
-            top_k=search_query.top_k
+            top_k=fetch_k,
+            doc_filter=search_query.document_ids,
+            metadata_filter=search_query.metadata_filter,
+            with_vectors=mmr
+        )
+    elif search_query.mode == "two_stage":
+        query_embedding = embedding_service.embed_query(search_query.query)
+        results = vector_store.search_two_stage(
+            query_embedding=query_embedding,
+            top_k=fetch_k,
+            n_documents=search_query.candidate_documents,
+            doc_filter=search_query.document_ids,
+            metadata_filter=search_query.metadata_filter,
+            with_vectors=mmr
+        )
+    else:
+        query_embedding = (
+            embedding_service.embed_query(search_query.query)
+            if search_query.mode == "hybrid" else None
+        )
+        results = vector_store.search_hybrid(
+            query=search_query.query,
+            query_embedding=query_embedding,
+            top_k=fetch_k,
+            doc_filter=search_query.document_ids,
+            metadata_filter=search_query.metadata_filter,
+            with_vectors=mmr
+        )
+    retrieval_latency = (time.time() - start_time) * 1000
+    
+    # Optional second stage: cross-encoder over the over-fetched candidates
+    rerank_info = {"reranked": False, "latency_ms": None, "skipped": None}
+    if rerank:
+        results, rerank_info = reranker.rerank(
+            search_query.query,
+            results,
+            # MMR picks from the whole re-ordered list
+            top_k=len(results) if mmr else search_query.top_k,
+            budget_ms=search_query.rerank_budget_ms or settings.rerank_budget_ms
+        )
+        if rerank_info["skipped"]:
+            logger.info(f"⏭️ Re-ranking skipped: {rerank_info['skipped']}")
+    
+    # Optional diversification over the stored vectors of the candidates
+    if mmr and results:
+        scaled = rerank_info["reranked"] or search_query.mode in ("hybrid", "keyword")
+        results = diversify(results, search_query.top_k, mmr_lambda, scaled)
+    
+    return results, rerank_info, retrieval_latency
+
+
+@router.post("/semantic", response_model=SearchResponse)
+async def semantic_search(
+    search_query: SearchQuery,
+    vector_store: FAISSStore = Depends(collection_store)
+):
+    """
+    Perform semantic search across clinical documents.
+    
+    Uses sentence embeddings to find contextually similar content,
+    not just keyword matches. In hybrid mode exact terms (drug names,
+    ICD codes, lab abbreviations) are also matched lexically with BM25;
+    keyword mode uses BM25 alone and skips the embedding model.
+    two_stage mode picks candidate_documents documents by centroid first
+    and scores only their chunks, which stays fast on large corpora.
+    
+    With rerank enabled, rerank_candidates results are retrieved and
+    re-ordered by a cross-encoder, unless that is predicted to take
+    longer than rerank_budget_ms.
+    
+    With mmr enabled, top_k results are picked among MMR_CANDIDATES by
+    Maximal Marginal Relevance, so overlapping neighbouring chunks do not
+    crowd out other content (mmr_lambda 1.0 ranks by relevance only).
+    """
+    start_time = time.time()
+    
+    if search_query.mode not in SEARCH_MODES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown search mode: {search_query.mode}. Supported: {', '.join(SEARCH_MODES)}"
+        )
+    
+    rerank = search_query.rerank if search_query.rerank is not None else settings.rerank_enabled
+    mmr = search_query.mmr if search_query.mmr is not None else settings.mmr_enabled
+    mmr_lambda = search_query.mmr_lambda if search_query.mmr_lambda is not None else settings.mmr_lambda
+    if not 0.0 <= mmr_lambda <= 1.0:
+        raise HTTPException(status_code=400, detail="mmr_lambda must be between 0 and 1")
+    fetch_k = search_query.top_k
+    if rerank:
+        fetch_k = max(fetch_k, search_query.rerank_candidates or settings.rerank_candidates)
+    if mmr:
+        fetch_k = max(fetch_k, settings.mmr_candidates)
+    
+    try:
+        logger.info(f"🔍 {search_query.mode.capitalize()} search: '{search_query.query}'")
+        
+        # The model and index calls block, so they run on a worker thread
+        results, rerank_info, retrieval_latency = await asyncio.to_thread(
+            retrieve, search_query, vector_store, fetch_k, rerank, mmr, mmr_lambda, start_time
         )
         
         # Format results
@@ -73,8 +248,10 @@ async def semantic_search(search_query: SearchQuery):
             SearchResult(
                 chunk_id=r["chunk_id"],
                 document_id=r["document_id"],
+                document_ids=r.get("document_ids", [r["document_id"]]),
                 content=r["content"],
                 score=r["score"],
+                rerank_score=r.get("rerank_score"),
                 metadata=r.get("metadata", {})
             )
             for r in results
@@ -97,7 +274,13 @@ async def semantic_search(search_query: SearchQuery):
             results=search_results,
             total_results=len(search_results),
             rag_summary=rag_summary,
-            latency_ms=round(latency, 2)
+            latency_ms=round(latency, 2),
+            mode=search_query.mode,
+            retrieval_latency_ms=round(retrieval_latency, 2),
+            reranked=rerank_info["reranked"],
+            rerank_latency_ms=rerank_info["latency_ms"],
+            rerank_skipped=rerank_info["skipped"],
+            diversified=bool(mmr and results)
         )
         
     except Exception as e:
@@ -105,10 +288,71 @@ async def semantic_search(search_query: SearchQuery):
         raise HTTPException(status_code=500, detail=f"Search error: {str(e)}")
 
 
+@router.post("/batch", response_model=BatchSearchResponse)
+def batch_search(
+    batch_query: BatchSearchQuery,
+    vector_store: FAISSStore = Depends(collection_store)
+):
+    """
+    Semantic search for many queries in one request.
+    
+    All queries are embedded in a single model call and searched with a
+    single index call. No RAG summary is generated per query.
+    """
+    start_time = time.time()
+    
+    if not batch_query.queries:
+        raise HTTPException(status_code=400, detail="No queries provided")
+    
+    try:
+        logger.info(f"🔍 Batch search: {len(batch_query.queries)} queries")
+        
+        query_embeddings = embedding_service.embed_texts(batch_query.queries)
+        batch_results = vector_store.search_batch(
+            queries=query_embeddings,
+            top_k=batch_query.top_k,
+            doc_filter=batch_query.document_ids,
+            metadata_filter=batch_query.metadata_filter
+        )
+        
+        items = [
+            BatchSearchItem(
+                query=query,
+                results=[
+                    SearchResult(
+                        chunk_id=r["chunk_id"],
+                        document_id=r["document_id"],
+                        document_ids=r.get("document_ids", [r["document_id"]]),
+                        content=r["content"],
+                        score=r["score"],
+                        metadata=r.get("metadata", {})
+                    )
+                    for r in results
+                ],
+                total_results=len(results)
+            )
+            for query, results in zip(batch_query.queries, batch_results)
+        ]
+        
+        latency = (time.time() - start_time) * 1000
+        logger.info(f"✅ Batch search completed in {latency:.2f}ms")
+        
+        return BatchSearchResponse(
+            results=items,
+            total_queries=len(items),
+            latency_ms=round(latency, 2)
+        )
+        
+    except Exception as e:
+        logger.error(f"❌ Batch search error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Search error: {str(e)}")
+
+
 @router.get("/quick")
-async def quick_search(
+def quick_search(
     q: str = Query(..., description="Search query"),
-    limit: int = Query(5, ge=1, le=20, description="Number of results")
+    limit: int = Query(5, ge=1, le=20, description="Number of results"),
+    vector_store: FAISSStore = Depends(collection_store)
 ):
     """Quick search endpoint for autocomplete and suggestions."""
     try:
@@ -130,12 +374,24 @@ async def quick_search(
 
 
 @router.get("/stats")
-async def search_stats():
+async def search_stats(vector_store: FAISSStore = Depends(collection_store)):
     """Get search and vector store statistics."""
     stats = vector_store.get_stats()
     return {
         "total_documents": stats.get("total_documents", 0),
         "total_chunks": stats.get("total_chunks", 0),
         "index_size_mb": stats.get("index_size_mb", 0),
-        "embedding_dimension": 768
+        "embedding_dimension": 768,
+        "tiers": stats.get("tiers"),
+        "embedding_cache": embedding_service.cache_stats(),
+        "query_cache": embedding_service.query_cache_stats()
+    }
+
+
+@router.get("/collections")
+async def list_collections():
+    """List collections on disk and whether each is currently loaded."""
+    return {
+        "collections": collections.list_collections(),
+        "loaded": collections.loaded_count()
     }
@@ -41,6 +41,21 @@ class Settings(BaseSettings):
         default="pritamdeka/S-PubMedBert-MS-MARCO",
         validation_alias="EMBEDDING_MODEL"
     )
+    # Inference backend: torch (sentence-transformers) | onnx (ONNX Runtime, exported on first use)
+    embedding_backend: str = Field(default="torch", validation_alias="EMBEDDING_BACKEND")
+    embedding_onnx_path: str = Field(default="./data/onnx", validation_alias="EMBEDDING_ONNX_PATH")
+    embedding_onnx_quantize: bool = Field(default=True, validation_alias="EMBEDDING_ONNX_QUANTIZE")
+    embedding_onnx_threads: int = Field(default=0, validation_alias="EMBEDDING_ONNX_THREADS")
+    # Persistent embedding cache keyed by (model, text hash); least recently used entries evicted
+    embedding_cache_enabled: bool = Field(default=True, validation_alias="EMBEDDING_CACHE_ENABLED")
+    embedding_cache_path: str = Field(default="./data/embedding_cache", validation_alias="EMBEDDING_CACHE_PATH")
+    embedding_cache_max_mb: float = Field(default=512.0, validation_alias="EMBEDDING_CACHE_MAX_MB")
+    # Model batches: texts sorted by token length, up to this many padded tokens / texts per batch
+    embedding_batch_tokens: int = Field(default=8192, validation_alias="EMBEDDING_BATCH_TOKENS")
+    embedding_max_batch: int = Field(default=128, validation_alias="EMBEDDING_MAX_BATCH")
+    # In-memory LRU of query embeddings (0 = disabled); entries expire after the TTL
+    query_cache_size: int = Field(default=1024, validation_alias="QUERY_CACHE_SIZE")
+    query_cache_ttl_seconds: float = Field(default=600.0, validation_alias="QUERY_CACHE_TTL_SECONDS")
     
     # Vector Store Paths
     faiss_index_path: str = Field(
@@ -51,6 +66,91 @@ class Settings(BaseSettings):
         default="./data/metadata.db",
         validation_alias="METADATA_DB_PATH"
     )
+    startup_warmup: bool = Field(default=True, validation_alias="STARTUP_WARMUP")
+    # Index versions (FAISS_INDEX_PATH/versions/*) kept on disk besides current and previous
+    index_versions_keep: int = Field(default=3, validation_alias="INDEX_VERSIONS_KEEP")
+    
+    # Collections: one directory each, opened on first use and closed when idle
+    collections_path: str = Field(
+        default="./data/collections",
+        validation_alias="COLLECTIONS_PATH"
+    )
+    collection_idle_seconds: float = Field(default=600.0, validation_alias="COLLECTION_IDLE_SECONDS")
+    collections_max_loaded: int = Field(default=8, validation_alias="COLLECTIONS_MAX_LOADED")
+
+    # Sharding: documents hash-partitioned across this many worker processes (0 = in-process store)
+    vector_shards: int = Field(default=0, validation_alias="VECTOR_SHARDS")
+    vector_shards_path: str = Field(default="./data/shards", validation_alias="VECTOR_SHARDS_PATH")
+    vector_shard_start_timeout: float = Field(default=300.0, validation_alias="VECTOR_SHARD_START_TIMEOUT")
+
+    # Vector Index (flat | ivf_flat | ivf_pq | hnsw)
+    faiss_index_type: str = Field(default="flat", validation_alias="FAISS_INDEX_TYPE")
+    faiss_ann_threshold: int = Field(
+        default=100_000,
+        validation_alias="FAISS_ANN_THRESHOLD"
+    )
+    faiss_train_sample_size: int = Field(
+        default=100_000,
+        validation_alias="FAISS_TRAIN_SAMPLE_SIZE"
+    )
+    faiss_retrain_factor: float = Field(default=4.0, validation_alias="FAISS_RETRAIN_FACTOR")
+    faiss_nlist: int = Field(default=4096, validation_alias="FAISS_NLIST")
+    faiss_nprobe: int = Field(default=32, validation_alias="FAISS_NPROBE")
+    faiss_pq_m: int = Field(default=64, validation_alias="FAISS_PQ_M")
+    faiss_pq_nbits: int = Field(default=8, validation_alias="FAISS_PQ_NBITS")
+    faiss_hnsw_m: int = Field(default=32, validation_alias="FAISS_HNSW_M")
+    faiss_ef_construction: int = Field(default=200, validation_alias="FAISS_EF_CONSTRUCTION")
+    faiss_ef_search: int = Field(default=128, validation_alias="FAISS_EF_SEARCH")
+    faiss_vector_storage: str = Field(
+        default="float32",
+        validation_alias="FAISS_VECTOR_STORAGE"
+    )
+    faiss_rescore: bool = Field(default=False, validation_alias="FAISS_RESCORE")
+    faiss_rescore_factor: int = Field(default=4, validation_alias="FAISS_RESCORE_FACTOR")
+    faiss_compaction_ratio: float = Field(
+        default=0.2,
+        validation_alias="FAISS_COMPACTION_RATIO"
+    )
+    faiss_prefilter_exact_max: int = Field(
+        default=50_000,
+        validation_alias="FAISS_PREFILTER_EXACT_MAX"
+    )
+    faiss_dedup: bool = Field(default=True, validation_alias="FAISS_DEDUP")
+    faiss_wal_fsync: bool = Field(default=True, validation_alias="FAISS_WAL_FSYNC")
+    faiss_wal_checkpoint_mb: int = Field(
+        default=256,
+        validation_alias="FAISS_WAL_CHECKPOINT_MB"
+    )
+    
+    # Storage tiers: the in-memory index is kept under the budget (0 = unlimited)
+    # by moving least recently used documents to memory-mapped cold shards
+    faiss_memory_budget_mb: float = Field(default=0.0, validation_alias="FAISS_MEMORY_BUDGET_MB")
+    faiss_promote_hits: int = Field(default=3, validation_alias="FAISS_PROMOTE_HITS")
+    faiss_cold_max_shards: int = Field(default=16, validation_alias="FAISS_COLD_MAX_SHARDS")
+    faiss_cold_search_threads: int = Field(default=4, validation_alias="FAISS_COLD_SEARCH_THREADS")
+    
+    # Lexical / hybrid search
+    bm25_k1: float = Field(default=1.2, validation_alias="BM25_K1")
+    bm25_b: float = Field(default=0.75, validation_alias="BM25_B")
+    hybrid_rrf_k: int = Field(default=60, validation_alias="HYBRID_RRF_K")
+    hybrid_candidates: int = Field(default=50, validation_alias="HYBRID_CANDIDATES")
+    
+    # Two-stage search: documents picked by the centroid index before chunk scoring
+    two_stage_documents: int = Field(default=32, validation_alias="TWO_STAGE_DOCUMENTS")
+    
+    # Cross-encoder re-ranking
+    rerank_enabled: bool = Field(default=False, validation_alias="RERANK_ENABLED")
+    reranker_model: str = Field(
+        default="cross-encoder/ms-marco-MiniLM-L-6-v2",
+        validation_alias="RERANKER_MODEL"
+    )
+    rerank_candidates: int = Field(default=50, validation_alias="RERANK_CANDIDATES")
+    rerank_budget_ms: float = Field(default=200.0, validation_alias="RERANK_BUDGET_MS")
+    
+    # Maximal Marginal Relevance: diversify results among MMR_CANDIDATES retrieved chunks
+    mmr_enabled: bool = Field(default=False, validation_alias="MMR_ENABLED")
+    mmr_lambda: float = Field(default=0.5, validation_alias="MMR_LAMBDA")
+    mmr_candidates: int = Field(default=20, validation_alias="MMR_CANDIDATES")
     
     # API Configuration
     api_host: str = Field(default="0.0.0.0", validation_alias="API_HOST")
@@ -2,14 +2,23 @@
 Healthcare Intelligence Platform - FastAPI Main Application
 """
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from fastapi.staticfiles import StaticFiles
 from loguru import logger
+import asyncio
 import sys
+import time
 
 from .config import get_settings
-from .api.routes import documents, search, agents, analytics
+from .api.routes import documents, search, agents, analytics, index_versions
+from core.embeddings import EmbeddingService
+from core.reranker import Reranker
+from vectorstore.faiss_store import FAISSStore
+from vectorstore.collection_manager import CollectionManager
+from vectorstore.sharding import ShardedStore, default_store
+from vectorstore.versions import IndexVersions
 
 # Configure logging
 logger.remove()
@@ -47,11 +56,30 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Set once the vector store is restored and warm; API traffic is held until then
+app.state.ready = False
+app.state.startup_error = None
+app.state.startup_task = None
+
+
+@app.middleware("http")
+async def require_ready(request: Request, call_next):
+    """Answer API requests with 503 until startup loading and warmup finish."""
+    if request.url.path.startswith("/api") and not app.state.ready:
+        return JSONResponse(
+            status_code=503,
+            content={"detail": "Service is starting up, please retry shortly"},
+            headers={"Retry-After": "5"}
+        )
+    return await call_next(request)
+
+
 # Include routers
 app.include_router(documents.router, prefix="/api/documents", tags=["Documents"])
 app.include_router(search.router, prefix="/api/search", tags=["Search"])
 app.include_router(agents.router, prefix="/api/agents", tags=["Agents"])
 app.include_router(analytics.router, prefix="/api/analytics", tags=["Analytics"])
+app.include_router(index_versions.router, prefix="/api/index", tags=["Index"])
 
 
 @app.on_event("startup")
@@ -61,11 +89,49 @@ async def startup_event():
     logger.info(f"📊 Using embedding model: {settings.embedding_model}")
     logger.info(f"🤖 Using LLM: {settings.groq_model}")
     
+    # Load in the background so health checks are answered while the index restores
+    app.state.startup_task = asyncio.create_task(prepare_services())
+
+
+async def prepare_services():
+    """Restore the persisted vector store, warm the models and index, then mark ready."""
+    start = time.perf_counter()
+    try:
+        await asyncio.to_thread(load_and_warm)
+        app.state.ready = True
+        logger.info(f"✅ Ready to serve traffic ({time.perf_counter() - start:.1f}s)")
+    except Exception as e:
+        app.state.startup_error = str(e)
+        logger.error(f"Startup failed, API stays unavailable: {e}")
+
+
+def load_and_warm():
+    """Blocking part of startup (runs in a worker thread)."""
+    if settings.vector_shards:
+        # Shard workers restore their own directories (started here if not running yet)
+        store = ShardedStore()
+        store.start()
+    else:
+        store = FAISSStore()
+        store.open(str(IndexVersions(settings.faiss_index_path).current_path()))
+    
+    if settings.startup_warmup:
+        EmbeddingService().warmup()
+        if settings.rerank_enabled:
+            Reranker().warmup()
+        store.warmup()
+
 
 @app.on_event("shutdown")
 async def shutdown_event():
-    """Cleanup on shutdown."""
+    """Checkpoint the vector store on shutdown."""
     logger.info("👋 Shutting down Healthcare Intelligence Platform")
+    
+    # Never checkpoint a store that is still being restored
+    if app.state.startup_task is not None:
+        await app.state.startup_task
+    await asyncio.to_thread(default_store().close)
+    await asyncio.to_thread(CollectionManager().close)
 
 
 @app.get("/", tags=["Health"])
@@ -82,12 +148,29 @@ async def root():
 @app.get("/health", tags=["Health"])
 async def health_check():
     """Detailed health check."""
+    if app.state.ready:
+        vectorstore = "operational"
+    else:
+        vectorstore = "failed" if app.state.startup_error else "loading"
+    
     return {
         "status": "healthy",
+        "ready": app.state.ready,
         "components": {
             "api": "operational",
             "llm": "operational",
-            "vectorstore": "operational",
+            "vectorstore": vectorstore,
             "agents": "operational"
         }
     }
+
+
+@app.get("/ready", tags=["Health"])
+async def readiness_check():
+    """Readiness probe: 503 until the vector store is loaded and warmed up."""
+    if not app.state.ready:
+        return JSONResponse(
+            status_code=503,
+            content={"ready": False, "error": app.state.startup_error}
+        )
+    return {"ready": True}
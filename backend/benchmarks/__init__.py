@@ -0,0 +1,4 @@
+"""
+Healthcare Intelligence Platform - Benchmarks Package
+Offline tools for measuring vector store trade-offs (run with `python -m benchmarks.<tool>`)
+"""
@@ -0,0 +1,226 @@
+"""
+Healthcare Intelligence Platform - Concurrency Stress Test
+Interleaves ingestion, deletion, compaction and search on one FAISSStore
+
+Every document is written as a block of chunks; readers check that a
+document is always returned whole or not at all, that each hit's text
+belongs to its chunk id, that documents deleted before a search started
+never come back, and that nothing raises. Search latency is reported for
+an idle store and under concurrent writes.
+
+Usage (from backend/):
+    python -m benchmarks.concurrency_stress
+    python -m benchmarks.concurrency_stress --index-type hnsw --seconds 30
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import numpy as np
+from typing import List, Set
+
+
+CHUNKS_PER_DOC = 8
+
+
+def doc_vectors(doc: int, dimension: int) -> np.ndarray:
+    """Deterministic, normalized chunk vectors clustered around a per-document centre."""
+    rng = np.random.default_rng(doc)
+    centre = rng.standard_normal(dimension).astype(np.float32)
+    vectors = centre + 0.3 * rng.standard_normal((CHUNKS_PER_DOC, dimension)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def chunk_text(doc: int, i: int) -> str:
+    return f"doc-{doc} chunk {i}"
+
+
+class StressRun:
+    """Shared state for one stress run: the store, live documents and findings."""
+    
+    def __init__(self, store, dimension: int, seconds: float):
+        self.store = store
+        self.dimension = dimension
+        self.deadline = time.time() + seconds
+        self.next_doc = 0
+        self.live: List[int] = []
+        self.deleted: Set[int] = set()
+        self.state_lock = threading.Lock()
+        self.violations: List[str] = []
+        self.errors: List[str] = []
+        self.latencies: List[float] = []
+        self.writes = 0
+    
+    def running(self) -> bool:
+        return time.time() < self.deadline and not self.errors
+    
+    def fail(self, message: str):
+        with self.state_lock:
+            if len(self.violations) < 20:
+                self.violations.append(message)
+    
+    def writer(self, delete_every: int):
+        while self.running():
+            with self.state_lock:
+                doc = self.next_doc
+                self.next_doc += 1
+            try:
+                self.store.add_documents(
+                    f"doc-{doc}",
+                    [chunk_text(doc, i) for i in range(CHUNKS_PER_DOC)],
+                    doc_vectors(doc, self.dimension),
+                    {"parity": doc % 2}
+                )
+                with self.state_lock:
+                    self.live.append(doc)
+                    self.writes += 1
+                    victim = None
+                    if delete_every and doc % delete_every == 0 and len(self.live) > 10:
+                        victim = self.live.pop(random.randrange(len(self.live)))
+                if victim is not None:
+                    self.store.delete_document(f"doc-{victim}")
+                    with self.state_lock:
+                        self.deleted.add(victim)
+            except Exception as e:
+                self.errors.append(f"writer: {e!r}")
+    
+    def reader(self):
+        while self.running():
+            with self.state_lock:
+                doc = random.choice(self.live) if self.live else None
+                # Also probe documents that are being written right now
+                fresh = self.next_doc - 1
+            if doc is None:
+                continue
+            try:
+                for probe in (doc, fresh):
+                    if probe < 0:
+                        continue
+                    self.check_filtered(probe)
+                self.check_unfiltered(doc)
+            except Exception as e:
+                self.errors.append(f"reader: {e!r}")
+    
+    def check_filtered(self, doc: int):
+        query = doc_vectors(doc, self.dimension)[0]
+        gone = self.deleted_so_far()
+        start = time.perf_counter()
+        results = self.store.search(query, top_k=CHUNKS_PER_DOC, doc_filter=[f"doc-{doc}"])
+        self.latencies.append(time.perf_counter() - start)
+        
+        if len(results) not in (0, CHUNKS_PER_DOC):
+            self.fail(f"doc-{doc}: partial document visible ({len(results)}/{CHUNKS_PER_DOC} chunks)")
+        self.check_hits(results, gone)
+    
+    def check_unfiltered(self, doc: int):
+        queries = doc_vectors(doc, self.dimension)[:2]
+        gone = self.deleted_so_far()
+        start = time.perf_counter()
+        batches = self.store.search_batch(queries, top_k=5)
+        self.latencies.append((time.perf_counter() - start) / len(queries))
+        for results in batches:
+            self.check_hits(results, gone)
+    
+    def deleted_so_far(self) -> Set[int]:
+        with self.state_lock:
+            return set(self.deleted)
+    
+    def check_hits(self, results, gone: Set[int]):
+        for r in results:
+            doc = int(r["document_id"].split("-")[1])
+            i = r["metadata"]["chunk_index"]
+            if doc in gone:
+                self.fail(f"hit {r['chunk_id']} belongs to a deleted document")
+            if r["content"] != chunk_text(doc, i) or r["chunk_id"] != f"doc-{doc}_{i}":
+                self.fail(f"hit {r['chunk_id']} carries text {r['content']!r}")
+
+
+def percentiles(latencies: List[float]) -> str:
+    if not latencies:
+        return "no searches"
+    ms = np.array(latencies) * 1000
+    return (f"{len(ms)} searches, p50 {np.percentile(ms, 50):.2f}ms, "
+            f"p99 {np.percentile(ms, 99):.2f}ms, max {ms.max():.2f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--index-type", default="flat")
+    parser.add_argument("--vector-storage", default="float32")
+    parser.add_argument("--rescore", action="store_true")
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--preload", type=int, default=500, help="Documents ingested before the run")
+    parser.add_argument("--delete-every", type=int, default=5, help="Delete a random document every N adds (0: never)")
+    parser.add_argument("--compaction-ratio", type=float, default=0.05)
+    parser.add_argument("--ann-threshold", type=int, default=2000)
+    args = parser.parse_args()
+    
+    # Settings are read once, so configure the store before importing it
+    os.environ["FAISS_INDEX_TYPE"] = args.index_type
+    os.environ["FAISS_VECTOR_STORAGE"] = args.vector_storage
+    os.environ["FAISS_RESCORE"] = str(args.rescore).lower()
+    os.environ["FAISS_COMPACTION_RATIO"] = str(args.compaction_ratio)
+    os.environ["FAISS_ANN_THRESHOLD"] = str(args.ann_threshold)
+    os.environ.setdefault("FAISS_NLIST", "64")
+    os.environ.setdefault("METADATA_DB_PATH", os.path.join(tempfile.mkdtemp(), "metadata.db"))
+    
+    from loguru import logger
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+    from vectorstore.faiss_store import FAISSStore
+    
+    store = FAISSStore()
+    dimension = store._dimension
+    run = StressRun(store, dimension, seconds=0)
+    for doc in range(args.preload):
+        store.add_documents(
+            f"doc-{doc}",
+            [chunk_text(doc, i) for i in range(CHUNKS_PER_DOC)],
+            doc_vectors(doc, dimension),
+            {"parity": doc % 2}
+        )
+        run.live.append(doc)
+    run.next_doc = args.preload
+    
+    # Baseline: readers only
+    run.deadline = time.time() + min(args.seconds / 3, 5)
+    readers = [threading.Thread(target=run.reader) for _ in range(args.readers)]
+    for t in readers:
+        t.start()
+    for t in readers:
+        t.join()
+    idle = percentiles(run.latencies)
+    
+    # Interleaved: readers and writers (deletes trigger background compaction)
+    run.latencies = []
+    run.deadline = time.time() + args.seconds
+    threads = [threading.Thread(target=run.writer, args=(args.delete_every,)) for _ in range(args.writers)]
+    threads += [threading.Thread(target=run.reader) for _ in range(args.readers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    
+    stats = store.get_stats()
+    print(f"\nConcurrency stress: {args.index_type}/{args.vector_storage}, "
+          f"{args.writers} writers, {args.readers} readers, {args.seconds:.0f}s")
+    print(f"  idle store:        {idle}")
+    print(f"  during ingestion:  {percentiles(run.latencies)}")
+    print(f"  documents written: {run.writes}, final index: {stats['index_type']}, "
+          f"{stats['total_documents']} documents, {stats['deleted_chunks']} tombstones")
+    
+    for message in run.errors + run.violations:
+        print(f"  FAIL {message}")
+    if run.errors or run.violations:
+        sys.exit(1)
+    print("  OK: no partial documents, deleted or mismatched hits, or errors")
+
+
+if __name__ == "__main__":
+    main()
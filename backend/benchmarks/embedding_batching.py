@@ -0,0 +1,109 @@
+"""
+Healthcare Intelligence Platform - Embedding Batching Benchmark
+Fixed-size batches in arrival order vs. length-bucketed token-budget batches
+
+Embeds the same mixed-length clinical chunks (sample documents chunked at
+several sizes, plus single sentences, shuffled) both ways on CPU and
+reports throughput, padding overhead (padded tokens per real token) and
+the largest cosine deviation between the two outputs. The embedding cache
+is disabled so every text runs through the model. Needs
+sentence-transformers and the embedding model.
+
+Usage (from backend/):
+    python -m benchmarks.embedding_batching
+    python -m benchmarks.embedding_batching --texts 4000 --batch-tokens 16384
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+import numpy as np
+from typing import List
+
+
+def clinical_chunks(n: int, seed: int) -> List[str]:
+    """Mixed-length chunks of the sample documents: sentences up to 2000-character chunks."""
+    from core.chunker import DocumentChunker
+    from data.sample_documents import SAMPLE_DOCUMENTS
+    
+    chunker = DocumentChunker()
+    pool = []
+    for doc in SAMPLE_DOCUMENTS:
+        text = doc["content"].strip()
+        for size in (200, 500, 1000, 2000):
+            pool.extend(chunker.chunk(text, chunk_size=size, chunk_overlap=size // 10))
+        pool.extend(s.strip() for s in text.split(".") if len(s.strip()) > 20)
+    
+    rng = random.Random(seed)
+    return [rng.choice(pool) for _ in range(n)]
+
+
+def padded_tokens(lengths: np.ndarray, batches: List[np.ndarray]) -> int:
+    return int(sum(lengths[batch].max() * len(batch) for batch in batches))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--texts", type=int, default=2000)
+    parser.add_argument("--fixed-batch", type=int, default=32, help="Batch size of the arrival-order baseline")
+    parser.add_argument("--batch-tokens", type=int, default=None, help="EMBEDDING_BATCH_TOKENS")
+    parser.add_argument("--max-batch", type=int, default=None, help="EMBEDDING_MAX_BATCH")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    
+    os.environ["EMBEDDING_CACHE_ENABLED"] = "false"
+    if args.batch_tokens:
+        os.environ["EMBEDDING_BATCH_TOKENS"] = str(args.batch_tokens)
+    if args.max_batch:
+        os.environ["EMBEDDING_MAX_BATCH"] = str(args.max_batch)
+    
+    from core.embeddings import EmbeddingService, length_bucketed_batches
+    
+    service = EmbeddingService()
+    service.warmup()
+    if service._model is None:
+        print("The embedding model could not be loaded (is sentence-transformers installed?)")
+        return 1
+    model = service._model
+    
+    texts = clinical_chunks(args.texts, args.seed)
+    lengths = service._token_lengths(texts)
+    print(f"{len(texts)} chunks, {lengths.sum():,} tokens "
+          f"(min {lengths.min()}, median {int(np.median(lengths))}, max {lengths.max()})")
+    
+    start = time.perf_counter()
+    fixed = np.vstack([
+        model.encode(
+            texts[i:i + args.fixed_batch],
+            batch_size=args.fixed_batch,
+            show_progress_bar=False,
+            convert_to_numpy=True,
+            normalize_embeddings=True
+        )
+        for i in range(0, len(texts), args.fixed_batch)
+    ])
+    fixed_seconds = time.perf_counter() - start
+    fixed_batches = [np.arange(i, min(i + args.fixed_batch, len(texts))) for i in range(0, len(texts), args.fixed_batch)]
+    
+    start = time.perf_counter()
+    bucketed = service._encode(texts)
+    bucketed_seconds = time.perf_counter() - start
+    bucketed_batches = length_bucketed_batches(lengths, service._batch_tokens, service._max_batch)
+    
+    deviation = float(1 - (fixed * bucketed).sum(axis=1).min())
+    print(f"\nEmbedding batching on CPU: {len(texts)} mixed-length chunks\n")
+    print(f"{'batching':<34}{'batches':>9}{'texts/s':>10}{'pad ratio':>11}")
+    for name, batches, seconds in (
+        (f"fixed {args.fixed_batch}, arrival order", fixed_batches, fixed_seconds),
+        (f"bucketed {service._batch_tokens} tokens", bucketed_batches, bucketed_seconds)
+    ):
+        print(f"{name:<34}{len(batches):>9}{len(texts) / seconds:>10.1f}"
+              f"{padded_tokens(lengths, batches) / lengths.sum():>11.2f}")
+    print(f"\nspeedup {fixed_seconds / bucketed_seconds:.2f}x, max cosine deviation {deviation:.2e}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,90 @@
+"""
+Healthcare Intelligence Platform - ONNX Parity Check
+Cosine deviation and speed of the ONNX embedding backend against PyTorch
+
+Embeds mixed-length clinical chunks with the sentence-transformers model
+(torch) and its ONNX export (int8 unless --fp32), then reports the cosine
+deviation per text, the overlap of each chunk's top-10 neighbours under
+both backends, and throughput on CPU. Exits with 1 if any text deviates
+by more than --max-deviation, so it can gate switching EMBEDDING_BACKEND.
+Needs torch, sentence-transformers and onnxruntime.
+
+Usage (from backend/):
+    python -m benchmarks.onnx_parity
+    python -m benchmarks.onnx_parity --fp32 --max-deviation 0.0001
+    python -m benchmarks.onnx_parity --threads 4 --texts 2000
+"""
+
+import argparse
+import sys
+import time
+import numpy as np
+
+from app.config import get_settings
+from benchmarks.embedding_batching import clinical_chunks
+
+
+def neighbour_overlap(a: np.ndarray, b: np.ndarray, k: int) -> float:
+    """Mean share of each row's k nearest rows (by inner product) that both embeddings agree on."""
+    k = min(k, len(a) - 1)
+    if k < 1:
+        return 1.0
+    top_a = np.argsort(-(a @ a.T), axis=1)[:, 1:k + 1]
+    top_b = np.argsort(-(b @ b.T), axis=1)[:, 1:k + 1]
+    return float(np.mean([len(set(x) & set(y)) / k for x, y in zip(top_a, top_b)]))
+
+
+def timed_encode(model, texts, batch_size: int):
+    model.encode(texts[:batch_size], batch_size=batch_size, normalize_embeddings=True)  # warm up
+    start = time.perf_counter()
+    embeddings = model.encode(texts, batch_size=batch_size, show_progress_bar=False,
+                              convert_to_numpy=True, normalize_embeddings=True)
+    return np.asarray(embeddings, dtype=np.float32), time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default=None, help="Model (default: EMBEDDING_MODEL)")
+    parser.add_argument("--texts", type=int, default=500)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--threads", type=int, default=None, help="ONNX intra-op threads (default: EMBEDDING_ONNX_THREADS)")
+    parser.add_argument("--fp32", action="store_true", help="Check the unquantized export")
+    parser.add_argument("--max-deviation", type=float, default=0.02,
+                        help="Largest allowed 1 - cosine(torch, onnx) for any text")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    
+    from sentence_transformers import SentenceTransformer
+    from core.onnx_backend import OnnxEmbeddingModel
+    
+    settings = get_settings()
+    model_name = args.model or settings.embedding_model
+    threads = settings.embedding_onnx_threads if args.threads is None else args.threads
+    texts = clinical_chunks(args.texts, args.seed)
+    
+    torch_model = SentenceTransformer(model_name, device="cpu")
+    onnx_model = OnnxEmbeddingModel(model_name, settings.embedding_onnx_path, quantize=not args.fp32, threads=threads)
+    
+    reference, torch_seconds = timed_encode(torch_model, texts, args.batch_size)
+    candidate, onnx_seconds = timed_encode(onnx_model, texts, args.batch_size)
+    
+    deviation = 1 - (reference * candidate).sum(axis=1)
+    overlap = neighbour_overlap(reference, candidate, args.k)
+    print(f"\nONNX parity: {model_name} ({'fp32' if args.fp32 else 'int8'}), {len(texts)} chunks\n")
+    print(f"{'backend':<10}{'texts/s':>10}")
+    print(f"{'torch':<10}{len(texts) / torch_seconds:>10.1f}")
+    print(f"{'onnx':<10}{len(texts) / onnx_seconds:>10.1f}   ({torch_seconds / onnx_seconds:.2f}x)")
+    print(f"\n1 - cosine: mean {deviation.mean():.2e}, p99 {np.percentile(deviation, 99):.2e}, "
+          f"max {deviation.max():.2e} (allowed {args.max_deviation:.2e})")
+    print(f"top-{args.k} neighbour overlap: {overlap:.3f}")
+    
+    if deviation.max() > args.max_deviation:
+        print("FAIL: ONNX embeddings deviate beyond the bound")
+        return 1
+    print("OK")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,198 @@
+"""
+Healthcare Intelligence Platform - Quantization Report
+Memory saved vs. recall@k lost for each vector storage precision
+
+Usage (from backend/):
+    python -m benchmarks.quantization_report
+    python -m benchmarks.quantization_report --index-path ./data/faiss_index
+    python -m benchmarks.quantization_report --vectors corpus.npy --queries queries.npy
+"""
+
+import argparse
+import time
+import numpy as np
+from typing import Dict, List, Optional
+
+from vectorstore.index_factory import (
+    INDEX_TYPES, STORAGE_TYPES, build_index, train_index,
+    configure_search, bytes_per_vector, min_training_points
+)
+from vectorstore.faiss_store import snapshot_path
+
+
+def synthetic_vectors(n: int, dimension: int, n_clusters: int = 100, seed: int = 0) -> np.ndarray:
+    """Normalized vectors drawn around random cluster centres (embedding-like)."""
+    rng = np.random.default_rng(seed)
+    centres = rng.standard_normal((n_clusters, dimension)).astype(np.float32)
+    labels = rng.integers(0, n_clusters, n)
+    vectors = centres[labels] + 0.8 * rng.standard_normal((n, dimension)).astype(np.float32)
+    return normalize(vectors)
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def load_corpus(args) -> np.ndarray:
+    """Corpus vectors from --vectors, a saved store's vectors.f32, or synthetic data."""
+    if args.vectors:
+        return normalize(np.load(args.vectors))
+    
+    if args.index_path:
+        path = snapshot_path(args.index_path) / "vectors.f32"
+        if not path.exists():
+            raise ValueError(f"{path} not found (the store keeps it when FAISS_RESCORE is enabled)")
+        vectors = np.fromfile(path, dtype=np.float32).reshape(-1, args.dimension)
+        # Drop zero rows left behind by deleted ids
+        return normalize(vectors[np.any(vectors != 0, axis=1)])
+    
+    return synthetic_vectors(args.n_vectors, args.dimension, seed=args.seed)
+
+
+def exact_top_k(corpus: np.ndarray, queries: np.ndarray, k: int, batch_size: int = 256) -> np.ndarray:
+    """Exact float32 inner-product neighbours (the ground truth)."""
+    results = []
+    for start in range(0, len(queries), batch_size):
+        scores = queries[start:start + batch_size] @ corpus.T
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        order = np.argsort(-np.take_along_axis(scores, top, axis=1), axis=1)
+        results.append(np.take_along_axis(top, order, axis=1))
+    return np.vstack(results)
+
+
+def recall_at_k(found: np.ndarray, truth: np.ndarray) -> float:
+    hits = sum(len(set(f[f >= 0]) & set(t)) for f, t in zip(found, truth))
+    return hits / truth.size
+
+
+def rescore(corpus: np.ndarray, queries: np.ndarray, candidates: np.ndarray, k: int) -> np.ndarray:
+    """Re-rank each shortlist by exact inner product against the float32 vectors."""
+    results = np.empty((len(queries), k), dtype=np.int64)
+    for i, (query, ids) in enumerate(zip(queries, candidates)):
+        ids = ids[ids >= 0]
+        scores = corpus[ids] @ query
+        results[i] = ids[np.argsort(-scores)[:k]]
+    return results
+
+
+def evaluate(
+    faiss,
+    index_type: str,
+    storage: str,
+    corpus: np.ndarray,
+    queries: np.ndarray,
+    truth: np.ndarray,
+    args
+) -> Optional[Dict]:
+    """Build one index layout and measure its footprint and recall."""
+    dimension = corpus.shape[1]
+    if len(corpus) < min_training_points(index_type, args.pq_nbits, storage):
+        return None
+    
+    index = build_index(
+        faiss, index_type, dimension,
+        n_train=min(len(corpus), args.train_sample_size),
+        nlist=args.nlist,
+        pq_m=args.pq_m,
+        pq_nbits=args.pq_nbits,
+        hnsw_m=args.hnsw_m,
+        ef_construction=args.ef_construction,
+        storage=storage
+    )
+    train_index(index, corpus, args.train_sample_size, seed=args.seed)
+    index.add(corpus)
+    configure_search(faiss, index, nprobe=args.nprobe, ef_search=args.ef_search)
+    
+    start = time.perf_counter()
+    _, found = index.search(queries, args.k)
+    latency_ms = (time.perf_counter() - start) * 1000 / len(queries)
+    
+    _, shortlist = index.search(queries, args.k * args.rescore_factor)
+    rescored = rescore(corpus, queries, shortlist, args.k)
+    
+    return {
+        "index_type": index_type,
+        "storage": "pq" if index_type == "ivf_pq" else storage,
+        "bytes_per_vector": bytes_per_vector(faiss, index, dimension),
+        "recall": recall_at_k(found, truth),
+        "recall_rescored": recall_at_k(rescored, truth),
+        "latency_ms": latency_ms,
+    }
+
+
+def print_report(rows: List[Dict], n_vectors: int, dimension: int, k: int):
+    print(f"\nQuantization report: {n_vectors} vectors, recall@{k} vs exact float32\n")
+    print(f"{'index':<10}{'storage':<9}{'B/vec':>7}{'MB':>10}{'saved':>8}"
+          f"{'recall':>9}{'+rescore':>10}{'ms/query':>10}")
+    
+    for row in rows:
+        # Compare against the same layout at float32 (raw float32 vectors for PQ)
+        baseline = next(
+            (r["bytes_per_vector"] for r in rows
+             if r["index_type"] == row["index_type"] and r["storage"] == "float32"),
+            dimension * 4
+        )
+        saved = 1 - row["bytes_per_vector"] / baseline
+        mb = row["bytes_per_vector"] * n_vectors / (1024 * 1024)
+        print(f"{row['index_type']:<10}{row['storage']:<9}{row['bytes_per_vector']:>7}{mb:>10.1f}"
+              f"{saved:>8.0%}{row['recall']:>9.3f}{row['recall_rescored']:>10.3f}{row['latency_ms']:>10.2f}")
+    
+    print("\n'+rescore' re-ranks the top k * rescore_factor against float32 vectors "
+          "(FAISS_RESCORE); those stay on disk and are not counted in MB.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vectors", help="Corpus embeddings (.npy, n x d)")
+    parser.add_argument("--queries", help="Held-out query embeddings (.npy); default: split from the corpus")
+    parser.add_argument("--index-path", help="Saved store directory to read vectors.f32 from")
+    parser.add_argument("--dimension", type=int, default=768)
+    parser.add_argument("--n-vectors", type=int, default=50_000, help="Synthetic corpus size")
+    parser.add_argument("--n-queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--index-types", default="flat,hnsw,ivf_flat",
+                        help=f"Comma-separated subset of {INDEX_TYPES}")
+    parser.add_argument("--storage", default=",".join(STORAGE_TYPES),
+                        help=f"Comma-separated subset of {STORAGE_TYPES}")
+    parser.add_argument("--rescore-factor", type=int, default=4)
+    parser.add_argument("--train-sample-size", type=int, default=100_000)
+    parser.add_argument("--nlist", type=int, default=1024)
+    parser.add_argument("--nprobe", type=int, default=32)
+    parser.add_argument("--pq-m", type=int, default=64)
+    parser.add_argument("--pq-nbits", type=int, default=8)
+    parser.add_argument("--hnsw-m", type=int, default=32)
+    parser.add_argument("--ef-construction", type=int, default=200)
+    parser.add_argument("--ef-search", type=int, default=128)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    
+    import faiss
+    
+    corpus = load_corpus(args)
+    if args.queries:
+        queries = normalize(np.load(args.queries))
+    else:
+        rng = np.random.default_rng(args.seed)
+        held_out = rng.choice(len(corpus), min(args.n_queries, len(corpus) // 10), replace=False)
+        queries = corpus[held_out]
+        corpus = np.delete(corpus, held_out, axis=0)
+    
+    truth = exact_top_k(corpus, queries, args.k)
+    
+    rows = []
+    for index_type in args.index_types.split(","):
+        storages = ["float32"] if index_type == "ivf_pq" else args.storage.split(",")
+        for storage in storages:
+            row = evaluate(faiss, index_type, storage, corpus, queries, truth, args)
+            if row is None:
+                print(f"Skipping {index_type}/{storage}: not enough vectors to train")
+            else:
+                rows.append(row)
+    
+    print_report(rows, len(corpus), corpus.shape[1], args.k)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Healthcare Intelligence Platform - Sharded Search Benchmark
+Compares a ShardedStore over local worker processes with one FAISSStore
+
+Acts as a local coordinator: starts N shard workers in a temporary
+directory, loads the same synthetic corpus into them and into an
+in-process store, then reports search latency (single and batched
+queries) and top-k agreement between the two. The workers are stopped
+at the end.
+
+Usage (from backend/):
+    python -m benchmarks.sharded_search
+    python -m benchmarks.sharded_search --shards 4 --chunks 400000
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+import numpy as np
+from typing import Dict, List
+
+
+def doc_vectors(doc: int, chunks: int, dimension: int) -> np.ndarray:
+    """Deterministic, normalized chunk vectors clustered around a per-document centre."""
+    rng = np.random.default_rng(doc)
+    centre = rng.standard_normal(dimension).astype(np.float32)
+    vectors = centre + 0.5 * rng.standard_normal((chunks, dimension)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def measure(search, queries: np.ndarray) -> Dict:
+    """Run queries one at a time; return latencies (ms) and result ids."""
+    latencies, ids = [], []
+    for query in queries:
+        start = time.perf_counter()
+        results = search(query)
+        latencies.append((time.perf_counter() - start) * 1000)
+        ids.append([r["chunk_id"] for r in results])
+    return {"latencies": np.array(latencies), "ids": ids}
+
+
+def overlap(found: List[List[str]], reference: List[List[str]]) -> float:
+    hits = sum(len(set(f) & set(r)) for f, r in zip(found, reference))
+    return hits / max(1, sum(len(r) for r in reference))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--shards", type=int, default=2)
+    parser.add_argument("--chunks", type=int, default=100_000, help="Corpus size in chunks")
+    parser.add_argument("--chunks-per-doc", type=int, default=50)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--batch", type=int, default=32, help="Queries per search_batch call")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    
+    workdir = tempfile.mkdtemp(prefix="sharded-search-")
+    os.environ.setdefault("METADATA_DB_PATH", os.path.join(workdir, "metadata.db"))
+    os.environ["FAISS_INDEX_TYPE"] = "flat"
+    
+    from vectorstore.faiss_store import FAISSStore
+    from vectorstore.sharding import ShardedStore
+    
+    single = FAISSStore()
+    sharded = ShardedStore(root=os.path.join(workdir, "shards"), n_shards=args.shards)
+    try:
+        start = time.perf_counter()
+        sharded.start()
+        print(f"Started {args.shards} shard workers ({time.perf_counter() - start:.1f}s)")
+        
+        n_docs = args.chunks // args.chunks_per_doc
+        dimension = single._dimension
+        print(f"Loading {n_docs:,} documents x {args.chunks_per_doc} chunks into both stores")
+        load = {"single": 0.0, "sharded": 0.0}
+        for doc in range(n_docs):
+            vectors = doc_vectors(doc, args.chunks_per_doc, dimension)
+            chunks = [f"doc-{doc} chunk {i}" for i in range(args.chunks_per_doc)]
+            for name, store in (("single", single), ("sharded", sharded)):
+                start = time.perf_counter()
+                store.add_documents(f"doc-{doc}", chunks, vectors)
+                load[name] += time.perf_counter() - start
+        print(f"  load time: single {load['single']:.1f}s, sharded {load['sharded']:.1f}s")
+        
+        rng = np.random.default_rng(args.seed)
+        queries = rng.standard_normal((args.queries, dimension)).astype(np.float32)
+        queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+        single.search_batch(queries[:8], top_k=args.k)  # warm up
+        sharded.search_batch(queries[:8], top_k=args.k)
+        
+        rows = []
+        reference = measure(lambda q: single.search(q, top_k=args.k), queries)
+        rows.append(("single store", reference, 1.0))
+        run = measure(lambda q: sharded.search(q, top_k=args.k), queries)
+        rows.append((f"sharded ({args.shards})", run, overlap(run["ids"], reference["ids"])))
+        
+        batched = {}
+        for name, store in (("single store", single), (f"sharded ({args.shards})", sharded)):
+            start = time.perf_counter()
+            for i in range(0, len(queries), args.batch):
+                store.search_batch(queries[i:i + args.batch], top_k=args.k)
+            batched[name] = len(queries) / (time.perf_counter() - start)
+        
+        print(f"\nSharded search: {n_docs * args.chunks_per_doc:,} chunks, {len(queries)} queries, "
+              f"top-{args.k} overlap with the single store\n")
+        print(f"{'store':<18}{'p50 ms':>9}{'p95 ms':>9}{'mean ms':>9}{'batch q/s':>11}{'overlap':>9}")
+        for name, run, agreement in rows:
+            latencies = run["latencies"]
+            print(f"{name:<18}{np.percentile(latencies, 50):>9.2f}{np.percentile(latencies, 95):>9.2f}"
+                  f"{latencies.mean():>9.2f}{batched[name]:>11.0f}{agreement:>9.3f}")
+        return 0 if rows[1][2] == 1.0 else 1
+    finally:
+        sharded.shutdown()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
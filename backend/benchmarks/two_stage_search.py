@@ -0,0 +1,140 @@
+"""
+Healthcare Intelligence Platform - Two-Stage Search Benchmark
+Latency and recall of document -> chunk search against single-stage search
+
+A synthetic corpus of documents (chunks clustered around a per-document
+centre, documents clustered by topic) is loaded into a FAISSStore. Each
+query is a perturbed chunk; the single-stage results (search over every
+chunk) are the reference, and two-stage search is run for several numbers
+of candidate documents.
+
+Usage (from backend/):
+    python -m benchmarks.two_stage_search
+    python -m benchmarks.two_stage_search --chunks 200000 --storage float32
+    python -m benchmarks.two_stage_search --candidate-documents 16,64,256
+    python -m benchmarks.two_stage_search --topic-weight 1.0  # broader queries
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+from typing import Dict, List
+
+
+def topic_centres(n_topics: int, dimension: int, seed: int) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    return rng.standard_normal((n_topics, dimension)).astype(np.float32)
+
+
+def doc_vectors(doc: int, topics: np.ndarray, chunks_per_doc: int, seed: int, spread: float) -> np.ndarray:
+    """Deterministic, normalized chunk vectors around a document centre drawn near its topic."""
+    rng = np.random.default_rng((seed, doc))
+    dimension = topics.shape[1]
+    centre = topics[doc % len(topics)] + 0.8 * rng.standard_normal(dimension).astype(np.float32)
+    vectors = centre + spread * rng.standard_normal((chunks_per_doc, dimension)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def make_queries(n_docs: int, topics: np.ndarray, args) -> np.ndarray:
+    """Chunks of random documents, pulled towards their topic by --topic-weight."""
+    rng = np.random.default_rng(args.seed + 1)
+    queries = []
+    for doc in rng.integers(0, n_docs, args.queries):
+        chunk = doc_vectors(int(doc), topics, args.chunks_per_doc, args.seed, args.chunk_spread)[rng.integers(args.chunks_per_doc)]
+        topic = topics[doc % len(topics)] / np.linalg.norm(topics[doc % len(topics)])
+        noise = 0.02 * rng.standard_normal(len(chunk)).astype(np.float32)
+        queries.append(chunk + args.topic_weight * topic + noise)
+    queries = np.array(queries, dtype=np.float32)
+    return queries / np.linalg.norm(queries, axis=1, keepdims=True)
+
+
+def load_corpus(store, n_docs: int, topics: np.ndarray, args):
+    start = time.perf_counter()
+    for doc in range(n_docs):
+        store.add_documents(
+            f"doc-{doc}",
+            [f"doc-{doc} chunk {i}" for i in range(args.chunks_per_doc)],
+            doc_vectors(doc, topics, args.chunks_per_doc, args.seed, args.chunk_spread),
+            {"topic": doc % len(topics)}
+        )
+        if (doc + 1) % max(1, n_docs // 10) == 0:
+            print(f"  loaded {(doc + 1) * args.chunks_per_doc:,} chunks "
+                  f"({time.perf_counter() - start:.0f}s)", flush=True)
+
+
+def measure(search, queries: np.ndarray) -> Dict:
+    """Run queries one at a time; return latencies (ms) and result ids."""
+    latencies, ids = [], []
+    for query in queries:
+        start = time.perf_counter()
+        results = search(query)
+        latencies.append((time.perf_counter() - start) * 1000)
+        ids.append([r["chunk_id"] for r in results])
+    return {"latencies": np.array(latencies), "ids": ids}
+
+
+def recall(found: List[List[str]], reference: List[List[str]]) -> float:
+    hits = sum(len(set(f) & set(r)) for f, r in zip(found, reference))
+    return hits / max(1, sum(len(r) for r in reference))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=1_000_000, help="Corpus size in chunks")
+    parser.add_argument("--chunks-per-doc", type=int, default=50)
+    parser.add_argument("--topics", type=int, default=200)
+    parser.add_argument("--chunk-spread", type=float, default=3.0,
+                        help="Chunk noise around the document centre (higher: documents less coherent)")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--topic-weight", type=float, default=0.5,
+                        help="How far queries lean from their chunk towards its topic (broader queries)")
+    parser.add_argument("--candidate-documents", default="8,32,128",
+                        help="Comma-separated TWO_STAGE_DOCUMENTS values to compare")
+    parser.add_argument("--storage", default="int8",
+                        help="FAISS_VECTOR_STORAGE (int8 keeps 1M x 768 vectors under 1 GB)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    
+    workdir = tempfile.mkdtemp(prefix="two-stage-")
+    os.environ.setdefault("METADATA_DB_PATH", os.path.join(workdir, "metadata.db"))
+    os.environ["FAISS_VECTOR_STORAGE"] = args.storage
+    os.environ["FAISS_INDEX_TYPE"] = "flat"
+    os.environ["FAISS_RESCORE"] = "false"
+    os.environ["FAISS_DEDUP"] = "false"
+    
+    from vectorstore.faiss_store import FAISSStore
+    
+    store = FAISSStore()
+    n_docs = args.chunks // args.chunks_per_doc
+    topics = topic_centres(args.topics, store._dimension, args.seed)
+    print(f"Loading {n_docs:,} documents x {args.chunks_per_doc} chunks ({args.storage})")
+    load_corpus(store, n_docs, topics, args)
+    stats = store.get_stats()
+    print(f"  {stats['total_chunks']:,} chunks, index {stats['index_type']}/{stats['vector_storage']}")
+    
+    queries = make_queries(n_docs, topics, args)
+    store.search_batch(queries[:8], top_k=args.k)  # warm up
+    
+    rows = []
+    single = measure(lambda q: store.search(q, top_k=args.k), queries)
+    rows.append(("single-stage", single, 1.0))
+    for n in (int(v) for v in args.candidate_documents.split(",")):
+        run = measure(lambda q: store.search_two_stage(q, top_k=args.k, n_documents=n), queries)
+        rows.append((f"two-stage ({n} docs)", run, recall(run["ids"], single["ids"])))
+    
+    print(f"\nTwo-stage search: {stats['total_chunks']:,} chunks, {n_docs:,} documents, "
+          f"{len(queries)} queries, recall@{args.k} vs single-stage\n")
+    print(f"{'mode':<24}{'p50 ms':>9}{'p95 ms':>9}{'mean ms':>9}{'recall':>9}")
+    for name, run, rec in rows:
+        latencies = run["latencies"]
+        print(f"{name:<24}{np.percentile(latencies, 50):>9.2f}{np.percentile(latencies, 95):>9.2f}"
+              f"{latencies.mean():>9.2f}{rec:>9.3f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
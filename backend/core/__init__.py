@@ -6,5 +6,6 @@ from .document_processor import DocumentProcessor
 from .text_cleaner import TextCleaner
 from .chunker import DocumentChunker
 from .embeddings import EmbeddingService
+from .reranker import Reranker
 
-__all__ = ["DocumentProcessor", "TextCleaner", "DocumentChunker", "EmbeddingService"]
+__all__ = ["DocumentProcessor", "TextCleaner", "DocumentChunker", "EmbeddingService", "Reranker"]
@@ -0,0 +1,233 @@
+"""
+Healthcare Intelligence Platform - Embedding Cache
+Disk-backed, content-addressed cache of embedding vectors with LRU eviction
+"""
+
+import hashlib
+import sqlite3
+import threading
+import time
+import numpy as np
+from pathlib import Path
+from typing import Any, Dict, Sequence, Tuple
+from loguru import logger
+
+
+KEY_BYTES = 16
+
+# SQLite's default limit on bound parameters is 999
+QUERY_BATCH = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key BLOB PRIMARY KEY,
+    slot INTEGER NOT NULL UNIQUE,
+    used REAL NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS entries_used ON entries (used);
+CREATE TABLE IF NOT EXISTS meta (
+    name TEXT PRIMARY KEY,
+    value
+);
+"""
+
+
+def cache_key(model: str, text: str) -> bytes:
+    """Content address of a text under a model: a 128-bit hash of both."""
+    return hashlib.blake2b(f"{model}\0{text}".encode("utf-8"), digest_size=KEY_BYTES).digest()
+
+
+class EmbeddingCache:
+    """
+    Embedding vectors keyed by (model name, text hash), persisted on disk.
+    
+    Files in the cache directory:
+    - vectors.f32: a fixed-size arena of float32 vectors, memory-mapped, so
+      hits are read from the page cache without deserializing anything
+    - keys.bin: the key stored in each arena slot
+    - index.db: SQLite table mapping each key to its slot and last use
+    
+    The arena holds max_mb worth of vectors; once full, the least recently
+    used entries give up their slots. Several processes (uvicorn --workers)
+    can share a directory: writers serialize on the database, and a reader
+    only accepts a slot whose stored key still matches, since another
+    process may have reused it in the meantime (a writer clears the key
+    before overwriting the vector).
+    """
+    
+    def __init__(self, path: str, dimension: int, max_mb: float):
+        """
+        Args:
+            path: Cache directory (created if missing)
+            dimension: Vector dimension; a cache built for another one is cleared
+            max_mb: Size of the vector arena
+        """
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.dimension = dimension
+        self.capacity = max(1, int(max_mb * 1024 * 1024) // (dimension * 4))
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        
+        conn = self._conn()
+        conn.executescript(SCHEMA)
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            stored = conn.execute("SELECT value FROM meta WHERE name = 'dimension'").fetchone()
+            if stored is not None and stored[0] != dimension:
+                logger.info(f"♻️ Clearing embedding cache built for dimension {stored[0]}")
+                conn.execute("DELETE FROM entries")
+            conn.execute("INSERT OR REPLACE INTO meta VALUES ('dimension', ?)", (dimension,))
+            # A smaller cap drops the entries beyond it
+            conn.execute("DELETE FROM entries WHERE slot >= ?", (self.capacity,))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        
+        self._vectors = self._map("vectors.f32", np.float32, (self.capacity, dimension))
+        self._keys = self._map("keys.bin", np.uint8, (self.capacity, KEY_BYTES))
+        logger.info(f"🗃️ Embedding cache at {self.path}: {len(self)}/{self.capacity} vectors")
+    
+    def _map(self, name: str, dtype, shape: Tuple[int, int]) -> np.memmap:
+        """Memory-map an arena file, sized to the current capacity."""
+        file = self.path / name
+        size = int(np.prod(shape)) * np.dtype(dtype).itemsize
+        with open(file, "ab") as f:
+            if f.tell() != size:
+                f.truncate(size)
+        return np.memmap(file, dtype=dtype, mode="r+", shape=shape)
+    
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.path / "index.db"), timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")
+            self._local.conn = conn
+        return conn
+    
+    def __len__(self) -> int:
+        return self._conn().execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+    
+    def _slots(self, conn: sqlite3.Connection, keys: Sequence[bytes]) -> Dict[bytes, int]:
+        slots = {}
+        for i in range(0, len(keys), QUERY_BATCH):
+            batch = keys[i:i + QUERY_BATCH]
+            rows = conn.execute(
+                f"SELECT key, slot FROM entries WHERE key IN ({','.join('?' * len(batch))})", batch
+            )
+            slots.update(rows)
+        return slots
+    
+    def lookup(self, model: str, texts: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Cached vectors for texts.
+        
+        Args:
+            model: Embedding model name
+            texts: Texts to look up
+        
+        Returns:
+            (vectors (len(texts), dimension), found mask); rows not found are zero
+        """
+        keys = [cache_key(model, text) for text in texts]
+        vectors = np.zeros((len(texts), self.dimension), dtype=np.float32)
+        found = np.zeros(len(texts), dtype=bool)
+        if not keys:
+            return vectors, found
+        
+        conn = self._conn()
+        slots = self._slots(conn, list(dict.fromkeys(keys)))
+        if slots:
+            rows = np.array([i for i, key in enumerate(keys) if key in slots], dtype=np.int64)
+            row_slots = np.array([slots[keys[i]] for i in rows], dtype=np.int64)
+            candidates = np.asarray(self._vectors[row_slots])
+            expected = np.frombuffer(b"".join(keys[i] for i in rows), dtype=np.uint8).reshape(-1, KEY_BYTES)
+            # Checked after reading the vectors: a slot being rewritten no longer holds its key
+            valid = (np.asarray(self._keys[row_slots]) == expected).all(axis=1)
+            vectors[rows[valid]] = candidates[valid]
+            found[rows[valid]] = True
+            
+            now = time.time()
+            used = list(dict.fromkeys(keys[i] for i in rows[valid]))
+            conn.execute("BEGIN")
+            conn.executemany("UPDATE entries SET used = ? WHERE key = ?", [(now, key) for key in used])
+            conn.execute("COMMIT")
+        
+        with self._lock:
+            self.hits += int(found.sum())
+            self.misses += int(len(found) - found.sum())
+        return vectors, found
+    
+    def store(self, model: str, texts: Sequence[str], vectors: np.ndarray):
+        """
+        Add vectors for texts, evicting the least recently used entries if full.
+        
+        Args:
+            model: Embedding model name
+            texts: Texts that were embedded
+            vectors: Their vectors (len(texts), dimension)
+        """
+        entries = dict(zip((cache_key(model, text) for text in texts), np.asarray(vectors, dtype=np.float32)))
+        if not entries:
+            return
+        
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            present = self._slots(conn, list(entries))
+            keys = [key for key in entries if key not in present][-self.capacity:]
+            if keys:
+                slots = self._allocate(conn, len(keys))
+                self._keys[slots] = 0
+                self._vectors[slots] = np.stack([entries[key] for key in keys])
+                self._keys[slots] = np.frombuffer(b"".join(keys), dtype=np.uint8).reshape(-1, KEY_BYTES)
+                now = time.time()
+                conn.executemany(
+                    "INSERT INTO entries (key, slot, used) VALUES (?, ?, ?)",
+                    [(key, int(slot), now) for key, slot in zip(keys, slots)]
+                )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+    
+    def _allocate(self, conn: sqlite3.Connection, n: int) -> np.ndarray:
+        """
+        Slots for n new entries: unused ones first, then those least recently
+        used. Occupied slots are always 0..count-1, since entries only leave
+        by eviction (their slot is reused at once), a smaller cap (the tail)
+        or clear().
+        """
+        count = conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        slots = list(range(count, min(count + n, self.capacity)))
+        if len(slots) < n:
+            evicted = conn.execute(
+                "SELECT key, slot FROM entries ORDER BY used LIMIT ?", (n - len(slots),)
+            ).fetchall()
+            conn.executemany("DELETE FROM entries WHERE key = ?", [(key,) for key, _ in evicted])
+            slots += [slot for _, slot in evicted]
+        return np.array(slots, dtype=np.int64)
+    
+    def stats(self) -> Dict[str, Any]:
+        """Entries, capacity, arena size, and hits/misses since this process started."""
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        return {
+            "entries": len(self),
+            "capacity": self.capacity,
+            "size_mb": round(self._vectors.nbytes / (1024 * 1024), 2),
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / (hits + misses), 3) if hits + misses else None
+        }
+    
+    def clear(self):
+        """Drop every entry (the arena keeps its size)."""
+        conn = self._conn()
+        conn.execute("DELETE FROM entries")
+        with self._lock:
+            self.hits = self.misses = 0
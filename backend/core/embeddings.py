@@ -4,16 +4,132 @@ Sentence transformer embeddings for clinical text
 """
 
 import numpy as np
-from typing import List, Optional, Union
+from typing import Any, Dict, List, Optional, Union
 from loguru import logger
 from functools import lru_cache
 
+from app.config import get_settings
+from .embedding_cache import EmbeddingCache
+from .query_cache import QueryEmbeddingCache
+from .onnx_backend import EMBEDDING_BACKENDS
+
+
+# Character n-gram sizes of the fallback embeddings, and texts hashed per step
+MOCK_NGRAM_SIZES = (3, 4, 5)
+MOCK_BATCH_SIZE = 1024
+
+# Stands in for the words of an empty text, so it still yields an n-gram
+EMPTY_TEXT = "\x00"
+
+# 64-bit FNV-1a, followed by the MurmurHash3 finalizer (FNV alone mixes
+# short inputs poorly into the high bits)
+FNV_OFFSET = np.uint64(0xcbf29ce484222325)
+FNV_PRIME = np.uint64(0x100000001b3)
+FMIX_MULTIPLIERS = (np.uint64(0xff51afd7ed558ccd), np.uint64(0xc4ceb9fe1a85ec53))
+
+
+def length_bucketed_batches(lengths: np.ndarray, max_tokens: int, max_batch: int) -> List[np.ndarray]:
+    """
+    Group texts of similar length into batches under a padded-token budget.
+    
+    A batch is padded to its longest text, so its cost is that length times
+    its size. Texts are taken longest first (the most expensive batch runs
+    first and fails early if it does not fit) and each batch is filled up to
+    max_tokens padded tokens, so short texts share large batches and long
+    ones small batches.
+    
+    Args:
+        lengths: Token length of each text
+        max_tokens: Padded tokens per batch (a longer single text still gets a batch)
+        max_batch: Texts per batch at most
+    
+    Returns:
+        Index arrays into the input, one per batch
+    """
+    order = np.argsort(-np.asarray(lengths), kind="stable")
+    batches = []
+    start = 0
+    while start < len(order):
+        longest = max(1, int(lengths[order[start]]))
+        size = min(max_batch, max(1, max_tokens // longest))
+        batches.append(order[start:start + size])
+        start += size
+    return batches
+
+
+def hashed_ngram_embeddings(
+    texts: List[str],
+    dimension: int,
+    ngram_sizes: tuple = MOCK_NGRAM_SIZES
+) -> np.ndarray:
+    """
+    Feature-hashed character n-gram embeddings.
+    
+    Each text is lowercased and padded with spaces; every byte n-gram is
+    hashed (FNV-1a, then mixed) to a dimension and a sign, and the signed
+    counts are L2-normalized. An empty or whitespace-only text is embedded
+    as a sentinel n-gram, so every vector has unit norm. The vectors depend
+    only on the text, so they agree across processes and restarts, and
+    texts sharing words or word pieces score higher than unrelated ones.
+    All n-grams of a batch of texts are hashed together in numpy.
+    
+    Args:
+        texts: Texts to embed
+        dimension: Output dimension
+        ngram_sizes: Character n-gram lengths to hash
+    
+    Returns:
+        Array of shape (len(texts), dimension), float32
+    """
+    embeddings = np.zeros((len(texts), dimension), dtype=np.float32)
+    for start in range(0, len(texts), MOCK_BATCH_SIZE):
+        batch = texts[start:start + MOCK_BATCH_SIZE]
+        encoded = [f" {' '.join(text.lower().split()) or EMPTY_TEXT} ".encode("utf-8") for text in batch]
+        lengths = np.fromiter(map(len, encoded), dtype=np.int64, count=len(encoded))
+        data = np.frombuffer(b"".join(encoded), dtype=np.uint8).astype(np.uint64)
+        owner = np.repeat(np.arange(len(batch)), lengths)
+        
+        counts = np.zeros(len(batch) * dimension, dtype=np.float64)
+        for n in ngram_sizes:
+            if len(data) < n:
+                continue
+            windows = np.lib.stride_tricks.sliding_window_view(data, n)
+            # Windows spanning two texts are skipped
+            valid = owner[:len(owner) - n + 1] == owner[n - 1:]
+            h = np.full(len(windows), FNV_OFFSET ^ np.uint64(n), dtype=np.uint64)
+            for j in range(n):
+                h ^= windows[:, j]
+                h *= FNV_PRIME
+            h = h[valid]
+            for multiplier in FMIX_MULTIPLIERS:
+                h ^= h >> np.uint64(33)
+                h *= multiplier
+            h ^= h >> np.uint64(33)
+            bucket = (h % np.uint64(dimension)).astype(np.int64)
+            sign = np.where(h >> np.uint64(63), 1.0, -1.0)
+            counts += np.bincount(
+                owner[:len(owner) - n + 1][valid] * dimension + bucket,
+                weights=sign,
+                minlength=len(counts)
+            )
+        
+        vectors = counts.reshape(len(batch), dimension)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        embeddings[start:start + len(batch)] = vectors / np.maximum(norms, 1e-12)
+    return embeddings
+
 
 class EmbeddingService:
     """
     Embedding service using sentence transformers.
     
-    Uses PubMedBERT-based model for medical text embeddings.
+    Uses PubMedBERT-based model for medical text embeddings, run by PyTorch
+    or, with EMBEDDING_BACKEND=onnx, by ONNX Runtime (int8-quantized unless
+    EMBEDDING_ONNX_QUANTIZE is off; see core.onnx_backend). Model outputs
+    are kept in a persistent embedding cache (EMBEDDING_CACHE_PATH), so a
+    text is only encoded the first time it is seen; mock embeddings are
+    not cached. Query embeddings are also kept in an in-memory LRU
+    (QUERY_CACHE_SIZE), in front of both.
     """
     
     _instance = None
@@ -23,13 +139,26 @@ class EmbeddingService:
         """Singleton pattern for embedding service."""
         if cls._instance is None:
             cls._instance = super().__new__(cls)
+            cls._instance._initialized = False
         return cls._instance
     
     def __init__(self):
         """Initialize embedding service with lazy model loading."""
-        self._model_name = "pritamdeka/S-PubMedBert-MS-MARCO"
+        if self._initialized:
+            return
+        
+        settings = get_settings()
+        self._model_name = settings.embedding_model
+        self._backend = settings.embedding_backend
         self._dimension = 768
         self._model_loaded = False
+        self._batch_tokens = settings.embedding_batch_tokens
+        self._max_batch = settings.embedding_max_batch
+        self._cache: Optional[EmbeddingCache] = None
+        self._query_cache: Optional[QueryEmbeddingCache] = None
+        if settings.query_cache_size > 0:
+            self._query_cache = QueryEmbeddingCache(settings.query_cache_size, settings.query_cache_ttl_seconds)
+        self._initialized = True
     
     def _load_model(self):
         """Lazy load the sentence transformer model."""
@@ -37,15 +166,31 @@ class EmbeddingService:
             return
         
         try:
-            from sentence_transformers import SentenceTransformer
+            if self._backend not in EMBEDDING_BACKENDS:
+                raise ValueError(f"Unknown embedding backend: {self._backend} (expected one of {EMBEDDING_BACKENDS})")
             
-            logger.info(f"🧠 Loading embedding model: {self._model_name}")
-            self._model = SentenceTransformer(self._model_name)
+            logger.info(f"🧠 Loading embedding model: {self._model_name} ({self._backend})")
+            if self._backend == "onnx":
+                from .onnx_backend import OnnxEmbeddingModel
+                
+                settings = get_settings()
+                self._model = OnnxEmbeddingModel(
+                    self._model_name,
+                    settings.embedding_onnx_path,
+                    quantize=settings.embedding_onnx_quantize,
+                    threads=settings.embedding_onnx_threads
+                )
+            else:
+                from sentence_transformers import SentenceTransformer
+                
+                self._model = SentenceTransformer(self._model_name)
+            self._dimension = self._model.get_sentence_embedding_dimension() or self._dimension
             self._model_loaded = True
             logger.info("✅ Embedding model loaded successfully")
+            self._open_cache()
             
-        except ImportError:
-            logger.warning("sentence-transformers not installed, using mock embeddings")
+        except ImportError as e:
+            logger.warning(f"Embedding backend {self._backend} unavailable ({e}), using mock embeddings")
             self._model = None
             self._model_loaded = True
         except Exception as e:
@@ -54,21 +199,74 @@ class EmbeddingService:
             self._model = None
             self._model_loaded = True
     
+    def _open_cache(self):
+        """Open the embedding cache for the loaded model (disabled on failure)."""
+        settings = get_settings()
+        if not settings.embedding_cache_enabled or settings.embedding_cache_max_mb <= 0:
+            return
+        try:
+            self._cache = EmbeddingCache(
+                settings.embedding_cache_path, self._dimension, settings.embedding_cache_max_mb
+            )
+        except Exception as e:
+            logger.warning(f"Embedding cache unavailable, encoding every text: {e}")
+            self._cache = None
+    
+    def warmup(self, batch_size: int = 8):
+        """Load the model and encode a dummy batch so the first request does not pay for it."""
+        self._load_model()
+        texts = ["Patient presents with chest pain and shortness of breath."] * batch_size
+        if self._model is None:
+            self.embed_texts(texts)
+        else:
+            # Bypass the cache, which would answer without running the model
+            self._encode(texts, batch_size)
+        logger.info("🔥 Embedding model warmed up")
+    
+    def cache_stats(self) -> Optional[Dict[str, Any]]:
+        """Embedding cache entries and hit rate (None while no cache is open)."""
+        return self._cache.stats() if self._cache is not None else None
+    
+    def query_cache_stats(self) -> Optional[Dict[str, Any]]:
+        """Query embedding LRU hit ratio and model time saved (None when disabled)."""
+        return self._query_cache.stats() if self._query_cache is not None else None
+    
+    @property
+    def model_id(self) -> str:
+        """Model name plus the backend when it changes the vectors (cached embeddings are keyed by it)."""
+        if self._backend != "onnx":
+            return self._model_name
+        return f"{self._model_name}#onnx-{'int8' if get_settings().embedding_onnx_quantize else 'fp32'}"
+    
     @property
     def dimension(self) -> int:
         """Get embedding dimension."""
         return self._dimension
     
-    def embed_texts(self, texts: List[str]) -> np.ndarray:
+    def embed_texts(self, texts: List[str], batch_size: Optional[int] = None) -> np.ndarray:
         """
         Generate embeddings for a list of texts.
         
+        Texts found in the embedding cache are not encoded again; the misses
+        (each distinct text once) are encoded and added to the cache.
+        
         Args:
             texts: List of text strings to embed
+            batch_size: Texts per model forward pass at most (defaults to
+                EMBEDDING_MAX_BATCH; batches are also bounded by
+                EMBEDDING_BATCH_TOKENS)
             
         Returns:
             NumPy array of shape (len(texts), dimension)
         """
+        try:
+            return self._embed_texts(texts, batch_size)
+        except Exception as e:
+            logger.error(f"Embedding error: {e}")
+            return self._generate_mock_embeddings(texts)
+    
+    def _embed_texts(self, texts: List[str], batch_size: Optional[int] = None) -> np.ndarray:
+        """embed_texts, raising model errors instead of falling back to mock embeddings."""
         self._load_model()
         
         if not texts:
@@ -79,49 +277,111 @@ class EmbeddingService:
             logger.debug(f"Generating mock embeddings for {len(texts)} texts")
             return self._generate_mock_embeddings(texts)
         
-        try:
+        if self._cache is None:
             logger.debug(f"Generating embeddings for {len(texts)} texts")
-            embeddings = self._model.encode(
-                texts,
+            return self._encode(texts, batch_size)
+        
+        embeddings, found = self._cache_lookup(texts)
+        missing = np.flatnonzero(~found)
+        logger.debug(f"Embedding cache: {len(texts) - len(missing)}/{len(texts)} hits")
+        if len(missing):
+            new_texts = list(dict.fromkeys(texts[i] for i in missing))
+            vectors = self._encode(new_texts, batch_size)
+            self._cache_store(new_texts, vectors)
+            by_text = dict(zip(new_texts, vectors))
+            for i in missing:
+                embeddings[i] = by_text[texts[i]]
+        return embeddings
+    
+    def _encode(self, texts: List[str], batch_size: Optional[int] = None) -> np.ndarray:
+        """
+        Run the model over texts in length-bucketed batches (see
+        length_bucketed_batches); outputs are returned in input order.
+        """
+        lengths = self._token_lengths(texts)
+        embeddings = np.empty((len(texts), self._dimension), dtype=np.float32)
+        done = 0
+        for batch in length_bucketed_batches(lengths, self._batch_tokens, batch_size or self._max_batch):
+            embeddings[batch] = self._model.encode(
+                [texts[i] for i in batch],
+                batch_size=len(batch),
                 show_progress_bar=False,
                 convert_to_numpy=True,
                 normalize_embeddings=True
             )
-            return embeddings.astype(np.float32)
             
+            done += len(batch)
+            if done // 100 > (done - len(batch)) // 100:
+                logger.debug(f"Embedded {done}/{len(texts)} texts")
+        
+        return embeddings
+    
+    def _token_lengths(self, texts: List[str]) -> np.ndarray:
+        """Token count of each text after truncation (estimated from characters without a tokenizer)."""
+        max_length = getattr(self._model, "max_seq_length", None) or 512
+        tokenizer = getattr(self._model, "tokenizer", None)
+        if tokenizer is not None:
+            try:
+                ids = tokenizer(
+                    texts, truncation=True, max_length=max_length,
+                    return_attention_mask=False, return_token_type_ids=False
+                )["input_ids"]
+                return np.fromiter(map(len, ids), dtype=np.int64, count=len(texts))
+            except Exception:
+                pass
+        chars = np.fromiter(map(len, texts), dtype=np.int64, count=len(texts))
+        return np.minimum(chars // 4 + 2, max_length)
+    
+    def _cache_lookup(self, texts: List[str]):
+        """(vectors, found mask) from the cache; every text counts as a miss if it fails."""
+        try:
+            return self._cache.lookup(self.model_id, texts)
         except Exception as e:
-            logger.error(f"Embedding error: {e}")
-            return self._generate_mock_embeddings(texts)
+            logger.warning(f"Embedding cache lookup failed: {e}")
+            return np.zeros((len(texts), self._dimension), dtype=np.float32), np.zeros(len(texts), dtype=bool)
+    
+    def _cache_store(self, texts: List[str], vectors: np.ndarray):
+        try:
+            self._cache.store(self.model_id, texts, vectors)
+        except Exception as e:
+            logger.warning(f"Embedding cache write failed: {e}")
     
     def embed_query(self, query: str) -> np.ndarray:
         """
         Generate embedding for a single query.
         
+        Repeated queries (after whitespace and Unicode normalization) are
+        answered from the query LRU; identical queries arriving together
+        share one model call. If the model fails, a mock embedding is
+        returned but not cached.
+        
         Args:
             query: Query string
             
         Returns:
             NumPy array of shape (dimension,)
         """
-        embeddings = self.embed_texts([query])
+        try:
+            if self._query_cache is not None:
+                return self._query_cache.get(query, self._embed_query)
+            return self._embed_query(query)
+        except Exception as e:
+            # Not cached, so the next request tries the model again
+            logger.error(f"Embedding error: {e}")
+            return self._generate_mock_embeddings([query])[0]
+    
+    def _embed_query(self, query: str) -> np.ndarray:
+        embeddings = self._embed_texts([query])
         return embeddings[0] if len(embeddings) > 0 else np.zeros(self._dimension)
     
     def _generate_mock_embeddings(self, texts: List[str]) -> np.ndarray:
         """
         Generate deterministic mock embeddings for testing.
         
-        Uses text hash to create reproducible embeddings.
+        Uses hashed character n-grams (see hashed_ngram_embeddings), so the
+        same text gets the same vector in every process.
         """
-        embeddings = []
-        for text in texts:
-            # Create deterministic embedding based on text hash
-            np.random.seed(hash(text) % (2**32))
-            emb = np.random.randn(self._dimension).astype(np.float32)
-            # Normalize
-            emb = emb / np.linalg.norm(emb)
-            embeddings.append(emb)
-        
-        return np.array(embeddings)
+        return hashed_ngram_embeddings(texts, self._dimension)
     
     def compute_similarity(
         self,
@@ -153,31 +413,21 @@ class EmbeddingService:
     def batch_embed(
         self,
         texts: List[str],
-        batch_size: int = 32
+        batch_size: Optional[int] = None
     ) -> np.ndarray:
         """
         Embed texts in batches to manage memory.
         
+        The whole list is looked up in the embedding cache first, so only
+        the misses are batched through the model. Batches group texts of
+        similar token length under a padded-token budget
+        (EMBEDDING_BATCH_TOKENS), so short chunks are not padded to long ones.
+        
         Args:
             texts: List of texts to embed
-            batch_size: Number of texts per batch
+            batch_size: Texts per batch at most (defaults to EMBEDDING_MAX_BATCH)
             
         Returns:
             NumPy array of all embeddings
         """
-        self._load_model()
-        
-        if not texts:
-            return np.array([])
-        
-        all_embeddings = []
-        
-        for i in range(0, len(texts), batch_size):
-            batch = texts[i:i + batch_size]
-            batch_embeddings = self.embed_texts(batch)
-            all_embeddings.append(batch_embeddings)
-            
-            if (i + batch_size) % 100 == 0:
-                logger.debug(f"Embedded {min(i + batch_size, len(texts))}/{len(texts)} texts")
-        
-        return np.vstack(all_embeddings) if all_embeddings else np.array([])
+        return self.embed_texts(texts, batch_size=batch_size)
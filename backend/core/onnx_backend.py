@@ -0,0 +1,191 @@
+"""
+Healthcare Intelligence Platform - ONNX Embedding Backend
+Sentence embeddings on CPU through ONNX Runtime, optionally int8-quantized
+"""
+
+import json
+import os
+import re
+import shutil
+import numpy as np
+from pathlib import Path
+from typing import Any, Dict, List
+from loguru import logger
+
+
+EMBEDDING_BACKENDS = ("torch", "onnx")
+
+POOLING_MODES = ("mean", "cls", "max")
+
+ONNX_OPSET = 14
+
+
+def export_dir(root: str, model_name: str, quantize: bool) -> Path:
+    """Directory holding the export of a model: <root>/<model name>-<fp32|int8>."""
+    safe = re.sub(r"[^A-Za-z0-9_.-]", "_", model_name)
+    return Path(root) / f"{safe}-{'int8' if quantize else 'fp32'}"
+
+
+def export_model(model_name: str, directory: Path, quantize: bool = True) -> Path:
+    """
+    Export a sentence-transformers model's encoder to ONNX.
+    
+    Writes model.onnx (dynamic batch and sequence axes), the tokenizer, and
+    embedding.json with the pooling mode, maximum sequence length and output
+    dimension. The files are written to a temporary directory renamed into
+    place at the end, so processes exporting at the same time do not mix
+    their files. With quantize, the weights are then quantized to int8
+    (dynamic quantization: activations stay float and are quantized per
+    batch at run time). Needs torch and sentence-transformers; running the
+    export afterwards only needs onnxruntime and the tokenizer.
+    
+    Args:
+        model_name: Sentence-transformers model name or path
+        directory: Output directory
+        quantize: Quantize the weights to int8
+    
+    Returns:
+        The directory
+    """
+    import torch
+    from sentence_transformers import SentenceTransformer
+    
+    logger.info(f"📦 Exporting {model_name} to ONNX ({'int8' if quantize else 'fp32'})")
+    st = SentenceTransformer(model_name, device="cpu")
+    transformer = st[0].auto_model.eval()
+    tokenizer = st.tokenizer
+    pooling = st[1].get_pooling_mode_str() if len(st) > 1 and hasattr(st[1], "get_pooling_mode_str") else "mean"
+    extra = [type(module).__name__ for module in list(st)[2:] if type(module).__name__ != "Normalize"]
+    if pooling not in POOLING_MODES or extra:
+        raise ValueError(f"ONNX backend supports {'/'.join(POOLING_MODES)} pooling without extra layers, "
+                         f"{model_name} has {pooling} pooling and {extra or 'no'} extra layers")
+    
+    final, directory = directory, directory.with_name(f"{directory.name}.{os.getpid()}.tmp")
+    directory.mkdir(parents=True, exist_ok=True)
+    sample = tokenizer(["Patient presents with chest pain."], return_tensors="pt")
+    input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in sample]
+    axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+    
+    fp32_path = directory / ("model.fp32.onnx" if quantize else "model.onnx")
+    with torch.no_grad():
+        torch.onnx.export(
+            transformer,
+            tuple(sample[name] for name in input_names),
+            str(fp32_path),
+            input_names=input_names,
+            output_names=["last_hidden_state"],
+            dynamic_axes=axes,
+            opset_version=ONNX_OPSET
+        )
+    
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        
+        quantize_dynamic(str(fp32_path), str(directory / "model.onnx"), weight_type=QuantType.QInt8)
+        fp32_path.unlink()
+    
+    tokenizer.save_pretrained(str(directory))
+    transformer.config.save_pretrained(str(directory))
+    with open(directory / "embedding.json", "w") as f:
+        json.dump({
+            "model": model_name,
+            "pooling": pooling,
+            "max_seq_length": st.max_seq_length,
+            "dimension": st.get_sentence_embedding_dimension(),
+            "quantized": quantize
+        }, f)
+    
+    try:
+        directory.rename(final)
+        logger.info(f"✅ Exported {model_name} to {final}")
+    except OSError:
+        # Another process finished its export first
+        shutil.rmtree(directory, ignore_errors=True)
+    return final
+
+
+class OnnxEmbeddingModel:
+    """
+    Sentence embedding model run by ONNX Runtime on CPU.
+    
+    Offers the part of the SentenceTransformer interface EmbeddingService
+    uses (encode, tokenizer, max_seq_length, get_sentence_embedding_dimension).
+    The encoder is exported on first use if no export exists yet. Pooling
+    (mean, CLS or max, as in the original model) and normalization run in
+    numpy. Intra-op threads default to the CPU count, with one inter-op
+    thread: a BERT forward pass is a chain of large matrix products, so
+    the threads are better spent inside each one.
+    """
+    
+    def __init__(self, model_name: str, root: str, quantize: bool = True, threads: int = 0):
+        """
+        Args:
+            model_name: Sentence-transformers model name or path
+            root: Directory holding ONNX exports (EMBEDDING_ONNX_PATH)
+            quantize: Use the int8-quantized export
+            threads: Intra-op threads (0 = CPU count)
+        """
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+        
+        directory = export_dir(root, model_name, quantize)
+        if not (directory / "model.onnx").exists():
+            export_model(model_name, directory, quantize)
+        with open(directory / "embedding.json", "r") as f:
+            self.config: Dict[str, Any] = json.load(f)
+        
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = threads or os.cpu_count() or 1
+        options.inter_op_num_threads = 1
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(
+            str(directory / "model.onnx"), sess_options=options, providers=["CPUExecutionProvider"]
+        )
+        self.input_names = [i.name for i in self.session.get_inputs()]
+        self.tokenizer = AutoTokenizer.from_pretrained(str(directory))
+        self.max_seq_length = self.config["max_seq_length"]
+        self.pooling = self.config["pooling"]
+        logger.info(
+            f"⚙️ ONNX embedding model {directory.name} "
+            f"({options.intra_op_num_threads} threads, {self.pooling} pooling)"
+        )
+    
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.config["dimension"]
+    
+    def encode(
+        self,
+        texts: List[str],
+        batch_size: int = 32,
+        show_progress_bar: bool = False,
+        convert_to_numpy: bool = True,
+        normalize_embeddings: bool = False
+    ) -> np.ndarray:
+        """Embed texts batch_size at a time (arguments as in SentenceTransformer.encode)."""
+        outputs = []
+        for start in range(0, len(texts), batch_size):
+            encoded = self.tokenizer(
+                list(texts[start:start + batch_size]),
+                padding=True,
+                truncation=True,
+                max_length=self.max_seq_length,
+                return_tensors="np"
+            )
+            feeds = {name: encoded[name].astype(np.int64) for name in self.input_names}
+            hidden = self.session.run(["last_hidden_state"], feeds)[0]
+            outputs.append(self._pool(hidden, encoded["attention_mask"]))
+        
+        embeddings = np.vstack(outputs).astype(np.float32)
+        if normalize_embeddings:
+            embeddings /= np.maximum(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12)
+        return embeddings
+    
+    def _pool(self, hidden: np.ndarray, mask: np.ndarray) -> np.ndarray:
+        if self.pooling == "cls":
+            return hidden[:, 0]
+        mask = mask[:, :, None].astype(np.float32)
+        if self.pooling == "max":
+            return np.where(mask > 0, hidden, -1e9).max(axis=1)
+        return (hidden * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
@@ -0,0 +1,137 @@
+"""
+Healthcare Intelligence Platform - Query Embedding Cache
+In-memory LRU of query embeddings with expiry and single-flight computation
+"""
+
+import re
+import threading
+import time
+import unicodedata
+import numpy as np
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+
+WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_query(query: str) -> str:
+    """Cache key for a query: Unicode NFKC with whitespace collapsed and trimmed."""
+    return WHITESPACE.sub(" ", unicodedata.normalize("NFKC", query)).strip()
+
+
+class _Flight:
+    """A computation in progress that identical concurrent queries wait on."""
+    
+    def __init__(self):
+        self.done = threading.Event()
+        self.vector: Optional[np.ndarray] = None
+        self.error: Optional[BaseException] = None
+        self.cost_ms = 0.0
+
+
+class QueryEmbeddingCache:
+    """
+    Bounded LRU of query embeddings keyed by the normalized query.
+    
+    Entries expire after ttl_seconds. When several requests ask for the same
+    uncached query at once, the first computes it and the others wait for
+    its result (single flight), so the model runs once. Each answer served
+    without running the model adds that query's measured embedding time to
+    saved_ms.
+    """
+    
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        """
+        Args:
+            max_entries: Queries kept; the least recently used are dropped beyond it
+            ttl_seconds: Lifetime of an entry (0 = no expiry)
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._flights: Dict[str, _Flight] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.shared = 0
+        self.misses = 0
+        self.saved_ms = 0.0
+    
+    def get(self, query: str, compute: Callable[[str], np.ndarray]) -> np.ndarray:
+        """
+        The embedding of a query, computed at most once per entry lifetime.
+        
+        Args:
+            query: Query text
+            compute: Embeds a normalized query (called on a miss)
+        
+        Returns:
+            A copy of the cached vector, so callers may modify it
+        """
+        key = normalize_query(query)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires, vector, cost_ms = entry
+                if expires is None or expires > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    self.saved_ms += cost_ms
+                    return vector.copy()
+                del self._entries[key]
+            
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                self.misses += 1
+            else:
+                self.shared += 1
+        
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            with self._lock:
+                self.saved_ms += flight.cost_ms
+            return flight.vector.copy()
+        
+        try:
+            start = time.perf_counter()
+            flight.vector = np.asarray(compute(key), dtype=np.float32)
+            flight.cost_ms = (time.perf_counter() - start) * 1000
+            expires = time.monotonic() + self.ttl_seconds if self.ttl_seconds > 0 else None
+            with self._lock:
+                self._entries[key] = (expires, flight.vector, flight.cost_ms)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+            return flight.vector.copy()
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.done.set()
+    
+    def stats(self) -> Dict[str, Any]:
+        """Entries, hits (including waits on an identical query in flight), and time saved."""
+        with self._lock:
+            served = self.hits + self.shared
+            total = served + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "shared": self.shared,
+                "misses": self.misses,
+                "hit_ratio": round(served / total, 3) if total else None,
+                "saved_ms": round(self.saved_ms, 1)
+            }
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,156 @@
+"""
+Healthcare Intelligence Platform - Re-ranking Service
+Cross-encoder re-ranking of retrieved clinical chunks
+"""
+
+import time
+import threading
+import numpy as np
+from typing import Any, Dict, List, Optional, Tuple
+from loguru import logger
+
+from app.config import get_settings
+
+
+class Reranker:
+    """
+    Second-stage re-ranker using a small cross-encoder on CPU.
+    
+    A cross-encoder reads the query and a chunk together, so it orders
+    candidates more precisely than embedding similarity, at a cost per
+    candidate. All candidates are scored in one batched forward pass. The
+    observed cost per candidate is tracked, and a request whose candidates
+    would not fit its time budget skips the stage instead of running late.
+    """
+    
+    _instance = None
+    
+    # Weight of the latest request in the running cost-per-candidate estimate
+    COST_SMOOTHING = 0.3
+    
+    # A skipped request shrinks the estimate slightly, so one slow run
+    # (e.g. a cold CPU) does not disable the stage for good
+    SKIP_DECAY = 0.95
+    
+    def __new__(cls):
+        """Singleton pattern."""
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance._initialized = False
+        return cls._instance
+    
+    def __init__(self):
+        if self._initialized:
+            return
+        
+        self._model_name = get_settings().reranker_model
+        self._model = None
+        self._model_loaded = False
+        self._load_lock = threading.Lock()
+        self._ms_per_candidate: Optional[float] = None
+        self._initialized = True
+    
+    def _load_model(self):
+        """Lazy load the cross-encoder model."""
+        if self._model_loaded:
+            return
+        
+        with self._load_lock:
+            if self._model_loaded:
+                return
+            try:
+                from sentence_transformers import CrossEncoder
+                
+                logger.info(f"🧠 Loading re-ranking model: {self._model_name}")
+                self._model = CrossEncoder(self._model_name, device="cpu")
+                logger.info("✅ Re-ranking model loaded successfully")
+            
+            except ImportError:
+                logger.warning("sentence-transformers not installed, re-ranking disabled")
+                self._model = None
+            except Exception as e:
+                logger.error(f"Error loading re-ranking model: {e}")
+                self._model = None
+            self._model_loaded = True
+    
+    @property
+    def available(self) -> bool:
+        """Whether a model is loaded (re-ranking is skipped otherwise)."""
+        self._load_model()
+        return self._model is not None
+    
+    def warmup(self, batch_size: int = 8):
+        """Load the model and score a dummy batch, which also seeds the cost estimate."""
+        if not self.available:
+            return
+        start = time.perf_counter()
+        self._score("chest pain", ["Patient presents with chest pain and shortness of breath."] * batch_size)
+        self._observe(batch_size, (time.perf_counter() - start) * 1000)
+        logger.info("🔥 Re-ranking model warmed up")
+    
+    def estimate_ms(self, n_candidates: int) -> Optional[float]:
+        """Predicted latency for scoring n candidates (None before the first run)."""
+        if self._ms_per_candidate is None:
+            return None
+        return self._ms_per_candidate * n_candidates
+    
+    def rerank(
+        self,
+        query: str,
+        results: List[Dict[str, Any]],
+        top_k: int,
+        budget_ms: float
+    ) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        """
+        Re-order search results by cross-encoder relevance.
+        
+        Args:
+            query: Query text
+            results: Over-fetched search results (candidates)
+            top_k: Number of results to keep
+            budget_ms: Skip re-ranking if it is predicted to take longer
+        
+        Returns:
+            (top_k results, info with "reranked", "latency_ms" and "skipped")
+        """
+        info = {"reranked": False, "latency_ms": 0.0, "skipped": None}
+        if not results:
+            return results, info
+        
+        if not self.available:
+            info["skipped"] = "model unavailable"
+            return results[:top_k], info
+        
+        estimate = self.estimate_ms(len(results))
+        if estimate is not None and estimate > budget_ms:
+            self._ms_per_candidate *= self.SKIP_DECAY
+            info["skipped"] = f"over budget ({estimate:.0f}ms predicted, {budget_ms:.0f}ms allowed)"
+            return results[:top_k], info
+        
+        start = time.perf_counter()
+        scores = self._score(query, [r["content"] for r in results])
+        elapsed = (time.perf_counter() - start) * 1000
+        self._observe(len(results), elapsed)
+        
+        order = np.argsort(-scores, kind="stable")[:top_k]
+        info.update(reranked=True, latency_ms=round(elapsed, 2))
+        return [{**results[i], "rerank_score": float(scores[i])} for i in order], info
+    
+    def _score(self, query: str, texts: List[str]) -> np.ndarray:
+        """Score (query, text) pairs in a single batch."""
+        scores = self._model.predict(
+            [(query, text) for text in texts],
+            batch_size=len(texts),
+            show_progress_bar=False,
+            convert_to_numpy=True
+        )
+        return np.asarray(scores, dtype=np.float32).reshape(-1)
+    
+    def _observe(self, n_candidates: int, elapsed_ms: float):
+        """Fold a measured run into the cost-per-candidate estimate."""
+        cost = elapsed_ms / n_candidates
+        if self._ms_per_candidate is None:
+            self._ms_per_candidate = cost
+        else:
+            a = self.COST_SMOOTHING
+            self._ms_per_candidate = a * cost + (1 - a) * self._ms_per_candidate
@@ -0,0 +1,4 @@
+"""
+Healthcare Intelligence Platform - Scripts Package
+Offline maintenance tools (run with `python -m scripts.<tool>`)
+"""
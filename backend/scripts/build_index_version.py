@@ -0,0 +1,49 @@
+"""
+Healthcare Intelligence Platform - Build Index Version
+Re-embed the corpus into a new index version while the API keeps serving
+
+Reads the current (or given) version from its last checkpoint, embeds
+every document with the configured embedding model and writes the result
+as a new version under FAISS_INDEX_PATH/versions. Activate it through
+POST /api/index/versions/{version}/activate, or here with --activate when
+the API is not running.
+
+Usage (from backend/):
+    curl -X POST localhost:8000/api/index/checkpoint   # include recent changes
+    python -m scripts.build_index_version
+    python -m scripts.build_index_version --source v0001 --activate
+"""
+
+import argparse
+import sys
+
+from app.config import get_settings
+from core.embeddings import EmbeddingService
+from vectorstore.versions import IndexVersions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--source", help="Version to rebuild (default: current)")
+    parser.add_argument("--activate", action="store_true",
+                        help="Point current.json at the new version (only while the API is stopped)")
+    args = parser.parse_args()
+    
+    settings = get_settings()
+    versions = IndexVersions(settings.faiss_index_path, keep=settings.index_versions_keep)
+    embeddings = EmbeddingService()
+    version = versions.build(
+        embeddings.embed_texts,
+        source=args.source,
+        embedding_model=embeddings.model_id
+    )
+    print(f"Built index version {version}")
+    
+    if args.activate:
+        info = versions.activate(version, force=True, warmup=False)
+        print(f"Activated {info['current']} (previous: {info['previous']})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
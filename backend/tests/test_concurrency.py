@@ -0,0 +1,41 @@
+"""
+Healthcare Intelligence Platform - Concurrency Tests
+Mixed ingestion, deletion and search on one FAISSStore
+
+A bounded run of benchmarks.concurrency_stress; use the benchmark itself
+for long runs and other index types.
+"""
+
+import threading
+
+from benchmarks.concurrency_stress import CHUNKS_PER_DOC, StressRun, chunk_text, doc_vectors
+from vectorstore.faiss_store import FAISSStore
+
+
+def test_mixed_add_delete_search(tmp_path):
+    store = FAISSStore(metadata_path=str(tmp_path / "metadata.db"))
+    dimension = store._dimension
+    run = StressRun(store, dimension, seconds=3)
+    for doc in range(100):
+        store.add_documents(
+            f"doc-{doc}",
+            [chunk_text(doc, i) for i in range(CHUNKS_PER_DOC)],
+            doc_vectors(doc, dimension)
+        )
+        run.live.append(doc)
+    run.next_doc = 100
+    
+    threads = [threading.Thread(target=run.writer, args=(3,)) for _ in range(2)]
+    threads += [threading.Thread(target=run.reader) for _ in range(3)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(timeout=30)
+    
+    assert not any(t.is_alive() for t in threads)
+    assert run.errors == []
+    assert run.violations == []
+    assert run.deleted, "the run deleted no documents"
+    
+    results = store.search_batch(doc_vectors(min(run.deleted), dimension)[:1], top_k=50)[0]
+    assert not {r["document_id"] for r in results} & {f"doc-{doc}" for doc in run.deleted}
@@ -0,0 +1,23 @@
+"""
+Healthcare Intelligence Platform - Embedding Tests
+Fallback hashed n-gram embeddings
+"""
+
+import numpy as np
+import pytest
+
+from core.embeddings import hashed_ngram_embeddings
+
+
+@pytest.mark.parametrize("text", ["", "   ", "\n\t"])
+def test_empty_text_has_unit_norm(text):
+    vectors = hashed_ngram_embeddings([text, "chest pain", text], 768)
+    
+    assert np.allclose(np.linalg.norm(vectors, axis=1), 1.0)
+    assert np.array_equal(vectors[0], vectors[2])
+
+
+def test_empty_text_scores_below_real_match():
+    vectors = hashed_ngram_embeddings(["chest pain", "", "patient with chest pain"], 768)
+    
+    assert vectors[2] @ vectors[0] > vectors[2] @ vectors[1]
@@ -0,0 +1,83 @@
+"""
+Healthcare Intelligence Platform - ONNX Backend Tests
+Parity of the int8 ONNX export with the PyTorch model, and backend selection
+
+Needs onnxruntime and sentence-transformers (skipped otherwise); the
+model is exported on first run. benchmarks.onnx_parity checks a larger
+corpus and reports throughput.
+"""
+
+import numpy as np
+import pytest
+
+pytest.importorskip("onnxruntime")
+pytest.importorskip("sentence_transformers")
+
+from app.config import get_settings
+from core.embeddings import EmbeddingService
+from core.onnx_backend import OnnxEmbeddingModel
+
+# Largest allowed 1 - cosine(torch, onnx), as in benchmarks.onnx_parity
+MAX_DEVIATION = 0.02
+
+SENTENCES = [
+    "Patient presents with chest pain radiating to the left arm.",
+    "Metformin 500 mg twice daily for type 2 diabetes mellitus.",
+    "No known drug allergies.",
+    "MRI of the lumbar spine shows a disc herniation at L4-L5 with mild foraminal narrowing.",
+    "Follow up in two weeks to review the HbA1c and lipid panel.",
+    "BP 142/90, HR 88, afebrile.",
+    "Discharged home in stable condition with instructions to continue anticoagulation.",
+    "sepsis",
+]
+
+
+@pytest.fixture(scope="module")
+def onnx_root(tmp_path_factory):
+    return str(tmp_path_factory.mktemp("onnx"))
+
+
+@pytest.fixture
+def settings_env(monkeypatch):
+    """Settings from the environment set by the test, restored afterwards."""
+    get_settings.cache_clear()
+    monkeypatch.setattr(EmbeddingService, "_instance", None)
+    yield monkeypatch
+    get_settings.cache_clear()
+
+
+def test_int8_export_matches_torch(onnx_root):
+    from sentence_transformers import SentenceTransformer
+    
+    model_name = get_settings().embedding_model
+    reference = SentenceTransformer(model_name, device="cpu").encode(SENTENCES, normalize_embeddings=True)
+    candidate = OnnxEmbeddingModel(model_name, onnx_root, quantize=True, threads=1).encode(
+        SENTENCES, normalize_embeddings=True
+    )
+    
+    deviation = 1 - (np.asarray(reference) * candidate).sum(axis=1)
+    assert deviation.max() <= MAX_DEVIATION
+
+
+def test_service_selects_onnx_backend(onnx_root, settings_env):
+    settings_env.setenv("EMBEDDING_BACKEND", "onnx")
+    settings_env.setenv("EMBEDDING_ONNX_PATH", onnx_root)
+    settings_env.setenv("EMBEDDING_CACHE_ENABLED", "false")
+    service = EmbeddingService()
+    
+    vectors = service.embed_texts(SENTENCES[:2])
+    
+    assert isinstance(service._model, OnnxEmbeddingModel)
+    assert service.model_id.endswith("#onnx-int8")
+    assert np.allclose(np.linalg.norm(vectors, axis=1), 1.0, atol=1e-4)
+
+
+def test_service_rejects_unknown_backend(settings_env):
+    settings_env.setenv("EMBEDDING_BACKEND", "tensorrt")
+    settings_env.setenv("EMBEDDING_CACHE_ENABLED", "false")
+    service = EmbeddingService()
+    
+    service.embed_texts(SENTENCES[:1])
+    
+    # Falls back to mock embeddings rather than failing requests
+    assert service._model is None
@@ -3,5 +3,7 @@ Healthcare Intelligence Platform - Vector Store Package
 """
 
 from .faiss_store import FAISSStore
+from .collection_manager import CollectionManager
+from .sharding import ShardedStore
 
-__all__ = ["FAISSStore"]
+__all__ = ["FAISSStore", "CollectionManager", "ShardedStore"]
@@ -0,0 +1,386 @@
+"""
+Healthcare Intelligence Platform - BM25 Index
+In-process lexical index for exact clinical terms (drug names, codes, lab abbreviations)
+"""
+
+import os
+import re
+import json
+import numpy as np
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+
+# Words joined by . / - stay one token ("e11.9", "mg/dl", "covid-19") and are
+# also indexed by their parts
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[./\-][a-z0-9]+)*")
+TOKEN_SEPARATORS = re.compile(r"[./\-]")
+
+STOPWORDS = frozenset(
+    "a an and are as at be but by for from has have in is it its of on or "
+    "that the this to was were will with".split()
+)
+
+# Merge the unsorted tail into the term-sorted base once it holds this many
+# postings or half as many as the base, whichever is larger
+MIN_MERGE_POSTINGS = 100_000
+
+
+def tokenize(text: str, expand: bool = True) -> List[str]:
+    """
+    Lowercased terms of a text.
+    
+    Args:
+        text: Text to tokenize
+        expand: Follow compound tokens with their parts (indexing side; a
+            query for "e11.9" should not match every "9")
+    """
+    tokens = []
+    for token in TOKEN_PATTERN.findall(text.lower()):
+        if token in STOPWORDS:
+            continue
+        tokens.append(token)
+        if expand and not token.isalnum():
+            tokens.extend(
+                part for part in TOKEN_SEPARATORS.split(token)
+                if part and part not in STOPWORDS
+            )
+    return tokens
+
+
+def reciprocal_rank_fusion(rankings: Sequence[np.ndarray], k: int = 60) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Fuse ranked id lists: each id scores sum(1 / (k + rank)) over the lists
+    it appears in.
+    
+    Args:
+        rankings: Id arrays, best first (negative ids are ignored)
+        k: Rank offset damping the weight of top positions
+    
+    Returns:
+        (scores, ids), best first
+    """
+    ids = []
+    scores = []
+    for ranking in rankings:
+        ranking = np.asarray(ranking, dtype=np.int64)
+        ranks = np.flatnonzero(ranking >= 0)
+        ids.append(ranking[ranks])
+        scores.append(1.0 / (k + 1 + ranks))
+    
+    if not ids:
+        return np.empty(0, dtype=np.float32), np.empty(0, dtype=np.int64)
+    unique, inverse = np.unique(np.concatenate(ids), return_inverse=True)
+    fused = np.bincount(inverse, weights=np.concatenate(scores)).astype(np.float32)
+    order = np.argsort(-fused, kind="stable")
+    return fused[order], unique[order]
+
+
+def _grow(array: np.ndarray, size: int, fill=0) -> np.ndarray:
+    """Return array with room for size entries (capacity doubling)."""
+    if size <= len(array):
+        return array
+    grown = np.full(max(size, 2 * len(array), 1024), fill, dtype=array.dtype)
+    grown[:len(array)] = array
+    return grown
+
+
+class BM25Index:
+    """
+    BM25 inverted index over chunk rows (row == vector id in FAISSStore).
+    
+    Postings live in numpy arrays: a base segment sorted by term (CSR:
+    offsets, rows, term frequencies) plus an append-only tail that new chunks
+    go to, with each term's positions in the tail listed separately. A lookup
+    is a slice of the base plus that term's tail postings, however large the
+    tail has grown; the tail is merged into the base once it holds as many
+    postings as MIN_MERGE_POSTINGS or half the base. Deleted rows are masked
+    until the store compacts and rebuilds the index with take().
+    
+    The index is not synchronized itself: FAISSStore mutates it under the
+    exclusive side of its readers-writer lock and searches under the shared
+    side.
+    """
+    
+    FILES = ("bm25.offsets.npy", "bm25.rows.npy", "bm25.tfs.npy", "bm25.lengths.npy")
+    VOCAB = "bm25.vocab.json"
+    
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        """
+        Args:
+            k1: Term frequency saturation
+            b: Document length normalization
+        """
+        self.k1 = k1
+        self.b = b
+        self._vocab: Dict[str, int] = {}
+        self._df = np.zeros(0, dtype=np.int64)
+        
+        # Base segment: postings of term t are rows/tfs[offsets[t]:offsets[t + 1]]
+        self._offsets = np.zeros(1, dtype=np.int64)
+        self._rows = np.empty(0, dtype=np.int64)
+        self._tfs = np.empty(0, dtype=np.float32)
+        
+        # Tail segment (unsorted), and each term's positions in it
+        self._tail_terms = np.empty(0, dtype=np.int64)
+        self._tail_rows = np.empty(0, dtype=np.int64)
+        self._tail_tfs = np.empty(0, dtype=np.float32)
+        self._n_tail = 0
+        self._tail_positions: Dict[int, List[int]] = {}
+        
+        # Per-row statistics
+        self._lengths = np.empty(0, dtype=np.float32)
+        self._deleted = np.empty(0, dtype=bool)
+        self._n_rows = 0
+        self._n_live = 0
+        self._total_length = 0.0
+    
+    def __len__(self) -> int:
+        return self._n_rows
+    
+    @staticmethod
+    def analyze(texts: List[str]) -> List[Counter]:
+        """Term counts per text; done before taking any lock."""
+        return [Counter(tokenize(text)) for text in texts]
+    
+    def add(self, start: int, counts: List[Counter]):
+        """
+        Index analyzed chunks as rows start, start + 1, ...
+        
+        Rows skipped between the current end and start (deleted before the
+        index was rebuilt) are recorded as deleted.
+        """
+        end = start + len(counts)
+        if start < self._n_rows:
+            raise ValueError(f"BM25 rows must be appended in order (next row {self._n_rows}, got {start})")
+        
+        self._lengths = _grow(self._lengths, end)
+        self._deleted = _grow(self._deleted, end, fill=False)
+        self._deleted[self._n_rows:start] = True
+        self._lengths[self._n_rows:start] = 0
+        
+        n_postings = sum(len(c) for c in counts)
+        self._tail_terms = _grow(self._tail_terms, self._n_tail + n_postings)
+        self._tail_rows = _grow(self._tail_rows, self._n_tail + n_postings)
+        self._tail_tfs = _grow(self._tail_tfs, self._n_tail + n_postings)
+        
+        pos = self._n_tail
+        for row, terms in enumerate(counts, start=start):
+            ids = [self._term_id(term) for term in terms]
+            n = len(ids)
+            self._tail_terms[pos:pos + n] = ids
+            self._tail_rows[pos:pos + n] = row
+            self._tail_tfs[pos:pos + n] = list(terms.values())
+            for position, term_id in enumerate(ids, start=pos):
+                self._tail_positions.setdefault(term_id, []).append(position)
+            pos += n
+            
+            length = sum(terms.values())
+            self._lengths[row] = length
+            self._deleted[row] = False
+            self._total_length += length
+            if ids:
+                self._df[ids] += 1
+        
+        self._n_tail = pos
+        self._n_live += len(counts)
+        self._n_rows = end
+    
+    def _term_id(self, term: str) -> int:
+        term_id = self._vocab.get(term)
+        if term_id is None:
+            term_id = len(self._vocab)
+            self._vocab[term] = term_id
+            self._df = _grow(self._df, term_id + 1)
+        return term_id
+    
+    def delete(self, rows: List[int], counts: List[Counter]):
+        """Mask rows and remove their analyzed terms from the statistics."""
+        for row, terms in zip(rows, counts):
+            if row >= self._n_rows or self._deleted[row]:
+                continue
+            self._deleted[row] = True
+            self._n_live -= 1
+            self._total_length -= float(self._lengths[row])
+            ids = [self._vocab[term] for term in terms if term in self._vocab]
+            if ids:
+                self._df[ids] -= 1
+    
+    def search(
+        self,
+        query: str,
+        k: int,
+        n_rows: Optional[int] = None,
+        candidates: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Top-k rows by BM25 score.
+        
+        Args:
+            query: Query text
+            k: Number of rows to return
+            n_rows: Only rows below this are visible (snapshot bound)
+            candidates: Optional row ids to restrict the search to
+        
+        Returns:
+            (scores, rows), best first
+        """
+        term_ids = sorted({self._vocab[t] for t in tokenize(query, expand=False) if t in self._vocab})
+        if not term_ids or self._n_live == 0 or k <= 0:
+            return np.empty(0, dtype=np.float32), np.empty(0, dtype=np.int64)
+        
+        rows, tfs, terms = self._postings(np.array(term_ids, dtype=np.int64))
+        
+        visible = ~self._deleted[rows]
+        if n_rows is not None:
+            visible &= rows < n_rows
+        if candidates is not None:
+            visible &= np.isin(rows, candidates)
+        rows, tfs, terms = rows[visible], tfs[visible], terms[visible]
+        if len(rows) == 0:
+            return np.empty(0, dtype=np.float32), np.empty(0, dtype=np.int64)
+        
+        df = self._df[terms].astype(np.float32)
+        idf = np.log1p((self._n_live - df + 0.5) / (df + 0.5))
+        avg_length = self._total_length / self._n_live
+        norm = self.k1 * (1 - self.b + self.b * self._lengths[rows] / avg_length)
+        partial = idf * tfs * (self.k1 + 1) / (tfs + norm)
+        
+        unique, inverse = np.unique(rows, return_inverse=True)
+        scores = np.bincount(inverse, weights=partial).astype(np.float32)
+        k = min(k, len(unique))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return scores[top], unique[top]
+    
+    def _postings(self, term_ids: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Concatenated (rows, tfs, term ids) postings of the given terms."""
+        rows, tfs, terms = [], [], []
+        n_base_terms = len(self._offsets) - 1
+        for term_id in term_ids[term_ids < n_base_terms]:
+            start, end = self._offsets[term_id], self._offsets[term_id + 1]
+            rows.append(self._rows[start:end])
+            tfs.append(self._tfs[start:end])
+            terms.append(np.full(end - start, term_id, dtype=np.int64))
+        
+        hits = [p for term_id in term_ids.tolist() for p in self._tail_positions.get(term_id, ())]
+        if hits:
+            hits = np.array(hits, dtype=np.int64)
+            rows.append(self._tail_rows[hits])
+            tfs.append(self._tail_tfs[hits])
+            terms.append(self._tail_terms[hits])
+        
+        if not rows:
+            return (np.empty(0, dtype=np.int64),) * 3
+        return np.concatenate(rows), np.concatenate(tfs), np.concatenate(terms)
+    
+    def needs_merge(self) -> bool:
+        return self._n_tail >= max(MIN_MERGE_POSTINGS, len(self._rows) // 2)
+    
+    def merged_base(self, remap: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Base and tail postings combined into a new term-sorted segment.
+        
+        Read-only, so it can run while searches use the index; install the
+        result with install_base().
+        
+        Args:
+            remap: Optional old row -> new row map (-1 drops the posting)
+        """
+        n_base_terms = len(self._offsets) - 1
+        terms = np.concatenate([
+            np.repeat(np.arange(n_base_terms, dtype=np.int64), np.diff(self._offsets)),
+            self._tail_terms[:self._n_tail]
+        ])
+        rows = np.concatenate([self._rows, self._tail_rows[:self._n_tail]])
+        tfs = np.concatenate([self._tfs, self._tail_tfs[:self._n_tail]])
+        
+        if remap is not None:
+            rows = remap[rows]
+            keep = rows >= 0
+            terms, rows, tfs = terms[keep], rows[keep], tfs[keep]
+        
+        order = np.lexsort((rows, terms))
+        offsets = np.zeros(len(self._vocab) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(terms, minlength=len(self._vocab)), out=offsets[1:])
+        return offsets, rows[order], tfs[order]
+    
+    def install_base(self, base: Tuple[np.ndarray, np.ndarray, np.ndarray]):
+        """Swap in a segment from merged_base() and empty the tail."""
+        self._offsets, self._rows, self._tfs = base
+        self._n_tail = 0
+        self._tail_positions = {}
+    
+    def mapped_arrays(self) -> List[np.ndarray]:
+        """Postings of the base segment (memory-mapped after load)."""
+        return [self._offsets, self._rows, self._tfs]
+    
+    def take(self, rows: np.ndarray) -> "BM25Index":
+        """New index holding only the given rows, renumbered 0..len(rows)-1 (for compaction)."""
+        remap = np.full(self._n_rows, -1, dtype=np.int64)
+        rows = rows[rows < self._n_rows]
+        remap[rows] = np.arange(len(rows), dtype=np.int64)
+        
+        index = BM25Index(self.k1, self.b)
+        index._vocab = dict(self._vocab)
+        index.install_base(self.merged_base(remap))
+        index._set_rows(self._lengths[rows].copy(), self._deleted[rows].copy())
+        return index
+    
+    def _set_rows(self, lengths: np.ndarray, deleted: np.ndarray):
+        """Set per-row statistics and recount document frequencies from the base."""
+        self._lengths = lengths
+        self._deleted = deleted
+        self._n_rows = len(lengths)
+        self._n_live = int(np.count_nonzero(~deleted))
+        self._total_length = float(lengths[~deleted].sum())
+        
+        terms = np.repeat(np.arange(len(self._offsets) - 1, dtype=np.int64), np.diff(self._offsets))
+        live = ~deleted[self._rows] if len(self._rows) else np.empty(0, dtype=bool)
+        self._df = np.bincount(terms[live], minlength=len(self._vocab)).astype(np.int64)
+    
+    def save(self, path: str):
+        """Write the index (tail merged in) next to a store snapshot."""
+        path = Path(path)
+        offsets, rows, tfs = self.merged_base()
+        arrays = (offsets, rows, tfs, self._lengths[:self._n_rows])
+        for name, array in zip(self.FILES, arrays):
+            with open(path / f"{name}.tmp", "wb") as f:
+                np.save(f, array)
+            os.replace(path / f"{name}.tmp", path / name)
+        
+        with open(path / f"{self.VOCAB}.tmp", "w") as f:
+            json.dump({"k1": self.k1, "b": self.b, "terms": list(self._vocab)}, f)
+        os.replace(path / f"{self.VOCAB}.tmp", path / self.VOCAB)
+    
+    @classmethod
+    def exists(cls, path: str) -> bool:
+        return all((Path(path) / name).exists() for name in cls.FILES + (cls.VOCAB,))
+    
+    @classmethod
+    def load(cls, path: str, deleted: Set[int], k1: float = 1.2, b: float = 0.75) -> "BM25Index":
+        """
+        Load a saved index (postings memory-mapped).
+        
+        Args:
+            path: Snapshot directory
+            deleted: Rows deleted in the snapshot
+            k1: Term frequency saturation
+            b: Document length normalization
+        """
+        path = Path(path)
+        with open(path / cls.VOCAB, "r") as f:
+            terms = json.load(f)["terms"]
+        offsets, rows, tfs, lengths = (
+            np.load(path / name, mmap_mode="r") for name in cls.FILES
+        )
+        
+        index = cls(k1, b)
+        index._vocab = {term: i for i, term in enumerate(terms)}
+        index.install_base((np.asarray(offsets), rows, tfs))
+        mask = np.zeros(len(lengths), dtype=bool)
+        if deleted:
+            mask[np.fromiter(deleted, dtype=np.int64)] = True
+        index._set_rows(np.array(lengths), mask)
+        return index
@@ -0,0 +1,143 @@
+"""
+Healthcare Intelligence Platform - Document Centroid Index
+Coarse per-document vectors for two-stage search over large corpora
+"""
+
+import os
+import json
+import numpy as np
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+
+class CentroidIndex:
+    """
+    One vector per document: the normalized mean of its chunk vectors.
+    
+    With far fewer documents than chunks, scoring every centroid exactly is
+    cheap, and the closest documents narrow a query down to the chunks worth
+    comparing. Slots of removed documents are masked out and dropped on save.
+    """
+    
+    INITIAL_CAPACITY = 1024
+    
+    FILE = "centroids.npy"
+    DOCS = "centroids.json"
+    
+    def __init__(self, dimension: int):
+        self.dimension = dimension
+        self._vectors = np.zeros((self.INITIAL_CAPACITY, dimension), dtype=np.float32)
+        self._live = np.zeros(self.INITIAL_CAPACITY, dtype=bool)
+        self._doc_ids: List[str] = []
+        self._slots: Dict[str, int] = {}
+    
+    def __len__(self) -> int:
+        return len(self._slots)
+    
+    @staticmethod
+    def centroid(embeddings: np.ndarray) -> np.ndarray:
+        """Normalized mean of a document's chunk vectors."""
+        centre = np.asarray(embeddings, dtype=np.float32).mean(axis=0)
+        norm = np.linalg.norm(centre)
+        return centre / norm if norm > 0 else centre
+    
+    def _reserve(self, n: int):
+        """Grow storage (doubling) to hold n slots."""
+        capacity = len(self._live)
+        if n <= capacity:
+            return
+        while capacity < n:
+            capacity *= 2
+        
+        vectors = np.zeros((capacity, self.dimension), dtype=np.float32)
+        vectors[:len(self._doc_ids)] = self._vectors[:len(self._doc_ids)]
+        live = np.zeros(capacity, dtype=bool)
+        live[:len(self._doc_ids)] = self._live[:len(self._doc_ids)]
+        self._vectors, self._live = vectors, live
+    
+    def add(self, doc_id: str, embeddings: np.ndarray):
+        """Set a document's centroid from its chunk vectors (re-adding replaces it)."""
+        if len(embeddings) == 0:
+            return
+        slot = self._slots.get(doc_id)
+        if slot is None:
+            slot = len(self._doc_ids)
+            self._reserve(slot + 1)
+            self._doc_ids.append(doc_id)
+            self._slots[doc_id] = slot
+        self._vectors[slot] = self.centroid(embeddings)
+        self._live[slot] = True
+    
+    def remove(self, doc_id: str):
+        slot = self._slots.pop(doc_id, None)
+        if slot is not None:
+            self._live[slot] = False
+    
+    def search(
+        self,
+        queries: np.ndarray,
+        k: int,
+        allowed: Optional[Sequence[str]] = None
+    ) -> List[List[str]]:
+        """
+        The k documents whose centroids score highest per query.
+        
+        Args:
+            queries: Query vectors (n_queries, dimension)
+            k: Number of documents per query
+            allowed: Optional document ids to choose from
+        
+        Returns:
+            One list of document ids per query, best first
+        """
+        n_slots = len(self._doc_ids)
+        if allowed is None:
+            # Score every slot in place and mask removed ones
+            slots = np.arange(n_slots)
+            similarities = queries @ self._vectors[:n_slots].T
+            similarities[:, ~self._live[:n_slots]] = -np.inf
+            k = min(k, len(self._slots))
+        else:
+            slots = np.array(
+                sorted({self._slots[d] for d in allowed if d in self._slots}), dtype=np.int64
+            )
+            similarities = queries @ self._vectors[slots].T
+            k = min(k, len(slots))
+        if k <= 0:
+            return [[] for _ in range(len(queries))]
+        
+        top = np.argpartition(-similarities, k - 1, axis=1)[:, :k]
+        order = np.argsort(-np.take_along_axis(similarities, top, axis=1), axis=1)
+        top = slots[np.take_along_axis(top, order, axis=1)]
+        return [[self._doc_ids[slot] for slot in row] for row in top]
+    
+    def save(self, path: str):
+        """Write live centroids next to a store snapshot."""
+        path = Path(path)
+        slots = np.flatnonzero(self._live[:len(self._doc_ids)])
+        with open(path / f"{self.FILE}.tmp", "wb") as f:
+            np.save(f, self._vectors[slots])
+        os.replace(path / f"{self.FILE}.tmp", path / self.FILE)
+        
+        with open(path / f"{self.DOCS}.tmp", "w") as f:
+            json.dump({"doc_ids": [self._doc_ids[slot] for slot in slots]}, f)
+        os.replace(path / f"{self.DOCS}.tmp", path / self.DOCS)
+    
+    @classmethod
+    def exists(cls, path: str) -> bool:
+        return all((Path(path) / name).exists() for name in (cls.FILE, cls.DOCS))
+    
+    @classmethod
+    def load(cls, path: str, dimension: int) -> "CentroidIndex":
+        path = Path(path)
+        with open(path / cls.DOCS, "r") as f:
+            doc_ids = json.load(f)["doc_ids"]
+        vectors = np.load(path / cls.FILE)
+        
+        index = cls(dimension)
+        index._reserve(len(doc_ids))
+        index._vectors[:len(doc_ids)] = vectors
+        index._live[:len(doc_ids)] = True
+        index._doc_ids = list(doc_ids)
+        index._slots = {doc_id: slot for slot, doc_id in enumerate(doc_ids)}
+        return index
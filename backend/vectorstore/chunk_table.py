@@ -0,0 +1,242 @@
+"""
+Healthcare Intelligence Platform - Chunk Table
+Memory-mapped storage for chunk text
+"""
+
+import os
+import json
+import hashlib
+import unicodedata
+import numpy as np
+from typing import List, Dict, Any, Optional, Set, Tuple
+from pathlib import Path
+from datetime import datetime
+
+
+def content_hash(text: str) -> str:
+    """Hash of a chunk's normalized text (Unicode NFKC, whitespace collapsed)."""
+    normalized = " ".join(unicodedata.normalize("NFKC", text).split())
+    return hashlib.blake2b(normalized.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class ChunkTable:
+    """
+    Chunk text addressed by row (row == vector id).
+    
+    On disk the text is two flat files, so loading only maps them:
+    - chunks.blob: UTF-8 chunk text, concatenated
+    - chunks.offsets.npy: uint64 byte offsets into the blob (n_rows + 1)
+    - chunks.json: format version and row count
+    
+    Rows read from disk stay memory-mapped, so text is only paged in for the
+    rows that are actually returned. Rows appended since the last save live in
+    a plain list until the next save. Chunk and document metadata are kept in
+    the metadata database (see MetadataDB).
+    """
+    
+    FORMAT_VERSION = 2
+    MANIFEST = "chunks.json"
+    
+    # Version 1 kept metadata columns next to the text; read for migration only
+    LEGACY_MANIFEST = "documents.json"
+    LEGACY_COLUMNS = (
+        "chunks.doc.npy",
+        "chunks.index.npy",
+        "chunks.added_at.npy",
+        "documents.rows.npy",
+        "documents.offsets.npy",
+    )
+    
+    def __init__(self):
+        # Memory-mapped base segment
+        self._offsets = np.zeros(1, dtype=np.uint64)
+        self._blob = np.empty(0, dtype=np.uint8)
+        self._base_rows: Optional[np.ndarray] = None  # logical -> physical row after take()
+        
+        # In-memory tail segment
+        self._tail_text: List[str] = []
+    
+    def __len__(self) -> int:
+        return self._n_base + len(self._tail_text)
+    
+    @property
+    def _n_base(self) -> int:
+        if self._base_rows is not None:
+            return len(self._base_rows)
+        return len(self._offsets) - 1
+    
+    def _physical(self, row: int) -> int:
+        """Map a logical base row to its physical row in the mapped blob."""
+        return int(self._base_rows[row]) if self._base_rows is not None else row
+    
+    def append(self, chunks: List[str]) -> List[int]:
+        """
+        Append chunk texts.
+        
+        Args:
+            chunks: Chunk texts in document order
+        
+        Returns:
+            Row ids of the appended chunks
+        """
+        start = len(self)
+        self._tail_text.extend(chunks)
+        return list(range(start, start + len(chunks)))
+    
+    def text(self, row: int) -> str:
+        """Chunk text for a row (paged in from the blob for mapped rows)."""
+        if row >= self._n_base:
+            return self._tail_text[row - self._n_base]
+        
+        p = self._physical(row)
+        start, end = int(self._offsets[p]), int(self._offsets[p + 1])
+        return bytes(self._blob[start:end]).decode("utf-8")
+    
+    def mapped_arrays(self) -> List[np.ndarray]:
+        """Arrays backed by the saved files (for warming the page cache)."""
+        return [self._offsets, self._blob]
+    
+    def take(self, rows: np.ndarray) -> "ChunkTable":
+        """
+        Build a table holding only the given rows, in order.
+        
+        The mapped blob is shared rather than copied; only the row map and the
+        selected in-memory rows are materialized.
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        n_base = self._n_base
+        base_sel = rows[rows < n_base]
+        tail_sel = (rows[rows >= n_base] - n_base).tolist()
+        
+        table = ChunkTable()
+        table._offsets = self._offsets
+        table._blob = self._blob
+        table._base_rows = self._base_rows[base_sel] if self._base_rows is not None else base_sel
+        table._tail_text = [self._tail_text[i] for i in tail_sel]
+        return table
+    
+    def save(self, path: str, deleted: Optional[Set[int]] = None):
+        """
+        Write the text blob and offsets.
+        
+        Files are written next to the targets and renamed into place, so a
+        table that is currently mapped from the same directory stays readable.
+        
+        Args:
+            path: Directory to write to
+            deleted: Rows whose text is dropped (kept as empty slots)
+        """
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+        deleted = deleted or set()
+        n_rows = len(self)
+        
+        # Text blob, streamed row by row
+        offsets = np.zeros(n_rows + 1, dtype=np.uint64)
+        with open(path / "chunks.blob.tmp", "wb") as f:
+            position = 0
+            for row in range(n_rows):
+                if row not in deleted:
+                    data = self.text(row).encode("utf-8")
+                    f.write(data)
+                    position += len(data)
+                offsets[row + 1] = position
+        os.replace(path / "chunks.blob.tmp", path / "chunks.blob")
+        
+        with open(path / "chunks.offsets.npy.tmp", "wb") as f:
+            np.save(f, offsets)
+        os.replace(path / "chunks.offsets.npy.tmp", path / "chunks.offsets.npy")
+        
+        with open(path / f"{self.MANIFEST}.tmp", "w") as f:
+            json.dump({"format_version": self.FORMAT_VERSION, "rows": n_rows}, f)
+        os.replace(path / f"{self.MANIFEST}.tmp", path / self.MANIFEST)
+        
+        # Metadata columns from a version 1 table now live in the database
+        for name in (self.LEGACY_MANIFEST,) + self.LEGACY_COLUMNS:
+            if (path / name).exists():
+                (path / name).unlink()
+    
+    @classmethod
+    def exists(cls, path: str) -> bool:
+        path = Path(path)
+        return (path / cls.MANIFEST).exists() or (path / cls.LEGACY_MANIFEST).exists()
+    
+    @classmethod
+    def is_legacy(cls, path: str) -> bool:
+        """True for a version 1 table whose metadata has not been migrated yet."""
+        path = Path(path)
+        return not (path / cls.MANIFEST).exists() and (path / cls.LEGACY_MANIFEST).exists()
+    
+    @classmethod
+    def load(cls, path: str) -> "ChunkTable":
+        """Open a saved table; the blob and offsets are memory-mapped, not read."""
+        path = Path(path)
+        manifest_path = path / (cls.LEGACY_MANIFEST if cls.is_legacy(path) else cls.MANIFEST)
+        with open(manifest_path, "r") as f:
+            manifest = json.load(f)
+        
+        if manifest.get("format_version") not in (1, cls.FORMAT_VERSION):
+            raise ValueError(f"Unsupported chunk table format: {manifest.get('format_version')}")
+        
+        table = cls()
+        table._offsets = np.load(path / "chunks.offsets.npy", mmap_mode="r")
+        if os.path.getsize(path / "chunks.blob") > 0:
+            table._blob = np.memmap(path / "chunks.blob", dtype=np.uint8, mode="r")
+        
+        return table
+    
+    @classmethod
+    def legacy_records(cls, path: str) -> Tuple[List[Dict[str, Any]], List[tuple]]:
+        """
+        Read the metadata columns of a version 1 table.
+        
+        Returns:
+            (documents as {"id", "metadata"} dicts,
+             chunk rows as (id, doc_id, chunk_index, added_at, deleted) tuples)
+        """
+        path = Path(path)
+        with open(path / cls.LEGACY_MANIFEST, "r") as f:
+            documents = json.load(f)["documents"]
+        
+        doc = np.load(path / "chunks.doc.npy")
+        chunk_index = np.load(path / "chunks.index.npy")
+        added_at = np.load(path / "chunks.added_at.npy")
+        
+        # Tombstoned rows lost their document ordinal; keep them as deleted rows
+        doc_ids = [d["id"] for d in documents] + [""]
+        records = [
+            (row, doc_ids[o], int(i), float(t), int(o < 0))
+            for row, (o, i, t) in enumerate(zip(doc.tolist(), chunk_index, added_at))
+        ]
+        return documents, records
+    
+    @classmethod
+    def from_records(
+        cls,
+        chunks: List[str],
+        metadata: List[Dict[str, Any]],
+        chunk_fields: tuple
+    ) -> Tuple["ChunkTable", List[Dict[str, Any]], List[tuple]]:
+        """
+        Split the legacy list-of-dicts layout (metadata.json) into a table and
+        metadata records in the legacy_records() format.
+        """
+        table = cls()
+        table.append(chunks)
+        
+        documents: Dict[str, Dict[str, Any]] = {}
+        records = []
+        for row, meta in enumerate(metadata):
+            doc_id = meta["document_id"]
+            if not meta.get("deleted"):
+                documents.setdefault(doc_id, {k: v for k, v in meta.items() if k not in chunk_fields})
+            added_at = meta.get("added_at")
+            records.append((
+                row,
+                doc_id,
+                meta.get("chunk_index", 0),
+                datetime.fromisoformat(added_at).timestamp() if added_at else datetime.now().timestamp(),
+                int(bool(meta.get("deleted")))
+            ))
+        
+        return table, [{"id": k, "metadata": v} for k, v in documents.items()], records
@@ -0,0 +1,265 @@
+"""
+Healthcare Intelligence Platform - Collections
+Named, independently persisted vector stores loaded on demand
+"""
+
+import re
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Set
+from loguru import logger
+
+from app.config import get_settings
+from .faiss_store import FAISSStore
+from .sharding import default_store
+
+
+COLLECTION_NAME = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_-]{0,63}$")
+
+
+class _Collection:
+    """Bookkeeping for one collection: its store while loaded, and who is using it."""
+    
+    def __init__(self, name: str):
+        self.name = name
+        self.store: Optional[FAISSStore] = None
+        self.users = 0
+        self.last_used = time.monotonic()
+        # Held while the store is opened or closed, so the two never overlap
+        self.lock = threading.Lock()
+
+
+class CollectionManager:
+    """
+    Named collections (e.g. one per tenant or facility), each a FAISSStore
+    with its own index, metadata database and directory under
+    COLLECTIONS_PATH.
+    
+    A collection is opened on first use. Once it has been idle for
+    COLLECTION_IDLE_SECONDS, or more than COLLECTIONS_MAX_LOADED are open,
+    a background thread checkpoints and closes it, least recently used
+    first; collections pinned by a request in progress are never closed.
+    The unnamed default collection is the FAISSStore singleton (or the
+    ShardedStore with VECTOR_SHARDS set) and always stays loaded; when an
+    index version replaces it, the old store is closed once the last request
+    pinning it has finished.
+    """
+    
+    _instance = None
+    
+    def __new__(cls):
+        """Singleton pattern."""
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance._initialized = False
+        return cls._instance
+    
+    def __init__(self):
+        if self._initialized:
+            return
+        
+        settings = get_settings()
+        self._root = Path(settings.collections_path)
+        self._idle_seconds = settings.collection_idle_seconds
+        self._max_loaded = settings.collections_max_loaded
+        self._collections: "OrderedDict[str, _Collection]" = OrderedDict()  # least recently used first
+        self._default_users: Dict[Any, int] = {}  # requests pinning each default store
+        self._retired: Set[Any] = set()  # replaced default stores to close once unpinned
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._reaper: Optional[threading.Thread] = None
+        self._initialized = True
+    
+    def path(self, name: str) -> Path:
+        if not COLLECTION_NAME.match(name):
+            raise ValueError(
+                f"Invalid collection name: {name!r} (letters, digits, '_' and '-', at most 64)"
+            )
+        return self._root / name
+    
+    @contextmanager
+    def use(self, name: Optional[str], create: bool = False) -> Iterator[FAISSStore]:
+        """Pin a collection's store for the duration of the block (see acquire)."""
+        store = self.acquire(name, create=create)
+        try:
+            yield store
+        finally:
+            self.release(name, store)
+    
+    def acquire(self, name: Optional[str], create: bool = False) -> FAISSStore:
+        """
+        Load a collection if needed and pin it until release(name, store).
+        
+        Args:
+            name: Collection name (None for the default store)
+            create: Create the collection if it does not exist yet
+        
+        Returns:
+            The collection's store
+        
+        Raises:
+            ValueError: Invalid collection name
+            KeyError: Unknown collection and create is False
+        """
+        if name is None:
+            with self._lock:
+                store = default_store()
+                self._default_users[store] = self._default_users.get(store, 0) + 1
+            return store
+        
+        path = self.path(name)
+        if not create and not path.is_dir():
+            raise KeyError(f"Unknown collection: {name}")
+        
+        with self._lock:
+            entry = self._collections.get(name)
+            if entry is None:
+                entry = self._collections[name] = _Collection(name)
+            self._collections.move_to_end(name)
+            entry.users += 1
+        
+        try:
+            with entry.lock:
+                if entry.store is None:
+                    start = time.perf_counter()
+                    # Snapshots write metadata.db, so the working copy is named apart
+                    store = FAISSStore(metadata_path=str(path / "metadata.work.db"))
+                    store.open(str(path))
+                    entry.store = store
+                    logger.info(f"📂 Loaded collection {name} ({time.perf_counter() - start:.2f}s)")
+        except Exception:
+            with self._lock:
+                self._release(entry)
+            raise
+        
+        self._start_reaper()
+        if self.loaded_count() > self._max_loaded:
+            self._wakeup.set()
+        return entry.store
+    
+    def release(self, name: Optional[str], store: Any = None):
+        """
+        Unpin a collection acquired with acquire(name).
+        
+        Args:
+            name: Collection name (None for the default store)
+            store: The store acquire() returned; needed for the default
+                store, which may have been replaced in the meantime
+        """
+        if name is not None:
+            with self._lock:
+                self._release(self._collections[name])
+            return
+        
+        with self._lock:
+            self._default_users[store] -= 1
+            if self._default_users[store]:
+                return
+            del self._default_users[store]
+            if store not in self._retired:
+                return
+            self._retired.discard(store)
+        store.close()
+        logger.info("💤 Closed the replaced default vector store")
+    
+    def retire_default(self, store: FAISSStore):
+        """Close a default store that has been replaced, once no request pins it any more."""
+        with self._lock:
+            if self._default_users.get(store):
+                self._retired.add(store)
+                return
+        store.close()
+    
+    def _release(self, entry: _Collection):
+        # Caller holds self._lock
+        entry.users -= 1
+        entry.last_used = time.monotonic()
+    
+    def loaded_count(self) -> int:
+        with self._lock:
+            return sum(1 for entry in self._collections.values() if entry.store is not None)
+    
+    def unload_idle(self) -> int:
+        """
+        Close collections idle for longer than COLLECTION_IDLE_SECONDS, then
+        the least recently used ones while more than COLLECTIONS_MAX_LOADED
+        are open.
+        
+        Returns:
+            Number of collections closed
+        """
+        now = time.monotonic()
+        with self._lock:
+            loaded = [e for e in self._collections.values() if e.store is not None]
+            excess = len(loaded) - self._max_loaded
+            victims = []
+            for entry in loaded:
+                if entry.users:
+                    continue
+                if excess > 0 or now - entry.last_used >= self._idle_seconds:
+                    victims.append(entry)
+                    excess -= 1
+        
+        return sum(1 for entry in victims if self._unload(entry))
+    
+    def _unload(self, entry: _Collection) -> bool:
+        with entry.lock:
+            with self._lock:
+                # Someone may have pinned it since it was picked
+                if entry.users or entry.store is None:
+                    return False
+                store = entry.store
+            
+            store.close()
+            entry.store = None
+        logger.info(f"💤 Unloaded idle collection {entry.name}")
+        return True
+    
+    def _start_reaper(self):
+        with self._lock:
+            if self._reaper and self._reaper.is_alive():
+                return
+            self._reaper = threading.Thread(target=self._reap, name="collection-reaper", daemon=True)
+            self._reaper.start()
+    
+    def _reap(self):
+        interval = max(1.0, min(self._idle_seconds / 4, 60.0))
+        while True:
+            self._wakeup.wait(interval)
+            self._wakeup.clear()
+            try:
+                self.unload_idle()
+            except Exception as e:
+                logger.error(f"Error unloading collections: {e}")
+    
+    def list_collections(self) -> List[Dict[str, Any]]:
+        """Collections on disk, with whether each is loaded and for how long it has been idle."""
+        names = set()
+        if self._root.is_dir():
+            names = {p.name for p in self._root.iterdir() if p.is_dir() and COLLECTION_NAME.match(p.name)}
+        
+        now = time.monotonic()
+        with self._lock:
+            entries = {name: entry for name, entry in self._collections.items() if name in names}
+            return [
+                {
+                    "name": name,
+                    "loaded": name in entries and entries[name].store is not None,
+                    "in_use": entries[name].users if name in entries else 0,
+                    "idle_seconds": round(now - entries[name].last_used, 1) if name in entries else None
+                }
+                for name in sorted(names)
+            ]
+    
+    def close(self):
+        """Checkpoint and close every loaded collection (shutdown)."""
+        with self._lock:
+            entries = list(self._collections.values())
+        for entry in entries:
+            with entry.lock:
+                if entry.store is not None:
+                    entry.store.close()
+                    entry.store = None
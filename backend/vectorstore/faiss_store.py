@@ -5,12 +5,183 @@ High-performance similarity search for clinical documents
 
 import os
 import json
-import sqlite3
+import fcntl
+import shutil
+import tempfile
+import threading
+import time
+import uuid
 import numpy as np
-from typing import List, Dict, Any, Optional
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Callable, Iterator, List, Dict, Any, Optional, Set, Tuple
 from pathlib import Path
 from loguru import logger
-from datetime import datetime
+
+from app.config import get_settings
+from .bm25_index import BM25Index, reciprocal_rank_fusion
+from .centroid_index import CentroidIndex
+from .chunk_table import ChunkTable, content_hash
+from .metadata_db import MetadataDB
+from .rwlock import ReadWriteLock
+from .tiers import ColdShard, DocumentAccess, TierStats, load_manifest, save_manifest
+from .vector_file import VectorFile, touch_pages
+from .wal import WriteAheadLog
+from .index_factory import (
+    INDEX_TYPES,
+    STORAGE_TYPES,
+    build_index,
+    bytes_per_vector,
+    configure_search,
+    describe_index,
+    describe_storage,
+    exclusion_selector,
+    min_training_points,
+    search_parameters,
+    supports_removal,
+    train_index,
+    with_ids,
+)
+
+# Demotion frees the in-memory index down to this fraction of the budget
+TIER_LOW_WATERMARK = 0.8
+
+# Rows copied at a time when rewriting full-precision vectors
+COPY_BLOCK_ROWS = 65536
+
+_cold_pool: Optional[ThreadPoolExecutor] = None
+_cold_pool_lock = threading.Lock()
+
+
+def _cold_search_pool(workers: int) -> ThreadPoolExecutor:
+    """Threads searching cold shards, shared by every store (FAISS releases the GIL)."""
+    global _cold_pool
+    with _cold_pool_lock:
+        if _cold_pool is None:
+            _cold_pool = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="faiss-cold")
+        return _cold_pool
+
+
+# Working metadata databases this process has claimed (requested path -> (path used, locked file))
+_claimed_databases: Dict[str, Tuple[str, Any]] = {}
+_claimed_databases_lock = threading.Lock()
+
+
+def _try_lock(path: str):
+    """The file at path opened and exclusively locked, or None if another process holds it."""
+    lock = open(path, "w")
+    try:
+        fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        lock.close()
+        return None
+    return lock
+
+
+def _remove_stale_databases(path: Path):
+    """Delete per-process copies of a working database whose process has exited (their lock is free)."""
+    for lock_file in path.parent.glob(f"{path.name}.*.lock"):
+        pid = lock_file.name[len(path.name) + 1:-len(".lock")]
+        if not pid.isdigit():
+            continue
+        lock = _try_lock(str(lock_file))
+        if lock is None:
+            continue
+        try:
+            for suffix in ("", "-wal", "-shm"):
+                Path(f"{path}.{pid}{suffix}").unlink(missing_ok=True)
+            lock_file.unlink(missing_ok=True)
+        finally:
+            lock.close()
+
+
+def _claim_working_database(path: str) -> str:
+    """
+    Claim a working metadata database for this process, for its lifetime.
+    
+    A store starts by clearing its working database, so two processes must
+    never share one. The first process takes the requested path; the others
+    (e.g. further uvicorn --workers without VECTOR_SHARDS, each with its own
+    in-memory store) fall back to <path>.<pid>, removing copies left behind
+    by processes that have exited. Stores of the same process reuse their
+    claim (a collection reloaded after being unloaded).
+    
+    Returns:
+        Path of the database to use
+    """
+    key = str(Path(path).resolve())
+    with _claimed_databases_lock:
+        if key in _claimed_databases:
+            return _claimed_databases[key][0]
+        Path(key).parent.mkdir(parents=True, exist_ok=True)
+        _remove_stale_databases(Path(key))
+        
+        claimed, lock = key, _try_lock(f"{key}.lock")
+        if lock is None:
+            claimed = f"{key}.{os.getpid()}"
+            lock = _try_lock(f"{claimed}.lock")
+            logger.warning(
+                f"Metadata database {key} is in use by another process; this process uses {claimed}. "
+                "Its store is not shared with the other workers (set VECTOR_SHARDS to share one)"
+            )
+        _claimed_databases[key] = (claimed, lock)
+        return claimed
+
+
+# A saved store directory holds its snapshots under snapshots/ and a
+# manifest naming the current one and the last log record it includes
+SNAPSHOT_MANIFEST = "snapshot.json"
+SNAPSHOTS_DIR = "snapshots"
+
+# Index arrays saved by MockFAISSIndex (stores running without FAISS)
+MOCK_INDEX_FILE = "index.mock.npz"
+
+
+def _read_snapshot_manifest(path: Path) -> Optional[Dict[str, Any]]:
+    if not (path / SNAPSHOT_MANIFEST).exists():
+        return None
+    with open(path / SNAPSHOT_MANIFEST, "r") as f:
+        return json.load(f)
+
+
+def snapshot_path(path: str) -> Path:
+    """Directory holding a saved store's snapshot files (the store directory itself in the flat layout)."""
+    path = Path(path)
+    manifest = _read_snapshot_manifest(path)
+    return path / manifest["snapshot"] if manifest else path
+
+
+def snapshot_lsn(path: str) -> int:
+    """Last log record included in a saved store's snapshot (0 if none)."""
+    path = Path(path)
+    manifest = _read_snapshot_manifest(path)
+    if manifest is not None:
+        return manifest["lsn"]
+    # Flat layout: the lsn was kept in wal.checkpoint
+    if (path / "wal.checkpoint").exists():
+        with open(path / "wal.checkpoint", "r") as f:
+            return json.load(f)["lsn"]
+    return 0
+
+
+def _fsync_tree(path: Path):
+    """Flush every file below path, and the directories themselves, to stable storage."""
+    for directory, _, files in os.walk(path):
+        for name in files:
+            fd = os.open(os.path.join(directory, name), os.O_RDONLY)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+        fd = os.open(directory, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+
+class RetiredStoreError(RuntimeError):
+    """A write reached a store that another index version has replaced."""
 
 
 class FAISSStore:
@@ -19,32 +190,121 @@ class FAISSStore:
     
     Features:
     - Fast similarity search across millions of vectors
-    - Metadata storage with SQLite
-    - Persistent storage with save/load
+    - Configurable ANN indexes (IVF-Flat, IVF-PQ, HNSW) with automatic
+      promotion from exact search once the corpus outgrows it
+    - float16 / int8 scalar-quantized vector storage, optionally re-scored
+      against full-precision vectors kept on disk
+    - True deletion through an ID-mapped index, with background compaction
+      once tombstones pass FAISS_COMPACTION_RATIO
+    - Content-hash deduplication: a chunk whose text is already stored
+      references the existing vector, and hits name every owning document
+    - Chunk and document metadata in SQLite (METADATA_DB_PATH), keyed by
+      vector id: filters resolve through its indexes and results hydrate
+      with one query, so resident memory does not grow with the corpus
+    - Persistent storage with save/load (memory-mapped chunk text)
+    - Write-ahead log with periodic checkpoints once opened on a directory
+    - BM25 lexical index over chunk text for keyword and hybrid (RRF) search
+    - Per-document centroid index for two-stage search: the closest
+      documents are picked first, then only their chunks are scored
+    - Memory budget (FAISS_MEMORY_BUDGET_MB): least recently used documents
+      move from the in-memory index to memory-mapped cold shards on disk,
+      which are searched in parallel and merged; cold documents that keep
+      getting hits are promoted back
+    - Standalone instances besides the default singleton, each with its own
+      working metadata database: named collections (CollectionManager) and
+      index versions built or activated next to the live one (IndexVersions)
+    
+    Concurrency: mutations are serialized by a writer lock and prepare their
+    changes (chunk rows, log records, rebuilt indexes) where searches cannot
+    see them, then take the exclusive side of a readers-writer lock only to
+    touch the live index and publish a new StoreSnapshot. Searches run under
+    the shared side against the snapshot they started with, so they never
+    wait for embedding, logging or index rebuilds, and never see part of a
+    document.
     """
     
     _instance = None
     
-    def __new__(cls):
-        """Singleton pattern for vector store."""
+    # Per-chunk fields added by the store; everything else is document metadata
+    CHUNK_FIELDS = ("chunk_id", "document_id", "chunk_index", "added_at", "deleted")
+    
+    def __new__(cls, metadata_path: Optional[str] = None):
+        """Singleton pattern for the default store; a metadata_path gives a standalone instance."""
+        if metadata_path is not None:
+            store = super().__new__(cls)
+            store._initialized = False
+            return store
         if cls._instance is None:
             cls._instance = super().__new__(cls)
             cls._instance._initialized = False
         return cls._instance
     
-    def __init__(self):
-        """Initialize FAISS store."""
+    def __init__(self, metadata_path: Optional[str] = None):
+        """
+        Initialize FAISS store.
+        
+        Args:
+            metadata_path: Working metadata database of a standalone store
+                (the default store uses METADATA_DB_PATH); it must not be a
+                directory's saved metadata.db
+        """
         if self._initialized:
             return
         
         self._dimension = 768
         self._index = None
         self._faiss = None
-        self._chunks: List[str] = []
-        self._metadata: List[Dict] = []
-        self._doc_mapping: Dict[str, List[int]] = {}  # doc_id -> chunk indices
+        self._table = ChunkTable()  # chunk text, row == vector id
+        self._tombstones: Set[int] = set()  # deleted chunk indices awaiting compaction
+        self._unremoved: Set[int] = set()  # tombstones still in the index (HNSW)
+        self._generation = 0  # bumped whenever the store is replaced wholesale
+        self._lock = threading.RLock()  # serializes writers
+        self._rwlock = ReadWriteLock()  # searches (shared) vs. live index mutation
+        self._snapshot: Optional[StoreSnapshot] = None
+        self._compaction_thread: Optional[threading.Thread] = None
+        self._index_thread: Optional[threading.Thread] = None
+        self._trained_on = 0  # vectors the current index was built from
+        self._wal: Optional[WriteAheadLog] = None
+        self._wal_dir: Optional[Path] = None
+        self._checkpoint_thread: Optional[threading.Thread] = None
+        self._shards: List[ColdShard] = []  # cold tier, memory-mapped
+        self._cold_dir: Optional[Path] = None
+        self._tiering_thread: Optional[threading.Thread] = None
+        self._tiering_lock = threading.Lock()  # taken from searches, so not the writer lock
+        self._tier_stats = TierStats()
+        self._maintenance_lock = threading.Lock()  # compaction vs. tier rebalancing
+        self._retired = False  # replaced as the default store; read-only
+        
+        settings = get_settings()
+        if settings.faiss_index_type not in INDEX_TYPES:
+            raise ValueError(
+                f"Unknown FAISS index type: {settings.faiss_index_type}. "
+                f"Supported: {INDEX_TYPES}"
+            )
+        if settings.faiss_vector_storage not in STORAGE_TYPES:
+            raise ValueError(
+                f"Unknown vector storage: {settings.faiss_vector_storage}. "
+                f"Supported: {STORAGE_TYPES}"
+            )
+        self._settings = settings
+        metadata_path = metadata_path or settings.metadata_db_path
+        # Only cleared once no other process can be using it
+        metadata_path = _claim_working_database(metadata_path)
+        self._metadata = MetadataDB(metadata_path)
+        self._metadata.clear()
+        self._bm25 = self._new_bm25()
+        self._centroids = CentroidIndex(self._dimension)
+        self._access = DocumentAccess(settings.faiss_promote_hits)
+        self._index_type = "flat"
+        self._storage = "float32"
+        
+        # Full-precision copies for exact re-scoring of quantized results
+        self._vectors: Optional[VectorFile] = None
+        if settings.faiss_rescore:
+            self._attach_vectors(Path(tempfile.mkdtemp(prefix="faiss-vectors-")))
         
         self._initialize_faiss()
+        self._publish()
         self._initialized = True
     
     def _initialize_faiss(self):
@@ -53,14 +313,224 @@ class FAISSStore:
             import faiss
             self._faiss = faiss
             
-            # Use IndexFlatIP for Inner Product (cosine similarity with normalized vectors)
-            self._index = faiss.IndexFlatIP(self._dimension)
+            # Start exact (IndexFlatIP, cosine on normalized vectors); ANN indexes
+            # need training data and are promoted to once the corpus is large enough
+            self._index = with_ids(faiss, faiss.IndexFlatIP(self._dimension))
+            self._index_type = "flat"
+            self._storage = "float32"
             logger.info(f"✅ FAISS index initialized (dimension={self._dimension})")
             
         except ImportError:
             logger.warning("FAISS not installed, using mock index")
             self._faiss = None
             self._index = MockFAISSIndex(self._dimension)
+            self._index_type = "flat"
+            if self._settings.faiss_index_type != "flat":
+                logger.warning(
+                    f"{self._settings.faiss_index_type} index requires FAISS; using exact search"
+                )
+        self._trained_on = 0
+    
+    def _index_build_target(self) -> Optional[str]:
+        """
+        Index type the in-memory index should be rebuilt as, if any.
+        
+        The exact float32 index is promoted to the configured index once there
+        is enough data to train it: ANN types wait for FAISS_ANN_THRESHOLD
+        vectors, int8 storage for enough vectors to learn value ranges. A
+        trained index (IVF centroids, int8 ranges) is retrained once the
+        corpus has grown FAISS_RETRAIN_FACTOR times past what it was built from.
+        """
+        if self._faiss is None:
+            return None
+        settings = self._settings
+        n_vectors = self._index.ntotal
+        
+        if self._index_type == "flat" and self._storage == "float32":
+            target = settings.faiss_index_type
+            storage = settings.faiss_vector_storage
+            if target == "flat" and storage == "float32":
+                return None
+            required = min_training_points(target, settings.faiss_pq_nbits, storage)
+            if target != "flat":
+                required = max(required, settings.faiss_ann_threshold)
+            return target if n_vectors >= required else None
+        
+        trained = min_training_points(self._index_type, settings.faiss_pq_nbits, self._storage) > 0
+        factor = settings.faiss_retrain_factor
+        if trained and factor > 0 and n_vectors >= factor * max(self._trained_on, 1):
+            return self._index_type
+        return None
+    
+    def _maybe_schedule_index_build(self):
+        """Start a background index build once the index should be promoted or retrained."""
+        if self._index_build_target() is None:
+            return
+        
+        with self._lock:
+            if self._index_thread and self._index_thread.is_alive():
+                return
+            self._index_thread = threading.Thread(
+                target=self.rebuild_index, name="faiss-index-build", daemon=True
+            )
+            self._index_thread.start()
+    
+    def rebuild_index(self) -> bool:
+        """
+        Promote or retrain the in-memory index (see _index_build_target).
+        
+        Like compaction, the new index is trained and filled from a snapshot
+        of the stored vectors outside the lock, so uploads and searches go on
+        against the current index; chunks added or deleted meanwhile are
+        applied to the new index before it is swapped in.
+        
+        Returns:
+            True if a new index was swapped in
+        """
+        with self._maintenance_lock:
+            return self._rebuild_index()
+    
+    def _rebuild_index(self) -> bool:
+        with self._lock:
+            target = self._index_build_target()
+            if target is None:
+                return False
+            
+            generation = self._generation
+            layout = (self._index_type, self._storage)
+            n_rows = len(self._table)
+            ids = self._hot_ids(n_rows)
+            vectors = self._reconstruct(ids)
+        
+        logger.info(f"🏗️ Building {target} index over {len(ids)} vectors")
+        index = self._build_index(target, ids, vectors)
+        
+        with self._lock:
+            if generation != self._generation or layout != (self._index_type, self._storage):
+                logger.info("Vector store changed during the index build, discarding it")
+                return False
+            
+            # Chunks added and deleted while the new index was being built
+            appended = self._hot_ids(len(self._table), start=n_rows)
+            if len(appended):
+                index.add_with_ids(self._reconstruct(appended), appended)
+            deleted = ids[~np.isin(ids, self._hot_ids(n_rows))]
+            unremoved: Set[int] = set()
+            if len(deleted):
+                if supports_removal(target):
+                    index.remove_ids(deleted)
+                else:
+                    unremoved = set(deleted.tolist())
+            
+            with self._rwlock.write():
+                self._index = index
+                self._index_type = target
+                self._storage = describe_storage(self._faiss, index)
+                self._unremoved = unremoved
+                self._trained_on = len(ids) + len(appended)
+                self._publish()
+        
+        logger.info(f"⚡ Rebuilt vector index as {target}/{self._storage} ({index.ntotal} vectors)")
+        return True
+    
+    def _build_index(self, index_type: str, ids: np.ndarray, vectors: np.ndarray):
+        """Build, train and populate an ID-mapped index of the given type."""
+        if self._faiss is None:
+            index = MockFAISSIndex(self._dimension)
+            index.add_with_ids(vectors, ids)
+            return index
+        
+        s = self._settings
+        n_train = min(len(vectors), s.faiss_train_sample_size)
+        
+        index = build_index(
+            self._faiss,
+            index_type,
+            self._dimension,
+            n_train=n_train,
+            nlist=s.faiss_nlist,
+            pq_m=s.faiss_pq_m,
+            pq_nbits=s.faiss_pq_nbits,
+            hnsw_m=s.faiss_hnsw_m,
+            ef_construction=s.faiss_ef_construction,
+            storage=s.faiss_vector_storage
+        )
+        train_index(index, vectors, s.faiss_train_sample_size)
+        index = with_ids(self._faiss, index)
+        if len(vectors):
+            index.add_with_ids(vectors, ids.astype(np.int64))
+        configure_search(self._faiss, index, nprobe=s.faiss_nprobe, ef_search=s.faiss_ef_search)
+        return index
+    
+    def _new_bm25(self) -> BM25Index:
+        return BM25Index(k1=self._settings.bm25_k1, b=self._settings.bm25_b)
+    
+    def _publish(self):
+        """Make the current state visible to searches (caller holds the write lock)."""
+        self._snapshot = StoreSnapshot(self)
+    
+    def _live_ids(self, n_rows: int, start: int = 0) -> np.ndarray:
+        """Chunk indices in [start, n_rows) that have not been deleted."""
+        ids = np.arange(start, n_rows, dtype=np.int64)
+        if self._tombstones:
+            ids = ids[~np.isin(ids, np.fromiter(self._tombstones, dtype=np.int64))]
+        return ids
+    
+    def _hot_ids(self, n_rows: int, start: int = 0) -> np.ndarray:
+        """Live ids in [start, n_rows) kept in the in-memory index rather than a cold shard."""
+        ids = self._live_ids(n_rows, start)
+        for shard in self._shards:
+            ids = ids[~shard.holds(ids)]
+        return ids
+    
+    def _reconstruct(self, ids: np.ndarray, snapshot: Optional["StoreSnapshot"] = None) -> np.ndarray:
+        """
+        Fetch stored vectors by id: exact from the full-precision file when
+        re-scoring is enabled, otherwise decoded from the index or the cold
+        shard holding them (approximate for quantized storage).
+        """
+        if snapshot:
+            index, vectors, shards = snapshot.index, snapshot.vectors, snapshot.shards
+        else:
+            index, vectors, shards = self._index, self._vectors, self._shards
+        if len(ids) == 0:
+            return np.empty((0, self._dimension), dtype=np.float32)
+        if vectors is not None:
+            return vectors.get(ids)
+        return self._reconstruct_indexed(ids, index, shards)
+    
+    def _reconstruct_indexed(self, ids: np.ndarray, index, shards) -> np.ndarray:
+        """Decode vectors from the in-memory index and the cold shards."""
+        ids = ids.astype(np.int64)
+        if not shards:
+            return index.reconstruct_batch(ids)
+        
+        vectors = np.empty((len(ids), self._dimension), dtype=np.float32)
+        hot = np.ones(len(ids), dtype=bool)
+        for shard in shards:
+            held = shard.holds(ids)
+            if held.any():
+                vectors[held] = shard.reconstruct(ids[held])
+                hot &= ~held
+        if hot.any():
+            vectors[hot] = index.reconstruct_batch(ids[hot])
+        return vectors
+    
+    def _attach_vectors(self, directory: Path):
+        """Keep full-precision vectors in directory/vectors.work.f32 (snapshots hold copies)."""
+        self._vectors = VectorFile(str(directory / "vectors.work.f32"), self._dimension)
+    
+    def _rescore(self, vector_file: VectorFile, queries: np.ndarray, ids: np.ndarray, k: int):
+        """Re-rank per-query shortlists by exact inner product against full-precision vectors."""
+        valid = ids >= 0
+        scores = np.full(ids.shape, -np.inf, dtype=np.float32)
+        vectors = vector_file.get(ids[valid])
+        scores[valid] = np.einsum("ij,ij->i", vectors, np.repeat(queries, valid.sum(axis=1), axis=0))
+        
+        order = np.argsort(-scores, axis=1)[:, :k]
+        scores = np.take_along_axis(scores, order, axis=1)
+        ids = np.where(np.isfinite(scores), np.take_along_axis(ids, order, axis=1), -1)
+        return scores, ids
     
     def add_documents(
         self,
@@ -84,195 +554,1503 @@ class FAISSStore:
         if len(chunks) != len(embeddings):
             raise ValueError("Number of chunks must match number of embeddings")
         
-        start_idx = len(self._chunks)
-        chunk_indices = []
+        embeddings = embeddings.astype(np.float32)
+        
+        with self._lock:
+            self._check_writable()
+            if self._wal:
+                self._wal.append_add(doc_id, chunks, embeddings, metadata)
+            duplicates = self._apply_add(doc_id, chunks, embeddings, metadata)
         
-        for i, (chunk, embedding) in enumerate(zip(chunks, embeddings)):
-            idx = start_idx + i
-            chunk_indices.append(idx)
+        logger.info(
+            f"📥 Added {len(chunks)} chunks for document {doc_id}"
+            + (f" ({duplicates} already stored)" if duplicates else "")
+        )
+        self._maybe_schedule_checkpoint()
+        self._maybe_schedule_tiering()
+        return len(chunks)
+    
+    def _apply_add(
+        self,
+        doc_id: str,
+        chunks: List[str],
+        embeddings: np.ndarray,
+        metadata: Optional[Dict]
+    ) -> int:
+        """
+        Append chunks to the table and index (caller holds the lock).
+        
+        Rows past the published snapshot are invisible to searches, so the
+        table, vector file and metadata rows are filled in first; the document
+        becomes searchable at once when its vectors enter the index.
+        
+        Returns:
+            Number of chunks that reused an already stored vector
+        """
+        hashes = [content_hash(chunk) for chunk in chunks]
+        centroid_source = embeddings
+        new_positions, refs = self._dedupe(doc_id, hashes)
+        new_chunks = [chunks[i] for i in new_positions]
+        embeddings = embeddings[new_positions]
+        
+        chunk_indices = self._table.append(new_chunks)
+        if self._vectors is not None and chunk_indices:
+            self._vectors.append(embeddings, chunk_indices[0])
+        self._metadata.add_document(
+            doc_id,
+            [(i, row, hashes[i]) for i, row in zip(new_positions, chunk_indices)],
+            metadata,
+            self.CHUNK_FIELDS,
+            refs=refs,
+            visible_at=len(self._table)
+        )
+        term_counts = BM25Index.analyze(new_chunks)
+        
+        # Add to FAISS index under the chunk indices as ids
+        with self._rwlock.write():
+            self._index.add_with_ids(embeddings, np.array(chunk_indices, dtype=np.int64))
+            if chunk_indices:
+                self._bm25.add(chunk_indices[0], term_counts)
+            self._centroids.add(doc_id, centroid_source)
+            self._publish()
+        if self._tiering_enabled:
+            self._access.touch([doc_id])
+        self._maybe_merge_bm25()
+        self._maybe_schedule_index_build()
+        return len(chunks) - len(new_positions)
+    
+    def _dedupe(self, doc_id: str, hashes: List[str]):
+        """
+        Split a document's chunks into ones to store and ones whose content
+        is already stored.
+        
+        Returns:
+            (positions of chunks needing a new vector,
+             (position, vector id) references to vectors of other documents)
+        """
+        # Under the read lock too, so the ids agree with the index
+        with self._rwlock.read():
+            existing = self._metadata.find_vectors(hashes) if self._settings.faiss_dedup else {}
+        new_positions: List[int] = []
+        refs = []
+        seen = set()
+        for i, h in enumerate(hashes):
+            if h in existing:
+                row, owner = existing[h]
+                # Repeats within the owning document need no second reference
+                if owner != doc_id:
+                    refs.append((i, row))
+            elif h in seen and self._settings.faiss_dedup:
+                continue
+            else:
+                seen.add(h)
+                new_positions.append(i)
+        return new_positions, refs
+    
+    def embed_new_chunks(self, chunks: List[str], embed: Callable[[List[str]], np.ndarray]) -> np.ndarray:
+        """
+        Embed only the chunks whose content is not stored yet.
+        
+        Rows for duplicates are copied from the stored vector (or from their
+        first occurrence in chunks), so the result lines up with chunks and
+        can be passed straight to add_documents.
+        
+        Args:
+            chunks: Chunk texts
+            embed: Embedding function, e.g. EmbeddingService.embed_texts
             
-            self._chunks.append(chunk)
-            self._metadata.append({
-                "chunk_id": f"{doc_id}_{i}",
-                "document_id": doc_id,
-                "chunk_index": i,
-                "added_at": datetime.now().isoformat(),
-                **(metadata or {})
-            })
+        Returns:
+            Embeddings of shape (len(chunks), dimension)
+        """
+        hashes = [content_hash(chunk) for chunk in chunks]
         
-        # Add to FAISS index
-        embeddings = embeddings.astype(np.float32)
-        if self._faiss:
-            self._index.add(embeddings)
-        else:
-            self._index.add(embeddings)
+        # Stored vectors that are already searchable can be reused. Their ids
+        # are looked up under the same read lock as the snapshot: compaction
+        # renumbers the metadata rows and the index together under the write lock
+        reuse: Dict[int, int] = {}
+        with self._rwlock.read():
+            existing = self._metadata.find_vectors(hashes) if self._settings.faiss_dedup else {}
+            snapshot = self._snapshot
+            stored = [
+                (i, existing[h][0]) for i, h in enumerate(hashes)
+                if h in existing and existing[h][0] < snapshot.n_rows
+            ]
+            if stored:
+                try:
+                    vectors = self._reconstruct(np.array([row for _, row in stored], dtype=np.int64), snapshot)
+                    reuse = {i: j for j, (i, _) in enumerate(stored)}
+                except (KeyError, RuntimeError):
+                    vectors = None
         
-        self._doc_mapping[doc_id] = chunk_indices
+        first: Dict[str, int] = {}
+        todo = []
+        for i, h in enumerate(hashes):
+            if i not in reuse and h not in first:
+                first[h] = i
+                todo.append(i)
         
-        logger.info(f"📥 Added {len(chunks)} chunks for document {doc_id}")
-        return len(chunks)
+        embeddings = np.empty((len(chunks), self._dimension), dtype=np.float32)
+        if todo:
+            embeddings[todo] = embed([chunks[i] for i in todo])
+        for i, h in enumerate(hashes):
+            if i in reuse:
+                embeddings[i] = vectors[reuse[i]]
+            elif first[h] != i:
+                embeddings[i] = embeddings[first[h]]
+        
+        if len(todo) < len(chunks):
+            logger.info(f"♻️ Reused embeddings for {len(chunks) - len(todo)}/{len(chunks)} duplicate chunks")
+        return embeddings
+    
+    def _maybe_merge_bm25(self):
+        """Fold the BM25 tail into its sorted base; only the swap blocks searches."""
+        if self._bm25.needs_merge():
+            base = self._bm25.merged_base()
+            with self._rwlock.write():
+                self._bm25.install_base(base)
     
     def search(
         self,
         query_embedding: np.ndarray,
         top_k: int = 5,
-        doc_filter: Optional[List[str]] = None
+        doc_filter: Optional[List[str]] = None,
+        metadata_filter: Optional[Dict[str, Any]] = None,
+        with_vectors: bool = False
     ) -> List[Dict[str, Any]]:
         """
         Search for similar chunks.
         
+        Filters are resolved to vector ids through the inverted indexes and
+        applied inside the search, so a filtered query returns top_k hits
+        whenever that many matching chunks exist.
+        
         Args:
             query_embedding: Query vector
             top_k: Number of results to return
             doc_filter: Optional list of document IDs to filter
+            metadata_filter: Optional document metadata to match, as
+                field -> value or field -> list of accepted values
+            with_vectors: Include each hit's stored vector as "embedding"
+                (read from the same snapshot, e.g. for MMR)
             
         Returns:
             List of search results with content, score, and metadata
         """
-        if len(self._chunks) == 0:
+        if len(self._table) == 0:
             logger.warning("No documents in vector store")
             return []
         
-        # Ensure query is 2D and float32
-        query = query_embedding.reshape(1, -1).astype(np.float32)
+        return self.search_batch(
+            query_embedding.reshape(1, -1),
+            top_k=top_k,
+            doc_filter=doc_filter,
+            metadata_filter=metadata_filter,
+            with_vectors=with_vectors
+        )[0]
+    
+    def search_batch(
+        self,
+        queries: np.ndarray,
+        top_k: int = 5,
+        doc_filter: Optional[List[str]] = None,
+        metadata_filter: Optional[Dict[str, Any]] = None,
+        with_vectors: bool = False
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Search for similar chunks for many queries with a single index call.
         
-        # Search more than needed if filtering
-        search_k = min(top_k * 3 if doc_filter else top_k, len(self._chunks))
+        Args:
+            queries: Query vectors (n_queries, dimension)
+            top_k: Number of results to return per query
+            doc_filter: Optional list of document IDs to filter (all queries)
+            metadata_filter: Optional document metadata to match (all queries)
+            with_vectors: Include each hit's stored vector as "embedding"
+            
+        Returns:
+            One list of search results per query, in query order
+        """
+        queries = np.ascontiguousarray(queries, dtype=np.float32).reshape(-1, self._dimension)
         
-        if self._faiss:
-            scores, indices = self._index.search(query, search_k)
-        else:
-            scores, indices = self._index.search(query, search_k)
+        with self._rwlock.read():
+            snapshot = self._snapshot
+            if snapshot.n_rows == 0 or len(queries) == 0:
+                return [[] for _ in range(len(queries))]
+            
+            candidates = self._candidate_ids(snapshot, doc_filter, metadata_filter)
+            if candidates is None:
+                scores, indices = self._search_index(snapshot, queries, top_k)
+            else:
+                scores, indices = self._search_filtered(snapshot, queries, top_k, candidates)
+            
+            return [
+                self._hydrate(
+                    snapshot, row_scores, row_indices, top_k, doc_filter, metadata_filter, with_vectors
+                )
+                for row_scores, row_indices in zip(scores, indices)
+            ]
+    
+    def search_hybrid(
+        self,
+        query: str,
+        query_embedding: Optional[np.ndarray] = None,
+        top_k: int = 5,
+        doc_filter: Optional[List[str]] = None,
+        metadata_filter: Optional[Dict[str, Any]] = None,
+        with_vectors: bool = False
+    ) -> List[Dict[str, Any]]:
+        """
+        Lexical (BM25) and dense retrieval fused with reciprocal rank fusion.
         
-        results = []
-        for score, idx in zip(scores[0], indices[0]):
-            if idx < 0 or idx >= len(self._chunks):
-                continue
+        Exact tokens such as drug names, ICD codes and lab abbreviations are
+        matched by the BM25 index. Without a query_embedding only the BM25
+        ranking is used, so keyword queries need no embedding model.
+        
+        Args:
+            query: Query text (tokenized for BM25)
+            query_embedding: Optional query vector for the dense ranking
+            top_k: Number of results to return
+            doc_filter: Optional list of document IDs to filter
+            metadata_filter: Optional document metadata to match
+            with_vectors: Include each hit's stored vector as "embedding"
+            
+        Returns:
+            List of search results; score is the fused RRF score (BM25 score
+            in keyword-only mode)
+        """
+        depth = max(top_k, self._settings.hybrid_candidates)
+        
+        with self._rwlock.read():
+            snapshot = self._snapshot
+            if snapshot.n_rows == 0:
+                return []
             
-            meta = self._metadata[idx]
+            candidates = self._candidate_ids(snapshot, doc_filter, metadata_filter)
+            lexical_scores, lexical_rows = snapshot.bm25.search(
+                query, depth, n_rows=snapshot.n_rows, candidates=candidates
+            )
+            if query_embedding is None:
+                return self._hydrate(
+                    snapshot, lexical_scores, lexical_rows, top_k, doc_filter, metadata_filter, with_vectors
+                )
             
-            # Apply document filter if specified
-            if doc_filter and meta["document_id"] not in doc_filter:
-                continue
+            queries = np.ascontiguousarray(query_embedding, dtype=np.float32).reshape(1, -1)
+            if candidates is None:
+                _, dense_rows = self._search_index(snapshot, queries, depth)
+            else:
+                _, dense_rows = self._search_filtered(snapshot, queries, depth, candidates)
+            
+            scores, rows = reciprocal_rank_fusion(
+                [lexical_rows, dense_rows[0]], k=self._settings.hybrid_rrf_k
+            )
+            return self._hydrate(snapshot, scores, rows, top_k, doc_filter, metadata_filter, with_vectors)
+    
+    def search_two_stage(
+        self,
+        query_embedding: np.ndarray,
+        top_k: int = 5,
+        n_documents: Optional[int] = None,
+        doc_filter: Optional[List[str]] = None,
+        metadata_filter: Optional[Dict[str, Any]] = None,
+        with_vectors: bool = False
+    ) -> List[Dict[str, Any]]:
+        """
+        Search the chunks of the documents closest to the query.
+        
+        The document centroid index picks n_documents candidates, and only
+        their chunks are scored, so the cost follows the number of documents
+        and the size of the candidates rather than the whole corpus. Chunks
+        of documents whose centroid ranks lower are not considered.
+        
+        Args:
+            query_embedding: Query vector
+            top_k: Number of results to return
+            n_documents: Candidate documents (defaults to TWO_STAGE_DOCUMENTS)
+            doc_filter: Optional list of document IDs to filter
+            metadata_filter: Optional document metadata to match
+            with_vectors: Include each hit's stored vector as "embedding"
+            
+        Returns:
+            List of search results with content, score, and metadata
+        """
+        n_documents = n_documents or self._settings.two_stage_documents
+        queries = np.ascontiguousarray(query_embedding, dtype=np.float32).reshape(1, -1)
+        
+        with self._rwlock.read():
+            snapshot = self._snapshot
+            if snapshot.n_rows == 0:
+                return []
             
+            allowed = None
+            if doc_filter or metadata_filter:
+                allowed = self._metadata.filter_documents(doc_filter, metadata_filter)
+            documents = snapshot.centroids.search(queries, n_documents, allowed)[0]
+            if not documents:
+                return []
+            candidates = self._metadata.filter_rows(documents, None, snapshot.n_rows)
+            scores, indices = self._search_filtered(snapshot, queries, top_k, candidates)
+            # Shared vectors are attributed to the candidate document
+            return self._hydrate(
+                snapshot, scores[0], indices[0], top_k, documents, metadata_filter, with_vectors
+            )
+    
+    def _hydrate(
+        self,
+        snapshot: "StoreSnapshot",
+        scores,
+        indices,
+        top_k: int,
+        doc_filter: Optional[List[str]] = None,
+        metadata_filter: Optional[Dict[str, Any]] = None,
+        with_vectors: bool = False
+    ):
+        """
+        Turn one query's (score, id) hits into result dicts.
+        
+        A vector shared by several documents is returned once, attributed to
+        its first owner that passes the filters, with every owner listed in
+        document_ids.
+        """
+        hits = []
+        for score, idx in zip(scores, indices):
+            if idx < 0 or idx >= snapshot.n_rows or idx in snapshot.tombstones:
+                continue
+            hits.append((float(score), int(idx)))
+            if len(hits) >= top_k:
+                break
+        
+        # Text and metadata are only read for returned hits, metadata in one query
+        metadata = self._metadata.chunk_metadata([idx for _, idx in hits], snapshot.n_rows)
+        if with_vectors:
+            vectors = self._reconstruct(np.array([idx for _, idx in hits], dtype=np.int64), snapshot)
+        results = []
+        for i, (score, idx) in enumerate(hits):
+            owners = metadata[idx]
+            meta = next((m for m in owners if _matches(m, doc_filter, metadata_filter)), owners[0])
             results.append({
                 "chunk_id": meta["chunk_id"],
                 "document_id": meta["document_id"],
-                "content": self._chunks[idx],
-                "score": float(score),
+                "document_ids": list(dict.fromkeys(m["document_id"] for m in owners)),
+                "content": snapshot.table.text(idx),
+                "score": score,
                 "metadata": meta
             })
-            
-            if len(results) >= top_k:
-                break
+            if with_vectors:
+                results[-1]["embedding"] = vectors[i]
         
+        # Hits keep documents in (or bring them back to) the in-memory index
+        if self._tiering_enabled and self._access.touch(r["document_id"] for r in results):
+            self._maybe_schedule_tiering()
         return results
     
+    def _search_index(self, snapshot: "StoreSnapshot", queries: np.ndarray, k: int, selector=None):
+        """
+        Run one batched index search, excluding vectors awaiting compaction.
+        
+        With re-scoring enabled the index returns a FAISS_RESCORE_FACTOR times
+        larger shortlist that is re-ranked exactly from disk. Cold shards are
+        searched on the cold-search threads while the in-memory index is
+        searched here, and the hits are merged.
+        """
+        top_k = k
+        if snapshot.vectors is not None:
+            k *= self._settings.faiss_rescore_factor
+        
+        pending = self._search_cold(snapshot, queries, k, selector) if snapshot.shards else None
+        start = time.perf_counter()
+        scores, indices = self._search_hot(snapshot, queries, k, selector)
+        hot_ms = (time.perf_counter() - start) * 1000
+        if pending is not None:
+            scores, indices = self._merge_tiers((scores, indices), pending, k, top_k, hot_ms)
+        elif self._tiering_enabled:
+            self._tier_stats.record("hot", hot_ms, int(np.count_nonzero(indices[:, :top_k] >= 0)))
+        
+        if snapshot.vectors is not None:
+            return self._rescore(snapshot.vectors, queries, indices, top_k)
+        return scores, indices
+    
+    def _search_hot(self, snapshot: "StoreSnapshot", queries: np.ndarray, k: int, selector=None):
+        """Search the in-memory index."""
+        index = snapshot.index
+        k = min(k, index.ntotal)
+        if k <= 0:
+            return self._no_hits(len(queries))
+        
+        if selector is None and snapshot.unremoved:
+            # HNSW cannot drop deleted vectors; exclude them until compaction
+            selector = exclusion_selector(self._faiss, list(snapshot.unremoved))
+        
+        if selector is None:
+            return index.search(queries, k)
+        params = search_parameters(
+            self._faiss,
+            snapshot.index_type,
+            selector=selector,
+            nprobe=self._settings.faiss_nprobe,
+            ef_search=self._settings.faiss_ef_search
+        )
+        return index.search(queries, k, params=params)
+    
+    def _search_cold(self, snapshot: "StoreSnapshot", queries: np.ndarray, k: int, selector=None):
+        """Start searching every cold shard in parallel; returns the start time and futures."""
+        pool = _cold_search_pool(self._settings.faiss_cold_search_threads)
+        return time.perf_counter(), [
+            pool.submit(shard.search, self._faiss, queries, k, selector) for shard in snapshot.shards
+        ]
+    
+    def _merge_tiers(self, hot, pending, k: int, top_k: int, hot_ms: float):
+        """Merge in-memory and cold shard hits per query, best first, recording per-tier stats."""
+        start, futures = pending
+        cold = [future.result() for future in futures]
+        cold_ms = (time.perf_counter() - start) * 1000
+        
+        scores = np.concatenate([hot[0]] + [s for s, _ in cold], axis=1)
+        ids = np.concatenate([hot[1]] + [i for _, i in cold], axis=1)
+        scores = np.where(ids >= 0, scores, -np.inf)
+        order = np.argsort(-scores, axis=1, kind="stable")[:, :k]
+        scores = np.take_along_axis(scores, order, axis=1)
+        ids = np.where(np.isfinite(scores), np.take_along_axis(ids, order, axis=1), -1)
+        
+        served = ids[:, :top_k] >= 0
+        from_cold = served & (order[:, :top_k] >= hot[1].shape[1])
+        self._tier_stats.record("hot", hot_ms, int(served.sum() - from_cold.sum()))
+        self._tier_stats.record("cold", cold_ms, int(from_cold.sum()))
+        return scores, ids
+    
+    def _no_hits(self, n_queries: int):
+        return (
+            np.empty((n_queries, 0), dtype=np.float32),
+            np.empty((n_queries, 0), dtype=np.int64)
+        )
+    
+    def _search_filtered(
+        self,
+        snapshot: "StoreSnapshot",
+        queries: np.ndarray,
+        k: int,
+        candidates: np.ndarray
+    ):
+        """
+        Search restricted to candidate ids.
+        
+        Small subsets are scored exactly against their stored vectors, so the
+        cost follows the subset size; large ones go through an IDSelector and
+        fall back to exact scoring if the ANN probe comes back short.
+        """
+        k = min(k, len(candidates))
+        if k <= 0:
+            return self._no_hits(len(queries))
+        
+        if self._faiss is not None and len(candidates) > self._settings.faiss_prefilter_exact_max:
+            selector = self._faiss.IDSelectorBatch(candidates)
+            scores, indices = self._search_index(snapshot, queries, k, selector=selector)
+            if np.all(np.count_nonzero(indices >= 0, axis=1) >= k):
+                return scores, indices
+        
+        vectors = self._reconstruct(candidates, snapshot)
+        similarities = queries @ vectors.T
+        top = np.argpartition(-similarities, k - 1, axis=1)[:, :k]
+        top_scores = np.take_along_axis(similarities, top, axis=1)
+        order = np.argsort(-top_scores, axis=1)
+        top = np.take_along_axis(top, order, axis=1)
+        return np.take_along_axis(top_scores, order, axis=1), candidates[top]
+    
+    def _candidate_ids(
+        self,
+        snapshot: "StoreSnapshot",
+        doc_filter: Optional[List[str]],
+        metadata_filter: Optional[Dict[str, Any]]
+    ) -> Optional[np.ndarray]:
+        """Resolve filters to matching, published vector ids (None when unfiltered)."""
+        if not doc_filter and not metadata_filter:
+            return None
+        
+        # Documents still being appended are not part of the snapshot yet
+        return self._metadata.filter_rows(doc_filter, metadata_filter, snapshot.n_rows)
+    
     def delete_document(self, doc_id: str) -> bool:
         """
         Delete a document from the store.
         
-        Note: FAISS doesn't support deletion efficiently, so we mark as deleted
-        and rebuild periodically in production.
+        Vectors are removed from the index immediately; the chunk slots stay as
+        tombstones until compaction rebuilds the arrays.
         """
-        if doc_id not in self._doc_mapping:
-            return False
+        with self._lock:
+            self._check_writable()
+            if not self._metadata.has_document(doc_id):
+                return False
+            
+            if self._wal:
+                self._wal.append_delete(doc_id)
+            n_chunks = self._apply_delete(doc_id)
+        
+        logger.info(f"🗑️ Deleted document {doc_id} ({n_chunks} chunks)")
+        self._maybe_schedule_compaction()
+        self._maybe_schedule_checkpoint()
+        
+        return True
+    
+    def _apply_delete(self, doc_id: str) -> int:
+        """Remove a document's vectors and tombstone its rows (caller holds the lock)."""
+        # Vectors other documents still reference stay in the index
+        chunk_indices = self._metadata.delete_document(doc_id)
+        term_counts = BM25Index.analyze([self._table.text(i) for i in chunk_indices])
+        
+        with self._rwlock.write():
+            self._remove_ids(np.asarray(chunk_indices, dtype=np.int64))
+            self._bm25.delete(chunk_indices, term_counts)
+            self._centroids.remove(doc_id)
+            self._access.forget(doc_id)
+            # Tombstone the chunk rows until compaction drops them
+            self._tombstones.update(int(i) for i in chunk_indices)
+        return len(chunk_indices)
+    
+    def _remove_ids(self, ids: np.ndarray):
+        """Remove vectors from the index, deferring to compaction where unsupported."""
+        for shard in self._shards:
+            held = shard.holds(ids)
+            if held.any():
+                # Shards are immutable; their deleted ids are skipped until rewritten
+                shard.dead.update(ids[held].tolist())
+                ids = ids[~held]
+        if supports_removal(self._index_type):
+            self._index.remove_ids(ids)
+        else:
+            self._unremoved.update(ids.tolist())
+    
+    def _maybe_schedule_compaction(self):
+        """Start a background compaction once tombstones pass the configured ratio."""
+        ratio = self._settings.faiss_compaction_ratio
+        if ratio <= 0 or not len(self._table):
+            return
+        if len(self._tombstones) / len(self._table) < ratio:
+            return
         
-        # Mark chunks as deleted (set content to empty)
-        for idx in self._doc_mapping[doc_id]:
-            self._chunks[idx] = ""
-            self._metadata[idx]["deleted"] = True
+        with self._lock:
+            if self._compaction_thread and self._compaction_thread.is_alive():
+                return
+            self._compaction_thread = threading.Thread(
+                target=self.compact, name="faiss-compaction", daemon=True
+            )
+            self._compaction_thread.start()
+    
+    def compact(self) -> bool:
+        """
+        Rebuild the index, chunk table and metadata rows without tombstones.
         
-        del self._doc_mapping[doc_id]
-        logger.info(f"🗑️ Marked document {doc_id} as deleted")
+        The new index is built from a snapshot outside the lock, so searches
+        and ingestion continue while it runs; changes made in the meantime are
+        replayed onto the new arrays before they are swapped in. Cold shards
+        are rewritten under the new ids at the end (writers wait for that).
         
+        Returns:
+            True if the store was compacted
+        """
+        with self._maintenance_lock:
+            return self._compact()
+    
+    def _compact(self) -> bool:
+        with self._lock:
+            if not self._tombstones:
+                return False
+            
+            generation = self._generation
+            layout = (self._index_type, self._storage)
+            n_rows = len(self._table)
+            keep = self._live_ids(n_rows)
+            hot = self._hot_ids(n_rows)
+            vectors = self._reconstruct(hot)
+        
+        logger.info(f"🗜️ Compacting vector store ({len(self._tombstones)} tombstones)")
+        new_index = self._build_index(layout[0], np.searchsorted(keep, hot), vectors)
+        new_vectors = None
+        if self._vectors is not None:
+            new_vectors = VectorFile(f"{self._vectors.path}.compact", self._dimension)
+            new_vectors.truncate(0)
+            for start in range(0, len(keep), COPY_BLOCK_ROWS):
+                new_vectors.append(self._vectors.get(keep[start:start + COPY_BLOCK_ROWS]), start)
+        
+        with self._lock:
+            if generation != self._generation or layout != (self._index_type, self._storage):
+                logger.info("Vector store changed during compaction, discarding rebuild")
+                return False
+            
+            # Chunks appended while the new index was being built
+            appended = self._live_ids(len(self._table), start=n_rows)
+            if len(appended):
+                appended_vectors = self._reconstruct(appended)
+                new_index.add_with_ids(
+                    appended_vectors,
+                    np.arange(len(keep), len(keep) + len(appended), dtype=np.int64)
+                )
+                if new_vectors is not None:
+                    new_vectors.append(appended_vectors, len(keep))
+            
+            rows = np.concatenate([keep, appended])
+            remap = np.full(len(self._table), -1, dtype=np.int64)
+            remap[rows] = np.arange(len(rows), dtype=np.int64)
+            
+            table = self._table.take(rows)
+            bm25 = self._bm25.take(rows)
+            shards = [self._remap_shard(shard, remap) for shard in self._shards if len(shard)]
+            self._metadata.prepare_compaction(rows)
+            
+            # Chunks deleted while the new index was being built stay tombstoned
+            tombstones = {int(remap[r]) for r in keep if r in self._tombstones}
+            unremoved: Set[int] = set()
+            if tombstones:
+                if supports_removal(layout[0]):
+                    new_index.remove_ids(np.fromiter(tombstones, dtype=np.int64))
+                else:
+                    unremoved = set(tombstones)
+            
+            with self._rwlock.write():
+                self._index = new_index
+                self._trained_on = len(hot) + len(appended)
+                self._table = table
+                self._bm25 = bm25
+                self._metadata.finish_compaction()
+                self._tombstones = tombstones
+                self._unremoved = unremoved
+                old_shards, self._shards = self._shards, shards
+                if new_vectors is not None:
+                    # Searches still holding the old file keep reading its mapping
+                    new_vectors.replace(self._vectors)
+                    self._vectors = new_vectors
+                self._publish()
+            self._discard_shards(old_shards)
+            
+            # Row ids changed; persist them before the log is replayed against them
+            if self._wal:
+                self.checkpoint()
+        
+        logger.info(f"✅ Compaction finished ({len(rows)} chunks)")
         return True
     
+    @property
+    def _tiering_enabled(self) -> bool:
+        return self._settings.faiss_memory_budget_mb > 0 and self._faiss is not None
+    
+    def _hot_bytes(self) -> Tuple[int, int]:
+        """Resident size of the in-memory index, and bytes per vector."""
+        per_vector = bytes_per_vector(self._faiss, self._index, self._dimension)
+        return self._index.ntotal * per_vector, per_vector
+    
+    def _maybe_schedule_tiering(self):
+        """Rebalance in the background when over budget or a cold document is due for promotion."""
+        if not self._tiering_enabled:
+            return
+        budget = self._settings.faiss_memory_budget_mb * 1024 * 1024
+        if self._hot_bytes()[0] <= budget and not self._access.frequent_cold():
+            return
+        
+        with self._tiering_lock:
+            if self._tiering_thread and self._tiering_thread.is_alive():
+                return
+            self._tiering_thread = threading.Thread(
+                target=self.rebalance, name="faiss-tiering", daemon=True
+            )
+            self._tiering_thread.start()
+    
+    def rebalance(self) -> Dict[str, int]:
+        """
+        Move documents between the in-memory index and cold shards to keep
+        the index within FAISS_MEMORY_BUDGET_MB.
+        
+        Cold documents hit FAISS_PROMOTE_HITS times are loaded back first;
+        then, if the index is over budget, the least recently used documents
+        are written to a new memory-mapped shard until it is under
+        TIER_LOW_WATERMARK of the budget. Writers wait while a pass runs;
+        searches do not.
+        
+        Returns:
+            Number of documents promoted and demoted
+        """
+        if not self._tiering_enabled:
+            return {"promoted": 0, "demoted": 0}
+        
+        with self._maintenance_lock, self._lock:
+            budget = self._settings.faiss_memory_budget_mb * 1024 * 1024
+            promoted = self._promote_documents(budget)
+            demoted = self._demote_documents(budget)
+            self._merge_shards()
+        
+        if promoted or demoted:
+            logger.info(
+                f"🌡️ Rebalanced storage tiers: {promoted} documents promoted, {demoted} demoted "
+                f"({len(self._shards)} cold shards)"
+            )
+        return {"promoted": promoted, "demoted": demoted}
+    
+    def _cold_rows(self, rows: np.ndarray) -> np.ndarray:
+        held = np.zeros(len(rows), dtype=bool)
+        for shard in self._shards:
+            held |= shard.holds(rows)
+        return rows[held]
+    
+    def _promote_documents(self, budget: float) -> int:
+        """
+        Load frequently hit cold documents back into the in-memory index, up
+        to the low watermark in size; less recently used ones make room for
+        them when demoted next (caller holds the lock).
+        """
+        _, per_vector = self._hot_bytes()
+        room = budget * TIER_LOW_WATERMARK
+        documents, rows = [], []
+        for doc_id in self._access.frequent_cold():
+            doc_rows = self._cold_rows(self._metadata.filter_rows([doc_id], None, len(self._table)))
+            if len(doc_rows) * per_vector > room:
+                continue
+            room -= len(doc_rows) * per_vector
+            documents.append(doc_id)
+            rows.append(doc_rows)
+        if not documents:
+            return 0
+        
+        ids = np.unique(np.concatenate(rows))
+        vectors = self._reconstruct(ids)
+        with self._rwlock.write():
+            self._index.add_with_ids(vectors, ids)
+            for shard in self._shards:
+                held = shard.holds(ids)
+                shard.dead.update(ids[held].tolist())
+            self._publish()
+        self._access.promoted(documents)
+        return len(documents)
+    
+    def _demote_documents(self, budget: float) -> int:
+        """Write the least recently used documents to a new cold shard (caller holds the lock)."""
+        hot_bytes, per_vector = self._hot_bytes()
+        if hot_bytes <= budget:
+            return 0
+        
+        to_free = hot_bytes - budget * TIER_LOW_WATERMARK
+        hot_documents = [d for d in self._metadata.filter_documents(None, None) if d not in self._access.cold]
+        documents, rows, freed = [], [], 0
+        for doc_id in self._access.least_recent(hot_documents):
+            if freed >= to_free:
+                break
+            doc_rows = self._metadata.filter_rows([doc_id], None, len(self._table))
+            doc_rows = doc_rows[~np.isin(doc_rows, self._cold_rows(doc_rows))]
+            documents.append(doc_id)
+            rows.append(doc_rows)
+            freed += len(doc_rows) * per_vector
+        ids = np.unique(np.concatenate(rows)) if rows else np.empty(0, dtype=np.int64)
+        if not len(ids):
+            return 0
+        
+        shard = ColdShard.write(self._faiss, self._new_shard_path(), ids, self._reconstruct(ids), self._storage)
+        new_index = None
+        if not supports_removal(self._index_type):
+            # HNSW cannot drop nodes; rebuild it from the rows that stay
+            remaining = self._hot_ids(len(self._table))
+            remaining = remaining[~np.isin(remaining, ids)]
+            new_index = self._build_index(self._index_type, remaining, self._reconstruct(remaining))
+        
+        with self._rwlock.write():
+            if new_index is None:
+                self._index.remove_ids(ids)
+            else:
+                self._index = new_index
+                self._trained_on = len(remaining)
+                self._unremoved = set()
+            self._shards = self._shards + [shard]
+            self._publish()
+        self._access.demoted(documents)
+        return len(documents)
+    
+    def _merge_shards(self):
+        """
+        Drop emptied shards, and rewrite mostly-dead shards and (past
+        FAISS_COLD_MAX_SHARDS) the smallest ones into one (caller holds the lock).
+        """
+        shards = [shard for shard in self._shards if len(shard)]
+        merge = [shard for shard in shards if len(shard.dead) > len(shard.ids) // 2]
+        excess = len(shards) - self._settings.faiss_cold_max_shards
+        if excess > 0:
+            smallest = [shard for shard in sorted(shards, key=len) if shard not in merge]
+            merge += smallest[:excess + 1]
+        if len(shards) == len(self._shards) and not merge:
+            return
+        
+        if merge:
+            ids = np.sort(np.concatenate([shard.live_ids() for shard in merge]))
+            vectors = self._reconstruct_indexed(ids, self._index, merge)
+            merged = ColdShard.write(self._faiss, self._new_shard_path(), ids, vectors, self._storage)
+            shards = [shard for shard in shards if shard not in merge] + [merged]
+        
+        old_shards = self._shards
+        with self._rwlock.write():
+            self._shards = shards
+            self._publish()
+        self._discard_shards([shard for shard in old_shards if shard not in shards])
+    
+    def _remap_shard(self, shard: ColdShard, remap: np.ndarray) -> ColdShard:
+        """Rewrite a shard under compacted ids."""
+        live = shard.live_ids()
+        return ColdShard.write(
+            self._faiss, self._new_shard_path(), remap[live], shard.reconstruct(live), self._storage
+        )
+    
+    def _new_shard_path(self) -> Path:
+        if self._cold_dir is None:
+            self._cold_dir = Path(tempfile.mkdtemp(prefix="faiss-cold-"))
+        return self._cold_dir / f"shard-{uuid.uuid4().hex[:12]}"
+    
+    def _discard_shards(self, shards: List[ColdShard]):
+        """
+        Delete the files of shards no longer in use, if they are in this
+        store's temporary cold directory. Shards of a saved directory may
+        still be listed by its tiers.json; save() removes them instead.
+        """
+        if self._wal_dir is not None:
+            return
+        for shard in shards:
+            if shard.path.parent == self._cold_dir:
+                for file in shard.files:
+                    file.unlink(missing_ok=True)
+    
+    def tier_stats(self) -> Dict[str, Any]:
+        """Size of each storage tier, and per-tier searches, hit rates and latency."""
+        hot_bytes, _ = self._hot_bytes()
+        return {
+            "memory_budget_mb": self._settings.faiss_memory_budget_mb,
+            "hot_chunks": self._index.ntotal,
+            "hot_mb": round(hot_bytes / (1024 * 1024), 2),
+            "cold_chunks": sum(len(shard) for shard in self._shards),
+            "cold_documents": len(self._access.cold),
+            "cold_shards": len(self._shards),
+            "cold_mb_on_disk": round(sum(shard.size_bytes for shard in self._shards) / (1024 * 1024), 2),
+            **self._tier_stats.summary()
+        }
+    
+    def export_documents(self) -> Iterator[Tuple[str, List[str], Dict[str, Any]]]:
+        """
+        Every live document as (doc_id, chunk texts, metadata), e.g. to
+        re-embed the corpus into a new index version.
+        
+        Holds the writer lock while iterating, so the store cannot change
+        (and searches are not blocked) until the iteration finishes.
+        """
+        with self._lock:
+            for doc_id, metadata, rows in self._metadata.documents():
+                yield doc_id, [self._table.text(int(row)) for row in rows], metadata
+    
+    @property
+    def lsn(self) -> Optional[int]:
+        """Sequence number of the last logged mutation (None unless opened on a directory)."""
+        return self._wal.lsn if self._wal else None
+    
+    @classmethod
+    def install_default(cls, store: "FAISSStore"):
+        """Make a standalone store the one FAISSStore() returns from now on."""
+        cls._instance = store
+    
+    @contextmanager
+    def writes_blocked(self) -> Iterator[Optional[int]]:
+        """Hold off writes for the duration of the block; yields the current LSN."""
+        with self._lock:
+            yield self.lsn
+    
+    def retire(self):
+        """
+        Reject writes from now on (RetiredStoreError), e.g. once another index
+        version has replaced this store: they would never reach the new
+        version. Searches keep working until the store is closed.
+        """
+        with self._lock:
+            self._retired = True
+    
+    def _check_writable(self):
+        if self._retired:
+            raise RetiredStoreError(
+                "The index version this request was using has been replaced; retry the request"
+            )
+    
+    def warmup(self, n_queries: int = 8) -> Dict[str, Any]:
+        """
+        Prepare a loaded store for traffic: page in the memory-mapped chunk
+        text, BM25 postings and full-precision vectors, then run a batch of
+        random queries and a keyword query through the indexes.
+        
+        Args:
+            n_queries: Size of the dummy query batch
+            
+        Returns:
+            Bytes paged in and time taken
+        """
+        start = time.perf_counter()
+        with self._rwlock.read():
+            snapshot = self._snapshot
+            arrays = snapshot.table.mapped_arrays() + snapshot.bm25.mapped_arrays()
+            if snapshot.vectors is not None:
+                arrays += snapshot.vectors.mapped_arrays()
+            paged = sum(touch_pages(array) for array in arrays)
+        
+        if snapshot.n_rows:
+            rng = np.random.default_rng(0)
+            queries = rng.standard_normal((n_queries, self._dimension)).astype(np.float32)
+            queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+            self.search_batch(queries, top_k=10)
+            self.search_hybrid("patient", top_k=10)
+        
+        elapsed = time.perf_counter() - start
+        logger.info(f"🔥 Warmed vector store ({paged / (1024 * 1024):.1f} MB paged in, {elapsed:.2f}s)")
+        return {"paged_mb": round(paged / (1024 * 1024), 2), "seconds": round(elapsed, 3)}
+    
     def get_stats(self) -> Dict[str, Any]:
         """Get vector store statistics."""
-        active_chunks = sum(1 for c in self._chunks if c)
+        active_chunks = len(self._table) - len(self._tombstones)
+        hot_chunks = active_chunks - sum(len(shard) for shard in self._shards)
         
         return {
-            "total_documents": len(self._doc_mapping),
+            "total_documents": self._metadata.count_documents(),
             "total_chunks": active_chunks,
+            "deleted_chunks": len(self._tombstones),
+            "deduplicated_chunks": self._metadata.count_refs(),
             "index_size_mb": round(
-                (active_chunks * self._dimension * 4) / (1024 * 1024), 2
+                (hot_chunks * bytes_per_vector(self._faiss, self._index, self._dimension))
+                / (1024 * 1024), 2
             ),
-            "dimension": self._dimension
+            "vector_storage": self._storage,
+            "full_precision_mb_on_disk": round(
+                self._vectors.size_bytes / (1024 * 1024), 2
+            ) if self._vectors is not None else 0,
+            "dimension": self._dimension,
+            "index_type": self._index_type,
+            "tiers": self.tier_stats()
         }
     
     def save(self, path: str):
-        """Save index and metadata to disk."""
+        """
+        Save index, chunk text and metadata database to disk.
+        
+        The files are written to a new directory under path/snapshots, which
+        is then switched to by replacing path/snapshot.json: it names the
+        snapshot and the last log record it includes. A crash part way leaves
+        the previous snapshot current, so load() never sees a partial one.
+        Older snapshots are removed after the switch.
+        """
         path = Path(path)
-        path.mkdir(parents=True, exist_ok=True)
         
-        # Save FAISS index
-        if self._faiss:
-            self._faiss.write_index(self._index, str(path / "index.faiss"))
+        with self._lock:
+            lsn = self._wal.lsn if self._wal else 0
+            name = f"{lsn:012d}-{uuid.uuid4().hex[:8]}"
+            snapshot = path / SNAPSHOTS_DIR / name
+            tmp = snapshot.with_name(f"{name}.tmp")
+            tmp.mkdir(parents=True)
+            
+            # Save the index (the mock keeps its vectors, which exist nowhere else)
+            if self._faiss:
+                self._faiss.write_index(self._index, str(tmp / "index.faiss"))
+            else:
+                self._index.save(str(tmp / MOCK_INDEX_FILE))
+            
+            # Save chunk text, and a consistent copy of the metadata database
+            self._table.save(str(tmp), deleted=self._tombstones)
+            self._metadata.save(str(tmp / "metadata.db"))
+            self._bm25.save(str(tmp))
+            self._centroids.save(str(tmp))
+            self._save_tiers(path, tmp)
+            
+            if self._vectors is not None:
+                self._vectors.copy_to(str(tmp / "vectors.f32"))
+            
+            # The log is truncated once the snapshot is current, so it must be durable first
+            if self._settings.faiss_wal_fsync:
+                _fsync_tree(tmp)
+                if (path / "cold").is_dir():
+                    _fsync_tree(path / "cold")
+            os.replace(tmp, snapshot)
+            
+            with open(path / f"{SNAPSHOT_MANIFEST}.tmp", "w") as f:
+                json.dump({"lsn": lsn, "snapshot": f"{SNAPSHOTS_DIR}/{name}"}, f)
+                if self._settings.faiss_wal_fsync:
+                    f.flush()
+                    os.fsync(f.fileno())
+            os.replace(path / f"{SNAPSHOT_MANIFEST}.tmp", path / SNAPSHOT_MANIFEST)
+            if self._settings.faiss_wal_fsync:
+                _fsync_tree(path / SNAPSHOTS_DIR)
+            
+            self._remove_stale_snapshots(path, name)
         
-        # Save metadata
-        with open(path / "metadata.json", "w") as f:
-            json.dump({
-                "chunks": self._chunks,
-                "metadata": self._metadata,
-                "doc_mapping": self._doc_mapping
-            }, f)
+        logger.info(f"💾 Saved vector store to {snapshot}")
+    
+    def _save_tiers(self, path: Path, snapshot: Path):
+        """Copy the cold shards into path/cold and list them in the snapshot's tiers.json."""
+        cold_dir = path / "cold"
+        for shard in self._shards:
+            for file in shard.files:
+                target = cold_dir / file.name
+                # Shards are immutable: a file already there (e.g. the opened directory) is current
+                if not target.exists():
+                    cold_dir.mkdir(parents=True, exist_ok=True)
+                    shutil.copyfile(file, f"{target}.tmp")
+                    os.replace(f"{target}.tmp", target)
+        save_manifest(snapshot, self._shards, self._access.cold)
+    
+    def _remove_stale_snapshots(self, path: Path, current: str):
+        """Remove snapshots other than the current one, and shard files it does not list."""
+        for entry in (path / SNAPSHOTS_DIR).iterdir():
+            if entry.name != current:
+                shutil.rmtree(entry, ignore_errors=True)
         
-        logger.info(f"💾 Saved vector store to {path}")
+        cold_dir = path / "cold"
+        if cold_dir.is_dir():
+            used = {file.name for shard in self._shards for file in shard.files}
+            for file in cold_dir.iterdir():
+                if file.name not in used:
+                    file.unlink()
     
     def load(self, path: str):
-        """Load index and metadata from disk."""
+        """Load index, chunk text and metadata from disk (chunk text is memory-mapped)."""
         path = Path(path)
         
         if not path.exists():
             logger.warning(f"Index path {path} does not exist")
             return
         
-        # Load FAISS index
-        if self._faiss and (path / "index.faiss").exists():
-            self._index = self._faiss.read_index(str(path / "index.faiss"))
+        # Only the snapshot the manifest names is read
+        snapshot = snapshot_path(str(path))
+        
+        with self._lock, self._rwlock.write():
+            self._generation += 1
+            
+            # Load FAISS index
+            if self._faiss and (snapshot / "index.faiss").exists():
+                self._index = self._faiss.read_index(str(snapshot / "index.faiss"))
+                self._trained_on = self._index.ntotal
+                self._index_type = describe_index(self._faiss, self._index)
+                self._storage = describe_storage(self._faiss, self._index)
+                configure_search(
+                    self._faiss,
+                    self._index,
+                    nprobe=self._settings.faiss_nprobe,
+                    ef_search=self._settings.faiss_ef_search
+                )
+            elif (snapshot / MOCK_INDEX_FILE).exists():
+                saved = MockFAISSIndex.load(str(snapshot / MOCK_INDEX_FILE), self._dimension)
+                # Saved without FAISS; rebuilt as a flat index once FAISS is installed
+                self._index = saved if self._faiss is None else self._build_index("flat", *saved.arrays())
+                self._index_type = "flat"
+            
+            # Load chunk text and metadata, migrating older layouts into the database
+            if ChunkTable.exists(str(snapshot)):
+                self._table = ChunkTable.load(str(snapshot))
+                if ChunkTable.is_legacy(str(snapshot)):
+                    self._migrate_metadata(*ChunkTable.legacy_records(str(snapshot)))
+                else:
+                    self._metadata.restore(str(snapshot / "metadata.db"))
+            elif (path / "metadata.json").exists():
+                self._load_legacy_metadata(path / "metadata.json")
+            
+            self._tombstones = self._metadata.deleted_rows()
+            self._unremoved = set() if supports_removal(self._index_type) else set(self._tombstones)
+            self._load_tiers(path, snapshot)
+            self._backfill_hashes()
+            self._upgrade_legacy_index()
+            self._load_vectors(snapshot)
+            self._load_bm25(snapshot)
+            self._load_centroids(snapshot)
+            self._publish()
+        
+        logger.info(f"📂 Loaded vector store from {snapshot}")
+    
+    def _load_tiers(self, path: Path, snapshot: Path):
+        """Open the cold shards (in path/cold) a snapshot lists, memory-mapped where they are."""
+        manifest = load_manifest(snapshot)
+        self._access.clear()
+        self._shards = []
+        if not manifest["shards"]:
+            return
+        if self._faiss is None:
+            logger.warning(f"Cold shards in {path} require FAISS; their chunks are not searchable")
+            return
+        
+        self._shards = [
+            ColdShard.open(self._faiss, path / "cold" / shard["name"], shard["dead"])
+            for shard in manifest["shards"]
+        ]
+        self._access.demoted(manifest["cold_documents"])
+        logger.info(f"🧊 Opened {len(self._shards)} cold shards ({sum(len(s) for s in self._shards)} chunks)")
+    
+    def _load_vectors(self, path: Path):
+        """Restore full-precision vectors saved alongside a snapshot."""
+        if self._vectors is None:
+            return
+        
+        if (path / "vectors.f32").exists():
+            VectorFile(str(path / "vectors.f32"), self._dimension).copy_to(str(self._vectors.path))
+            self._vectors = VectorFile(str(self._vectors.path), self._dimension)
+            # Rows past the snapshot belong to log records that are about to be replayed
+            self._vectors.truncate(len(self._table))
+        else:
+            self._vectors.truncate(0)
+        
+        start = len(self._vectors)
+        live = self._live_ids(len(self._table), start=start)
+        if len(live):
+            logger.warning(f"Rebuilding {len(live)} full-precision vectors from the index")
+            vectors = np.zeros((len(self._table) - start, self._dimension), dtype=np.float32)
+            vectors[live - start] = self._reconstruct_indexed(live, self._index, self._shards)
+            self._vectors.append(vectors, start)
+    
+    def _load_bm25(self, path: Path):
+        """Load the lexical index saved with a snapshot, or rebuild it from chunk text."""
+        s = self._settings
+        if BM25Index.exists(str(path)):
+            self._bm25 = BM25Index.load(str(path), self._tombstones, k1=s.bm25_k1, b=s.bm25_b)
+            if len(self._bm25) == len(self._table):
+                return
+        
+        logger.info("Building BM25 index from stored chunks")
+        self._bm25 = self._new_bm25()
+        live = self._metadata.live_rows()
+        # Add runs of consecutive live rows; the gaps between them stay deleted
+        for rows in np.split(live, np.flatnonzero(np.diff(live) != 1) + 1):
+            if len(rows):
+                texts = [self._table.text(int(r)) for r in rows]
+                self._bm25.add(int(rows[0]), BM25Index.analyze(texts))
+        self._bm25.install_base(self._bm25.merged_base())
+    
+    def _load_centroids(self, path: Path):
+        """Load the document centroids saved with a snapshot, or rebuild them from the vectors."""
+        if CentroidIndex.exists(str(path)):
+            self._centroids = CentroidIndex.load(str(path), self._dimension)
+            return
+        
+        logger.info("Building document centroids from stored vectors")
+        self._centroids = CentroidIndex(self._dimension)
+        for doc_id, _, rows in self._metadata.documents():
+            self._centroids.add(doc_id, self._reconstruct(rows))
+    
+    def _load_legacy_metadata(self, metadata_path: Path):
+        """Read a store saved as a single metadata.json (chunks + metadata dicts)."""
+        with open(metadata_path, "r") as f:
+            data = json.load(f)
+        
+        self._table, documents, records = ChunkTable.from_records(
+            data["chunks"], data["metadata"], self.CHUNK_FIELDS
+        )
+        self._migrate_metadata(documents, records)
+    
+    def _backfill_hashes(self):
+        """Hash the text of chunks stored before deduplication existed."""
+        rows = self._metadata.rows_without_hash()
+        if rows:
+            logger.info(f"Hashing {len(rows)} stored chunks for deduplication")
+            self._metadata.set_hashes((content_hash(self._table.text(row)), row) for row in rows)
+    
+    def _migrate_metadata(self, documents: List[Dict[str, Any]], records: List[tuple]):
+        """Fill the metadata database from a snapshot saved before it existed."""
+        logger.info(f"Migrating metadata for {len(documents)} documents into {self._metadata.path}")
+        self._metadata.clear()
+        live = {doc["id"] for doc in documents}
+        for doc in documents:
+            self._metadata.add_document(doc["id"], [], doc["metadata"], self.CHUNK_FIELDS)
+        # Rows of documents that no longer exist are kept as tombstones
+        self._metadata.add_chunks(
+            (row, doc_id, chunk_index, added_at, int(deleted or doc_id not in live))
+            for row, doc_id, chunk_index, added_at, deleted in records
+        )
+    
+    def _upgrade_legacy_index(self):
+        """
+        Convert indexes saved before ID mapping (positional ids, deleted
+        vectors still present) into the ID-mapped layout.
+        """
+        if self._faiss is None or self._index_type != "flat":
+            return
+        if isinstance(self._faiss.downcast_index(self._index), self._faiss.IndexIDMap2):
+            return
+        
+        vectors = self._index.reconstruct_n(0, self._index.ntotal)
+        ids = np.arange(len(vectors), dtype=np.int64)
+        self._index = with_ids(self._faiss, self._faiss.IndexFlatIP(self._dimension))
+        self._index.add_with_ids(vectors, ids)
+        if self._tombstones:
+            self._index.remove_ids(np.fromiter(self._tombstones, dtype=np.int64))
+    
+    def open(self, path: str):
+        """
+        Open a durable store directory: load its snapshot, replay the
+        write-ahead log on top, and log every later mutation to it.
+        
+        Args:
+            path: Store directory (snapshot.json, snapshots/, cold/, wal.log)
+        """
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+        
+        with self._lock:
+            self.close()
+            self._reset()
+            if self._vectors is not None:
+                self._attach_vectors(path)
+            if ChunkTable.exists(str(snapshot_path(str(path)))) or (path / "metadata.json").exists():
+                self.load(str(path))
+            elif self._vectors is not None:
+                self._vectors.truncate(0)
+            
+            checkpoint_lsn = snapshot_lsn(str(path))
+            
+            wal = WriteAheadLog(
+                str(path / "wal.log"),
+                fsync=self._settings.faiss_wal_fsync
+            )
+            replayed = 0
+            for record in wal.replay(after_lsn=checkpoint_lsn):
+                self._apply_record(record)
+                replayed += 1
+            
+            wal.open()
+            self._wal = wal
+            self._wal_dir = path
+            self._cold_dir = path / "cold"
+        
+        logger.info(f"📂 Opened vector store at {path} (replayed {replayed} log records)")
+        self._maybe_schedule_tiering()
+    
+    def _apply_record(self, record: Dict[str, Any]):
+        """Re-apply a write-ahead log record."""
+        if record["op"] == "add":
+            self._apply_add(
+                record["doc_id"],
+                record["chunks"],
+                record["embeddings"],
+                record.get("metadata")
+            )
+        elif record["op"] == "delete":
+            if self._metadata.has_document(record["doc_id"]):
+                self._apply_delete(record["doc_id"])
+        elif record["op"] == "clear":
+            with self._rwlock.write():
+                self._reset()
+                if self._vectors is not None:
+                    self._vectors.truncate(0)
+    
+    def checkpoint(self):
+        """
+        Write a full snapshot into the opened directory and truncate the log.
+        
+        The snapshot's manifest records the last applied lsn, so a crash
+        between the snapshot and the truncation never replays a record twice.
+        """
+        if self._wal is None:
+            return
+        
+        with self._lock:
+            self.save(str(self._wal_dir))
+            self._wal.truncate()
+            
+            # Serve chunk text from the files just written rather than from memory
+            table = ChunkTable.load(str(snapshot_path(str(self._wal_dir))))
+            with self._rwlock.write():
+                self._table = table
+                self._publish()
         
-        # Load metadata
-        if (path / "metadata.json").exists():
-            with open(path / "metadata.json", "r") as f:
-                data = json.load(f)
-                self._chunks = data["chunks"]
-                self._metadata = data["metadata"]
-                self._doc_mapping = data["doc_mapping"]
+        logger.info(f"✅ Checkpointed vector store at lsn {self._wal.lsn}")
+    
+    def _maybe_schedule_checkpoint(self):
+        """Checkpoint in the background once the log passes FAISS_WAL_CHECKPOINT_MB."""
+        if self._wal is None:
+            return
+        if self._wal.size < self._settings.faiss_wal_checkpoint_mb * 1024 * 1024:
+            return
         
-        logger.info(f"📂 Loaded vector store from {path}")
+        with self._lock:
+            if self._checkpoint_thread and self._checkpoint_thread.is_alive():
+                return
+            self._checkpoint_thread = threading.Thread(
+                target=self.checkpoint, name="faiss-checkpoint", daemon=True
+            )
+            self._checkpoint_thread.start()
+    
+    def close(self):
+        """Checkpoint and stop logging to the opened directory."""
+        with self._lock:
+            if self._wal is None:
+                return
+            self.checkpoint()
+            self._wal.close()
+            self._wal = None
+            self._wal_dir = None
+            self._cold_dir = None
     
     def clear(self):
         """Clear all data from the store."""
-        self._chunks = []
-        self._metadata = []
-        self._doc_mapping = {}
-        self._initialize_faiss()
+        with self._lock:
+            self._check_writable()
+            if self._wal:
+                self._wal.append_clear()
+            with self._rwlock.write():
+                self._reset()
+                if self._vectors is not None:
+                    self._vectors.truncate(0)
         logger.info("🧹 Cleared vector store")
+    
+    def _reset(self):
+        """Drop all data and start a fresh index (caller holds the lock)."""
+        with self._lock, self._rwlock.write():
+            self._generation += 1
+            self._table = ChunkTable()
+            self._bm25 = self._new_bm25()
+            self._centroids = CentroidIndex(self._dimension)
+            self._metadata.clear()
+            self._shards = []
+            self._access.clear()
+            self._tombstones = set()
+            self._unremoved = set()
+            self._initialize_faiss()
+            self._publish()
+
+
+def _matches(
+    meta: Dict[str, Any],
+    doc_filter: Optional[List[str]],
+    metadata_filter: Optional[Dict[str, Any]]
+) -> bool:
+    """Whether a chunk's metadata passes the search filters."""
+    if doc_filter and meta["document_id"] not in doc_filter:
+        return False
+    for field, value in (metadata_filter or {}).items():
+        values = value if isinstance(value, (list, tuple, set)) else [value]
+        if meta.get(field) not in values:
+            return False
+    return True
+
+
+class StoreSnapshot:
+    """
+    The parts of a FAISSStore a search reads, captured together.
+    
+    Replacements (compaction, promotion, clear, load) swap in new objects and
+    publish a new snapshot, so a search that started earlier keeps a
+    consistent set. Rows at or past n_rows are not yet visible.
+    """
+    
+    def __init__(self, store: FAISSStore):
+        self.index = store._index
+        self.index_type = store._index_type
+        self.table = store._table
+        self.bm25 = store._bm25
+        self.centroids = store._centroids
+        self.shards = tuple(store._shards)
+        self.n_rows = len(store._table)
+        self.tombstones = store._tombstones
+        self.unremoved = store._unremoved
+        self.vectors = store._vectors
 
 
 class MockFAISSIndex:
-    """Mock FAISS index for when FAISS is not installed."""
+    """
+    Mock FAISS index for when FAISS is not installed.
+    
+    Exact inner-product search over a preallocated float32 matrix that
+    doubles its capacity when full, so adds are amortized O(1) and searches
+    run as one matrix product with argpartition top-k instead of copying
+    the corpus per query.
+    """
+    
+    INITIAL_CAPACITY = 1024
+    
+    # Bound the (queries x vectors) score block held in memory at once
+    MAX_SCORE_BLOCK = 32 * 1024 * 1024
     
     def __init__(self, dimension: int):
         self.dimension = dimension
-        self.vectors: List[np.ndarray] = []
+        self._vectors = np.empty((self.INITIAL_CAPACITY, dimension), dtype=np.float32)
+        self._ids = np.empty(self.INITIAL_CAPACITY, dtype=np.int64)
+        self._size = 0
+        self._id_order = None
+    
+    @property
+    def ntotal(self) -> int:
+        return self._size
+    
+    def _reserve(self, n: int):
+        """Grow storage (doubling) to hold n vectors."""
+        capacity = len(self._ids)
+        if n <= capacity:
+            return
+        while capacity < n:
+            capacity *= 2
+        
+        vectors = np.empty((capacity, self.dimension), dtype=np.float32)
+        vectors[:self._size] = self._vectors[:self._size]
+        ids = np.empty(capacity, dtype=np.int64)
+        ids[:self._size] = self._ids[:self._size]
+        self._vectors, self._ids = vectors, ids
     
     def add(self, vectors: np.ndarray):
-        for v in vectors:
-            self.vectors.append(v)
+        start = int(self._ids[:self._size].max()) + 1 if self._size else 0
+        self.add_with_ids(vectors, np.arange(start, start + len(vectors)))
+    
+    def add_with_ids(self, vectors: np.ndarray, ids: np.ndarray):
+        n = len(vectors)
+        self._reserve(self._size + n)
+        self._vectors[self._size:self._size + n] = vectors
+        self._ids[self._size:self._size + n] = ids
+        self._size += n
+        self._id_order = None
+    
+    def remove_ids(self, ids: np.ndarray) -> int:
+        keep = ~np.isin(self._ids[:self._size], np.asarray(ids, dtype=np.int64))
+        kept = int(np.count_nonzero(keep))
+        removed = self._size - kept
+        if removed:
+            self._vectors[:kept] = self._vectors[:self._size][keep]
+            self._ids[:kept] = self._ids[:self._size][keep]
+            self._size = kept
+            self._id_order = None
+        return removed
+    
+    def reconstruct_batch(self, ids: np.ndarray) -> np.ndarray:
+        if self._id_order is None:
+            self._id_order = np.argsort(self._ids[:self._size], kind="stable")
+        
+        stored = self._ids[:self._size][self._id_order]
+        ids = np.asarray(ids, dtype=np.int64)
+        slots = np.minimum(np.searchsorted(stored, ids), max(self._size - 1, 0))
+        if self._size == 0 or np.any(stored[slots] != ids):
+            raise KeyError("Vector id not found in index")
+        return self._vectors[self._id_order[slots]]
     
     def search(self, query: np.ndarray, k: int):
-        if not self.vectors:
-            return np.array([[-1.0]]), np.array([[-1]])
+        query = np.atleast_2d(query).astype(np.float32, copy=False)
+        if self._size == 0 or k <= 0:
+            return np.full((len(query), 1), -1.0, dtype=np.float32), np.full((len(query), 1), -1)
         
-        # Compute similarities
-        vectors = np.array(self.vectors)
-        similarities = np.dot(vectors, query.T).flatten()
+        k = min(k, self._size)
+        vectors = self._vectors[:self._size]
+        block = max(1, self.MAX_SCORE_BLOCK // self._size)
         
-        # Get top k
-        k = min(k, len(similarities))
-        indices = np.argsort(similarities)[::-1][:k]
-        scores = similarities[indices]
+        scores = np.empty((len(query), k), dtype=np.float32)
+        positions = np.empty((len(query), k), dtype=np.int64)
+        for start in range(0, len(query), block):
+            similarities = query[start:start + block] @ vectors.T
+            if k < self._size:
+                top = np.argpartition(-similarities, k - 1, axis=1)[:, :k]
+            else:
+                top = np.broadcast_to(np.arange(self._size), similarities.shape)
+            top_scores = np.take_along_axis(similarities, top, axis=1)
+            order = np.argsort(-top_scores, axis=1)
+            positions[start:start + block] = np.take_along_axis(top, order, axis=1)
+            scores[start:start + block] = np.take_along_axis(top_scores, order, axis=1)
         
-        return np.array([scores]), np.array([indices])
+        return scores, self._ids[positions]
+    
+    def arrays(self):
+        """(ids, vectors) of the stored vectors."""
+        return self._ids[:self._size], self._vectors[:self._size]
+    
+    def save(self, path: str):
+        ids, vectors = self.arrays()
+        with open(path, "wb") as f:
+            np.savez(f, ids=ids, vectors=vectors)
+    
+    @classmethod
+    def load(cls, path: str, dimension: int) -> "MockFAISSIndex":
+        index = cls(dimension)
+        with np.load(path) as saved:
+            index.add_with_ids(saved["vectors"], saved["ids"])
+        return index
@@ -0,0 +1,262 @@
+"""
+Healthcare Intelligence Platform - FAISS Index Factory
+Index construction, training and search tuning for the vector store
+"""
+
+import numpy as np
+from typing import Optional
+from loguru import logger
+
+
+# Supported index layouts, selectable through Settings.faiss_index_type
+INDEX_TYPES = ("flat", "ivf_flat", "ivf_pq", "hnsw")
+
+# Vector storage precisions, selectable through Settings.faiss_vector_storage
+STORAGE_TYPES = ("float32", "float16", "int8")
+
+# Scalar quantizers need this many vectors to learn per-dimension ranges
+MIN_SQ_TRAINING_POINTS = 1000
+
+# k-means needs roughly this many training points per centroid to be stable
+MIN_POINTS_PER_CENTROID = 39
+
+
+def effective_nlist(nlist: int, n_train: int) -> int:
+    """Clamp the number of IVF lists so every centroid gets enough training points."""
+    return max(1, min(nlist, n_train // MIN_POINTS_PER_CENTROID))
+
+
+def min_training_points(index_type: str, pq_nbits: int = 8, storage: str = "float32") -> int:
+    """Minimum number of vectors needed before an index of this type can be trained."""
+    if index_type == "ivf_pq":
+        return MIN_POINTS_PER_CENTROID * 2 ** pq_nbits
+    
+    required = MIN_POINTS_PER_CENTROID if index_type == "ivf_flat" else 0
+    if storage == "int8":
+        required = max(required, MIN_SQ_TRAINING_POINTS)
+    return required
+
+
+def _sq_type(faiss, storage: str):
+    """ScalarQuantizer type for a storage precision (None for float32)."""
+    if storage == "float16":
+        return faiss.ScalarQuantizer.QT_fp16
+    if storage == "int8":
+        return faiss.ScalarQuantizer.QT_8bit
+    if storage == "float32":
+        return None
+    raise ValueError(f"Unknown vector storage: {storage}. Supported: {STORAGE_TYPES}")
+
+
+def build_index(
+    faiss,
+    index_type: str,
+    dimension: int,
+    n_train: int = 0,
+    nlist: int = 1024,
+    pq_m: int = 64,
+    pq_nbits: int = 8,
+    hnsw_m: int = 32,
+    ef_construction: int = 200,
+    storage: str = "float32"
+):
+    """
+    Build an empty (untrained) inner-product index.
+    
+    Args:
+        faiss: The imported faiss module
+        index_type: One of INDEX_TYPES
+        dimension: Vector dimension
+        n_train: Number of vectors that will be used for training (sizes nlist)
+        nlist: Requested number of IVF lists
+        pq_m: Number of PQ sub-quantizers (must divide dimension)
+        pq_nbits: Bits per PQ sub-quantizer code
+        hnsw_m: HNSW graph degree
+        ef_construction: HNSW construction-time beam width
+        storage: Vector precision (float32, or float16 / int8 scalar
+            quantization); ignored by ivf_pq, which is already compressed
+    
+    Returns:
+        FAISS index using the inner-product metric
+    """
+    metric = faiss.METRIC_INNER_PRODUCT
+    sq_type = _sq_type(faiss, storage)
+    
+    if index_type == "flat":
+        if sq_type is None:
+            return faiss.IndexFlatIP(dimension)
+        return faiss.IndexScalarQuantizer(dimension, sq_type, metric)
+    
+    if index_type == "hnsw":
+        if sq_type is None:
+            index = faiss.IndexHNSWFlat(dimension, hnsw_m, metric)
+        else:
+            index = faiss.IndexHNSWSQ(dimension, sq_type, hnsw_m, metric)
+        index.hnsw.efConstruction = ef_construction
+        return index
+    
+    if index_type in ("ivf_flat", "ivf_pq"):
+        n_lists = effective_nlist(nlist, n_train)
+        quantizer = faiss.IndexFlatIP(dimension)
+        
+        if index_type == "ivf_flat" and sq_type is None:
+            index = faiss.IndexIVFFlat(quantizer, dimension, n_lists, metric)
+        elif index_type == "ivf_flat":
+            index = faiss.IndexIVFScalarQuantizer(quantizer, dimension, n_lists, sq_type, metric)
+        else:
+            if dimension % pq_m != 0:
+                raise ValueError(
+                    f"PQ sub-quantizers ({pq_m}) must divide the dimension ({dimension})"
+                )
+            index = faiss.IndexIVFPQ(quantizer, dimension, n_lists, pq_m, pq_nbits, metric)
+        
+        # Keep the quantizer alive as long as the index
+        index.own_fields = True
+        quantizer.this.disown()
+        return index
+    
+    raise ValueError(f"Unknown index type: {index_type}. Supported: {INDEX_TYPES}")
+
+
+def train_index(index, vectors: np.ndarray, sample_size: int, seed: int = 0):
+    """
+    Train an index on a random sample of vectors.
+    
+    Args:
+        index: FAISS index (no-op if it does not need training)
+        vectors: Candidate training vectors (n, dimension)
+        sample_size: Maximum number of vectors to train on
+        seed: Sampling seed for reproducible builds
+    """
+    if index.is_trained:
+        return
+    
+    if len(vectors) > sample_size:
+        rng = np.random.default_rng(seed)
+        sample = vectors[rng.choice(len(vectors), sample_size, replace=False)]
+    else:
+        sample = vectors
+    
+    logger.info(f"🏋️ Training index on {len(sample)} vectors")
+    index.train(np.ascontiguousarray(sample, dtype=np.float32))
+
+
+def configure_search(faiss, index, nprobe: Optional[int] = None, ef_search: Optional[int] = None):
+    """Apply query-time parameters (nprobe for IVF, efSearch for HNSW) where supported."""
+    index_type = describe_index(faiss, index)
+    params = faiss.ParameterSpace()
+    
+    if index_type in ("ivf_flat", "ivf_pq") and nprobe:
+        params.set_index_parameter(index, "nprobe", nprobe)
+    elif index_type == "hnsw" and ef_search:
+        params.set_index_parameter(index, "efSearch", ef_search)
+
+
+def describe_index(faiss, index) -> str:
+    """Return the INDEX_TYPES name of a (possibly wrapped) FAISS index."""
+    if faiss is None:
+        return "flat"
+    
+    index = _unwrap(faiss, index)
+    
+    if isinstance(index, faiss.IndexIVFPQ):
+        return "ivf_pq"
+    if isinstance(index, faiss.IndexIVF):
+        return "ivf_flat"
+    if isinstance(index, faiss.IndexHNSW):
+        return "hnsw"
+    return "flat"
+
+
+def with_ids(faiss, index):
+    """
+    Make an index addressable by external int64 ids.
+    
+    IVF indexes store ids natively and get a hashtable direct map so vectors
+    can be reconstructed by id; everything else is wrapped in IndexIDMap2.
+    """
+    if describe_index(faiss, index) in ("ivf_flat", "ivf_pq"):
+        index.set_direct_map_type(faiss.DirectMap.Hashtable)
+        return index
+    return faiss.IndexIDMap2(index)
+
+
+def supports_removal(index_type: str) -> bool:
+    """HNSW graphs cannot drop nodes; their deletions wait for compaction."""
+    return index_type != "hnsw"
+
+
+def exclusion_selector(faiss, ids):
+    """IDSelector that matches every id except the given ones."""
+    excluded = faiss.IDSelectorBatch(np.asarray(ids, dtype=np.int64))
+    selector = faiss.IDSelectorNot(excluded)
+    selector.excluded_ref = excluded
+    return selector
+
+
+def search_parameters(
+    faiss,
+    index_type: str,
+    selector=None,
+    nprobe: Optional[int] = None,
+    ef_search: Optional[int] = None
+):
+    """
+    Build per-query SearchParameters restricting results to an IDSelector.
+    
+    Explicit parameters override the index defaults, so nprobe / efSearch are
+    carried over to keep recall unchanged.
+    """
+    if index_type in ("ivf_flat", "ivf_pq"):
+        params = faiss.SearchParametersIVF(sel=selector, nprobe=nprobe or 1)
+    elif index_type == "hnsw":
+        params = faiss.SearchParametersHNSW(sel=selector, efSearch=ef_search or 16)
+    else:
+        params = faiss.SearchParameters(sel=selector)
+    
+    # SearchParameters only borrows the selector; keep it alive with the params
+    params.selector_ref = selector
+    return params
+
+
+def _unwrap(faiss, index):
+    """Strip IndexIDMap wrappers."""
+    index = faiss.downcast_index(index)
+    while hasattr(index, "id_map") and hasattr(index, "index"):
+        index = faiss.downcast_index(index.index)
+    return index
+
+
+def describe_storage(faiss, index) -> str:
+    """Return the STORAGE_TYPES name of a (possibly wrapped) FAISS index."""
+    if faiss is None:
+        return "float32"
+    
+    index = _unwrap(faiss, index)
+    if isinstance(index, faiss.IndexHNSW):
+        index = faiss.downcast_index(index.storage)
+    
+    sq = getattr(index, "sq", None)
+    if sq is None:
+        return "float32"
+    return "float16" if sq.qtype == faiss.ScalarQuantizer.QT_fp16 else "int8"
+
+
+def bytes_per_vector(faiss, index, dimension: int) -> int:
+    """Approximate resident bytes per stored vector: codes, ids and graph links."""
+    if faiss is None:
+        return dimension * 4
+    
+    index = faiss.downcast_index(index)
+    extra = 0
+    if hasattr(index, "id_map"):
+        extra += 16  # id_map entry + reverse map
+        index = _unwrap(faiss, index)
+    
+    if isinstance(index, faiss.IndexHNSW):
+        extra += index.hnsw.nb_neighbors(0) * 4
+        index = faiss.downcast_index(index.storage)
+    elif isinstance(index, faiss.IndexIVF):
+        extra += 8 + 16  # inverted list id + hashtable direct map
+    
+    return int(getattr(index, "code_size", dimension * 4)) + extra
@@ -0,0 +1,461 @@
+"""
+Healthcare Intelligence Platform - Metadata Database
+SQLite store for document and chunk metadata, keyed by FAISS vector id
+"""
+
+import os
+import json
+import sqlite3
+import threading
+import numpy as np
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+
+CHUNKS_COLUMNS = """(
+    id INTEGER PRIMARY KEY,
+    doc_id TEXT NOT NULL,
+    chunk_index INTEGER NOT NULL,
+    added_at REAL NOT NULL,
+    deleted INTEGER NOT NULL DEFAULT 0,
+    hash TEXT
+)"""
+
+CHUNK_REFS_COLUMNS = """(
+    doc_id TEXT NOT NULL,
+    chunk_index INTEGER NOT NULL,
+    id INTEGER NOT NULL,
+    added_at REAL NOT NULL,
+    visible_at INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (doc_id, chunk_index)
+) WITHOUT ROWID"""
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS documents (
+    doc_id TEXT PRIMARY KEY,
+    metadata TEXT NOT NULL,
+    deleted INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS document_fields (
+    field TEXT NOT NULL,
+    value,
+    doc_id TEXT NOT NULL,
+    PRIMARY KEY (field, value, doc_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS document_fields_doc ON document_fields (doc_id);
+CREATE TABLE IF NOT EXISTS chunks {CHUNKS_COLUMNS};
+CREATE TABLE IF NOT EXISTS chunk_refs {CHUNK_REFS_COLUMNS};
+"""
+
+# Indexes on the tables compaction rebuilds, as (name prefix, table, column).
+# They carry a numeric suffix so the rebuilt tables can be indexed under
+# fresh names before the swap.
+CHUNK_INDEXES = (
+    ("chunks_doc", "chunks", "doc_id"),
+    ("chunks_hash", "chunks", "hash"),
+    ("chunk_refs_id", "chunk_refs", "id"),
+)
+
+
+class MetadataDB:
+    """
+    Document and chunk metadata in SQLite.
+    
+    - documents: one row per document with its metadata as JSON
+    - document_fields: (field, value, doc_id) postings for scalar metadata
+      values, so metadata filters are answered from an index
+    - chunks: one row per vector id (owning doc_id, chunk_index, added_at,
+      content hash)
+    - chunk_refs: chunks of other documents whose content is already stored,
+      pointing at the existing vector id
+    
+    Deleted documents are flagged rather than removed, so searches running
+    against an older snapshot can still hydrate their hits; compaction
+    renumbers the chunk ids alongside the index and purges them. A vector
+    stays live while any document references it: deleting its owner hands
+    it to one of the referencing documents.
+    
+    Each thread gets its own connection; the database runs in WAL mode so
+    searches read while a writer commits. Durability comes from the vector
+    store's own write-ahead log and snapshots, so commits are not fsynced.
+    """
+    
+    def __init__(self, path: str):
+        """
+        Args:
+            path: Database file (created if missing)
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        self._ensure_schema()
+    
+    def _ensure_schema(self):
+        conn = self._conn()
+        conn.executescript(SCHEMA)
+        
+        with conn:
+            # Databases written before content hashing lack the column
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(chunks)")}
+            if "hash" not in columns:
+                conn.execute("ALTER TABLE chunks ADD COLUMN hash TEXT")
+            
+            indexes = conn.execute("SELECT name, tbl_name FROM sqlite_master WHERE type = 'index'").fetchall()
+            suffix = self._free_index_suffix(conn)
+            for prefix, table, column in CHUNK_INDEXES:
+                if not any(name.startswith(prefix + "_") and tbl == table for name, tbl in indexes):
+                    conn.execute(f"CREATE INDEX {prefix}_{suffix} ON {table} ({column})")
+    
+    def _free_index_suffix(self, conn: sqlite3.Connection) -> int:
+        names = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+        suffix = 0
+        while any(f"{prefix}_{suffix}" in names for prefix, _, _ in CHUNK_INDEXES):
+            suffix += 1
+        return suffix
+    
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.path), timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")
+            self._local.conn = conn
+        return conn
+    
+    def add_document(
+        self,
+        doc_id: str,
+        chunks: Sequence[Tuple[int, int, Optional[str]]],
+        metadata: Optional[Dict[str, Any]],
+        chunk_fields: Sequence[str] = (),
+        refs: Sequence[Tuple[int, int]] = (),
+        visible_at: int = 0
+    ):
+        """
+        Record a document and its chunks.
+        
+        Args:
+            doc_id: Document identifier
+            chunks: (chunk_index, vector id, content hash) of newly stored chunks
+            metadata: Document-level metadata
+            chunk_fields: Keys that are per-chunk and not indexed as filters
+            refs: (chunk_index, vector id) of chunks reusing a stored vector
+            visible_at: Row count at which the refs become searchable, so they
+                appear together with the document's new vectors
+        """
+        metadata = dict(metadata or {})
+        added_at = datetime.now().timestamp()
+        fields = [
+            (field, value, doc_id) for field, value in metadata.items()
+            if field not in chunk_fields and isinstance(value, (str, int, float, bool))
+        ]
+        
+        with self._conn() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO documents (doc_id, metadata) VALUES (?, ?)",
+                (doc_id, json.dumps(metadata))
+            )
+            conn.execute("DELETE FROM document_fields WHERE doc_id = ?", (doc_id,))
+            conn.executemany("INSERT OR IGNORE INTO document_fields VALUES (?, ?, ?)", fields)
+            conn.executemany(
+                "INSERT OR REPLACE INTO chunks (id, doc_id, chunk_index, added_at, hash) VALUES (?, ?, ?, ?, ?)",
+                [(row, doc_id, i, added_at, h) for i, row, h in chunks]
+            )
+            conn.executemany(
+                "INSERT OR REPLACE INTO chunk_refs VALUES (?, ?, ?, ?, ?)",
+                [(doc_id, i, row, added_at, visible_at) for i, row in refs]
+            )
+    
+    def add_chunks(self, records: Iterable[tuple]):
+        """Insert (id, doc_id, chunk_index, added_at, deleted) rows as-is (migration)."""
+        with self._conn() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO chunks (id, doc_id, chunk_index, added_at, deleted) VALUES (?, ?, ?, ?, ?)",
+                records
+            )
+    
+    def find_vectors(self, hashes: Sequence[str]) -> Dict[str, Tuple[int, str]]:
+        """Live vectors holding any of the given content hashes: hash -> (vector id, owner doc_id)."""
+        cursor = self._conn().execute(
+            "SELECT hash, id, doc_id FROM chunks "
+            "WHERE deleted = 0 AND hash IN (SELECT value FROM json_each(?))",
+            (json.dumps(list(set(hashes))),)
+        )
+        return {h: (row, doc_id) for h, row, doc_id in cursor}
+    
+    def rows_without_hash(self) -> List[int]:
+        cursor = self._conn().execute("SELECT id FROM chunks WHERE deleted = 0 AND hash IS NULL")
+        return [row[0] for row in cursor]
+    
+    def set_hashes(self, hashes: Iterable[Tuple[str, int]]):
+        """Fill in (hash, vector id) pairs for rows stored before content hashing."""
+        with self._conn() as conn:
+            conn.executemany("UPDATE chunks SET hash = ? WHERE id = ?", hashes)
+    
+    def has_document(self, doc_id: str) -> bool:
+        row = self._conn().execute(
+            "SELECT 1 FROM documents WHERE doc_id = ? AND deleted = 0", (doc_id,)
+        ).fetchone()
+        return row is not None
+    
+    def delete_document(self, doc_id: str) -> List[int]:
+        """
+        Flag a document deleted and drop it from the filter postings.
+        
+        Vectors the document owns that other documents still reference are
+        handed to one of them.
+        
+        Returns:
+            Vector ids that are no longer referenced by any document
+        """
+        with self._conn() as conn:
+            conn.execute("UPDATE documents SET deleted = 1 WHERE doc_id = ?", (doc_id,))
+            conn.execute("DELETE FROM document_fields WHERE doc_id = ?", (doc_id,))
+            conn.execute("DELETE FROM chunk_refs WHERE doc_id = ?", (doc_id,))
+            
+            owned = [row[0] for row in conn.execute(
+                "SELECT id FROM chunks WHERE doc_id = ? AND deleted = 0", (doc_id,)
+            )]
+            shared = json.dumps(owned)
+            conn.execute(
+                """
+                UPDATE chunks SET (doc_id, chunk_index, added_at) = (
+                    SELECT r.doc_id, r.chunk_index, r.added_at FROM chunk_refs r
+                    WHERE r.id = chunks.id ORDER BY r.added_at, r.doc_id LIMIT 1
+                )
+                WHERE id IN (SELECT value FROM json_each(?))
+                AND id IN (SELECT id FROM chunk_refs)
+                """,
+                (shared,)
+            )
+            conn.execute(
+                """
+                DELETE FROM chunk_refs WHERE id IN (SELECT value FROM json_each(?))
+                AND EXISTS (
+                    SELECT 1 FROM chunks c WHERE c.id = chunk_refs.id
+                    AND c.doc_id = chunk_refs.doc_id AND c.chunk_index = chunk_refs.chunk_index
+                )
+                """,
+                (shared,)
+            )
+            
+            dead = [row[0] for row in conn.execute(
+                "SELECT id FROM chunks WHERE doc_id = ? AND deleted = 0 ORDER BY id", (doc_id,)
+            )]
+            conn.execute("UPDATE chunks SET deleted = 1 WHERE doc_id = ?", (doc_id,))
+        return dead
+    
+    def count_documents(self) -> int:
+        return self._conn().execute("SELECT COUNT(*) FROM documents WHERE deleted = 0").fetchone()[0]
+    
+    def count_refs(self) -> int:
+        return self._conn().execute("SELECT COUNT(*) FROM chunk_refs").fetchone()[0]
+    
+    def deleted_rows(self) -> set:
+        cursor = self._conn().execute("SELECT id FROM chunks WHERE deleted = 1")
+        return {row[0] for row in cursor}
+    
+    def live_rows(self) -> np.ndarray:
+        """All live vector ids, ascending."""
+        cursor = self._conn().execute("SELECT id FROM chunks WHERE deleted = 0 ORDER BY id")
+        return np.fromiter((row[0] for row in cursor), dtype=np.int64)
+    
+    def filter_rows(
+        self,
+        doc_ids: Optional[List[str]],
+        metadata_filter: Optional[Dict[str, Any]],
+        max_row: int
+    ) -> np.ndarray:
+        """
+        Live vector ids of documents matching the filters, resolved through
+        the indexes (including vectors a document shares with others).
+        
+        Args:
+            doc_ids: Optional document ids to restrict to
+            metadata_filter: field -> value or field -> list of accepted values
+            max_row: Only ids below this are returned (snapshot bound)
+        """
+        where, params = _filter_conditions(doc_ids, metadata_filter)
+        cursor = self._conn().execute(
+            f"SELECT id FROM chunks WHERE deleted = 0 AND id < ?{where} "
+            f"UNION SELECT id FROM chunk_refs WHERE visible_at <= ? AND id < ?{where} "
+            "ORDER BY id",
+            [max_row, *params, max_row, max_row, *params]
+        )
+        return np.fromiter((row[0] for row in cursor), dtype=np.int64)
+    
+    def filter_documents(
+        self,
+        doc_ids: Optional[List[str]],
+        metadata_filter: Optional[Dict[str, Any]]
+    ) -> List[str]:
+        """Live document ids matching the filters (same semantics as filter_rows)."""
+        where, params = _filter_conditions(doc_ids, metadata_filter)
+        cursor = self._conn().execute(f"SELECT doc_id FROM documents WHERE deleted = 0{where}", params)
+        return [row[0] for row in cursor]
+    
+    def documents(self) -> Iterable[Tuple[str, Dict[str, Any], np.ndarray]]:
+        """
+        Live documents as (doc_id, metadata, vector ids in chunk order),
+        including vectors shared with other documents.
+        """
+        cursor = self._conn().execute(
+            """
+            SELECT d.doc_id, d.metadata, c.id FROM documents d
+            JOIN (
+                SELECT doc_id, chunk_index, id FROM chunks WHERE deleted = 0
+                UNION ALL SELECT doc_id, chunk_index, id FROM chunk_refs
+            ) c ON c.doc_id = d.doc_id
+            WHERE d.deleted = 0
+            ORDER BY d.doc_id, c.chunk_index
+            """
+        )
+        doc_id, metadata, rows = None, None, []
+        for row_doc, row_metadata, row in cursor:
+            if row_doc != doc_id and rows:
+                yield doc_id, json.loads(metadata), np.array(rows, dtype=np.int64)
+                rows = []
+            doc_id, metadata = row_doc, row_metadata
+            rows.append(row)
+        if rows:
+            yield doc_id, json.loads(metadata), np.array(rows, dtype=np.int64)
+    
+    def chunk_metadata(self, rows: Sequence[int], max_row: int) -> Dict[int, List[Dict[str, Any]]]:
+        """
+        Metadata for a set of vector ids, fetched in one query.
+        
+        Args:
+            rows: Vector ids
+            max_row: Snapshot bound (references added later are not returned)
+        
+        Returns:
+            vector id -> metadata dict per owning chunk, the owner first
+        """
+        cursor = self._conn().execute(
+            """
+            SELECT c.id, c.doc_id, c.chunk_index, c.added_at, d.metadata, 0 AS ref
+            FROM chunks c JOIN documents d ON d.doc_id = c.doc_id
+            WHERE c.id IN (SELECT value FROM json_each(?1))
+            UNION ALL
+            SELECT r.id, r.doc_id, r.chunk_index, r.added_at, d.metadata, 1 AS ref
+            FROM chunk_refs r JOIN documents d ON d.doc_id = r.doc_id
+            WHERE r.id IN (SELECT value FROM json_each(?1)) AND r.visible_at <= ?2
+            ORDER BY ref, added_at
+            """,
+            (json.dumps([int(r) for r in rows]), max_row)
+        )
+        
+        results: Dict[int, List[Dict[str, Any]]] = {}
+        for row, doc_id, chunk_index, added_at, doc_metadata, _ in cursor:
+            results.setdefault(row, []).append({
+                "chunk_id": f"{doc_id}_{chunk_index}",
+                "document_id": doc_id,
+                "chunk_index": chunk_index,
+                "added_at": datetime.fromtimestamp(added_at).isoformat(),
+                **json.loads(doc_metadata)
+            })
+        return results
+    
+    def prepare_compaction(self, rows: np.ndarray):
+        """
+        Build chunk tables holding only the given ids, renumbered 0..len(rows)-1.
+        
+        Runs outside the search path; finish_compaction() swaps them in.
+        """
+        conn = self._conn()
+        suffix = self._free_index_suffix(conn)
+        
+        with conn:
+            for table in ("chunks_compact", "chunk_refs_compact", "compact_rows"):
+                conn.execute(f"DROP TABLE IF EXISTS {table}")
+            conn.execute(f"CREATE TABLE chunks_compact {CHUNKS_COLUMNS}")
+            conn.execute(f"CREATE TABLE chunk_refs_compact {CHUNK_REFS_COLUMNS}")
+            conn.execute("CREATE TABLE compact_rows (id INTEGER PRIMARY KEY, new_id INTEGER NOT NULL)")
+            conn.executemany(
+                "INSERT INTO compact_rows VALUES (?, ?)",
+                ((int(r), i) for i, r in enumerate(rows))
+            )
+            conn.execute(
+                """
+                INSERT INTO chunks_compact
+                SELECT m.new_id, c.doc_id, c.chunk_index, c.added_at, c.deleted, c.hash
+                FROM chunks c JOIN compact_rows m ON m.id = c.id
+                """
+            )
+            # Everything is published by now, so references are visible from the start
+            conn.execute(
+                """
+                INSERT INTO chunk_refs_compact
+                SELECT r.doc_id, r.chunk_index, m.new_id, r.added_at, 0
+                FROM chunk_refs r JOIN compact_rows m ON m.id = r.id
+                """
+            )
+            conn.execute("DROP TABLE compact_rows")
+            for prefix, table, column in CHUNK_INDEXES:
+                conn.execute(f"CREATE INDEX {prefix}_{suffix} ON {table}_compact ({column})")
+    
+    def finish_compaction(self):
+        """Swap in the tables from prepare_compaction() and purge deleted documents."""
+        with self._conn() as conn:
+            for table in ("chunks", "chunk_refs"):
+                conn.execute(f"DROP TABLE {table}")
+                conn.execute(f"ALTER TABLE {table}_compact RENAME TO {table}")
+            conn.execute("DELETE FROM documents WHERE deleted = 1")
+    
+    def clear(self):
+        with self._conn() as conn:
+            for table in ("documents", "document_fields", "chunks", "chunk_refs"):
+                conn.execute(f"DELETE FROM {table}")
+    
+    def save(self, path: str):
+        """Write a consistent copy of the database to path (no-op onto itself)."""
+        path = Path(path)
+        if path.exists() and path.resolve() == self.path.resolve():
+            return
+        
+        tmp = path.with_name(path.name + ".tmp")
+        if tmp.exists():
+            tmp.unlink()
+        target = sqlite3.connect(str(tmp))
+        try:
+            self._conn().backup(target)
+        finally:
+            target.close()
+        os.replace(tmp, path)
+    
+    def restore(self, path: str):
+        """Replace the database contents with a copy saved by save()."""
+        path = Path(path)
+        if path.resolve() == self.path.resolve():
+            return
+        
+        source = sqlite3.connect(str(path))
+        try:
+            source.backup(self._conn())
+        finally:
+            source.close()
+        self._ensure_schema()
+
+
+def _filter_conditions(
+    doc_ids: Optional[List[str]],
+    metadata_filter: Optional[Dict[str, Any]]
+) -> Tuple[str, List[Any]]:
+    """SQL conditions on a doc_id column (" AND ..." each) and their parameters."""
+    conditions = []
+    params: List[Any] = []
+    
+    if doc_ids:
+        conditions.append("doc_id IN (SELECT value FROM json_each(?))")
+        params.append(json.dumps(list(doc_ids)))
+    
+    for field, value in (metadata_filter or {}).items():
+        values = list(value) if isinstance(value, (list, tuple, set)) else [value]
+        conditions.append(
+            "doc_id IN (SELECT doc_id FROM document_fields "
+            "WHERE field = ? AND value IN (SELECT value FROM json_each(?)))"
+        )
+        params.extend([field, json.dumps(values)])
+    
+    return "".join(f" AND {c}" for c in conditions), params
@@ -0,0 +1,61 @@
+"""
+Healthcare Intelligence Platform - Maximal Marginal Relevance
+Diversified selection of retrieved chunks from their stored vectors
+"""
+
+import numpy as np
+from typing import Optional
+
+
+def maximal_marginal_relevance(
+    query: np.ndarray,
+    vectors: np.ndarray,
+    k: int,
+    lambda_mult: float = 0.5,
+    relevance: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """
+    Greedily pick k candidates that are relevant to the query but not to
+    each other: each step takes the candidate maximizing
+    lambda * relevance - (1 - lambda) * (max similarity to those picked).
+    
+    Pairwise similarities are computed once as a matrix product; each step
+    then only updates a running maximum, so the cost is one (n x n) product
+    plus k vector operations over n candidates.
+    
+    Args:
+        query: Query vector (dimension,)
+        vectors: Candidate vectors (n, dimension), normalized
+        k: Number of candidates to pick
+        lambda_mult: 1.0 ranks by relevance only, 0.0 by diversity only
+        relevance: Optional relevance per candidate (defaults to the inner
+            product with the query)
+    
+    Returns:
+        Indices into vectors, in pick order
+    """
+    n = len(vectors)
+    k = min(k, n)
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if relevance is None:
+        relevance = vectors @ np.asarray(query, dtype=np.float32).reshape(-1)
+    relevance = np.asarray(relevance, dtype=np.float32)
+    similarity = vectors @ vectors.T
+    
+    picked = np.empty(k, dtype=np.int64)
+    redundancy = np.full(n, -np.inf, dtype=np.float32)
+    available = np.ones(n, dtype=bool)
+    for step in range(k):
+        if step == 0:
+            scores = relevance.copy()
+        else:
+            scores = lambda_mult * relevance - (1 - lambda_mult) * redundancy
+        scores[~available] = -np.inf
+        best = int(np.argmax(scores))
+        picked[step] = best
+        available[best] = False
+        np.maximum(redundancy, similarity[best], out=redundancy)
+    return picked
@@ -0,0 +1,492 @@
+"""
+Healthcare Intelligence Platform - Sharded Vector Store
+Documents hash-partitioned across local shard worker processes
+"""
+
+import os
+import sys
+import fcntl
+import hashlib
+import heapq
+import itertools
+import queue
+import signal
+import subprocess
+import threading
+import time
+import numpy as np
+from multiprocessing.connection import Client, Listener
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence
+from loguru import logger
+
+from app.config import get_settings
+from .faiss_store import FAISSStore
+
+
+# Store methods a shard worker runs on request
+SHARD_OPERATIONS = (
+    "add_documents",
+    "delete_document",
+    "search_batch",
+    "search_hybrid",
+    "search_two_stage",
+    "reusable_vectors",
+    "get_stats",
+    "warmup",
+    "checkpoint",
+    "ping",
+    "shutdown",
+)
+
+BACKEND_ROOT = Path(__file__).resolve().parents[1]
+
+
+def shard_of(doc_id: str, n_shards: int) -> int:
+    """Shard owning a document (stable across processes, unlike hash())."""
+    digest = hashlib.blake2b(doc_id.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big") % n_shards
+
+
+def merge_results(per_shard: Sequence[List[Dict[str, Any]]], top_k: int) -> List[Dict[str, Any]]:
+    """Best top_k results across shards by score."""
+    return heapq.nlargest(top_k, itertools.chain.from_iterable(per_shard), key=lambda r: r["score"])
+
+
+class ShardUnavailable(RuntimeError):
+    """A shard worker could not be reached or started."""
+
+
+class ShardWorker:
+    """
+    A worker process owning one shard: a durable FAISSStore opened on the
+    shard directory, served over a Unix socket (worker.sock) to any number
+    of API processes. Each connection is handled on its own thread; the
+    store serializes writers and lets searches run concurrently.
+    """
+    
+    def __init__(self, directory: str):
+        self.directory = Path(directory)
+        self.store: Optional[FAISSStore] = None
+        self._listener: Optional[Listener] = None
+    
+    def serve(self):
+        """Open the shard and answer requests until shut down (or SIGTERM)."""
+        lock = open(self.directory / "worker.lock", "w")
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            logger.info(f"A worker is already serving {self.directory}")
+            return
+        
+        signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+        try:
+            # Created only once the lock is held: a new store clears its working database
+            self.store = FAISSStore(metadata_path=str(self.directory / "metadata.work.db"))
+            self.store.open(str(self.directory))
+            socket_path = self.directory / "worker.sock"
+            socket_path.unlink(missing_ok=True)
+            self._listener = Listener(str(socket_path), family="AF_UNIX", authkey=_authkey(self.directory.parent))
+            logger.info(f"🧩 Shard worker {os.getpid()} serving {self.directory}")
+            while True:
+                conn = self._listener.accept()
+                threading.Thread(target=self._serve_connection, args=(conn,), daemon=True).start()
+        finally:
+            self._stop()
+    
+    def _stop(self):
+        if self._listener is not None:
+            self._listener.close()
+            (self.directory / "worker.sock").unlink(missing_ok=True)
+        if self.store is not None:
+            self.store.close()
+    
+    def _serve_connection(self, conn):
+        with conn:
+            while True:
+                try:
+                    op, args, kwargs = conn.recv()
+                except (EOFError, OSError):
+                    return
+                try:
+                    if op not in SHARD_OPERATIONS:
+                        raise ValueError(f"Unknown shard operation: {op}")
+                    result = getattr(self, f"_op_{op}", None)
+                    result = result(*args, **kwargs) if result else getattr(self.store, op)(*args, **kwargs)
+                    conn.send(("ok", result))
+                except Exception as e:
+                    conn.send(("error", type(e).__name__, str(e)))
+                finally:
+                    if op == "shutdown":
+                        os._exit(0)
+    
+    def _op_ping(self) -> int:
+        return os.getpid()
+    
+    def _op_shutdown(self) -> bool:
+        """Checkpoint and stop before answering; the process exits once the answer is sent."""
+        self._stop()
+        return True
+    
+    def _op_reusable_vectors(self, chunks: List[str]) -> np.ndarray:
+        """Stored vectors for chunks already in this shard; NaN rows for the rest."""
+        return self.store.embed_new_chunks(
+            chunks, lambda texts: np.full((len(texts), self.store._dimension), np.nan, dtype=np.float32)
+        )
+
+
+def _authkey(root: Path) -> bytes:
+    """Key shared by the workers and API processes using a shards directory (created once)."""
+    path = root / "authkey"
+    if not path.exists():
+        root.mkdir(parents=True, exist_ok=True)
+        tmp = root / f"authkey.{os.getpid()}.tmp"
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "wb") as f:
+            f.write(os.urandom(32))
+        try:
+            # Fails if another process created it first; theirs is used
+            os.link(tmp, path)
+        except FileExistsError:
+            pass
+        finally:
+            tmp.unlink()
+    return path.read_bytes()
+
+
+class _ShardClient:
+    """Pooled connections to one shard worker, starting it if nobody has."""
+    
+    def __init__(self, directory: Path, start_timeout: float):
+        self.directory = directory
+        self.start_timeout = start_timeout
+        self._idle: "queue.SimpleQueue" = queue.SimpleQueue()
+    
+    def _connect(self):
+        return Client(
+            str(self.directory / "worker.sock"), family="AF_UNIX", authkey=_authkey(self.directory.parent)
+        )
+    
+    def checkout(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        try:
+            return self._connect()
+        except (FileNotFoundError, ConnectionRefusedError):
+            self.ensure_worker()
+            return self._connect()
+    
+    def checkin(self, conn):
+        self._idle.put(conn)
+    
+    def reset(self):
+        """Drop pooled connections (after the worker went away)."""
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+    
+    def ensure_worker(self):
+        """
+        Start the shard's worker unless one is running, and wait until it
+        accepts connections. API processes serialize on spawn.lock, and a
+        worker holds worker.lock for its lifetime, so only one ever runs.
+        """
+        self.directory.mkdir(parents=True, exist_ok=True)
+        process = self._spawn_unless_running()
+        deadline = time.monotonic() + self.start_timeout
+        while time.monotonic() < deadline:
+            try:
+                conn = self._connect()
+                self.checkin(conn)
+                return
+            except (FileNotFoundError, ConnectionRefusedError):
+                if process is None or process.poll() is not None:
+                    if process is not None and process.returncode != 0:
+                        break
+                    # The running worker went away (or another process's worker
+                    # won the lock): check again rather than wait for a socket
+                    process = self._spawn_unless_running()
+                time.sleep(0.1)
+        raise ShardUnavailable(
+            f"Shard worker for {self.directory} did not start (see {self.directory / 'worker.log'})"
+        )
+    
+    def _spawn_unless_running(self) -> Optional[subprocess.Popen]:
+        with open(self.directory / "spawn.lock", "w") as spawn_lock:
+            fcntl.flock(spawn_lock, fcntl.LOCK_EX)
+            with open(self.directory / "worker.lock", "w") as worker_lock:
+                try:
+                    fcntl.flock(worker_lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    fcntl.flock(worker_lock, fcntl.LOCK_UN)
+                except BlockingIOError:
+                    return None
+            return self._spawn()
+    
+    def _spawn(self) -> subprocess.Popen:
+        logger.info(f"🧩 Starting shard worker for {self.directory}")
+        env = dict(os.environ)
+        env["PYTHONPATH"] = os.pathsep.join(filter(None, [str(BACKEND_ROOT), env.get("PYTHONPATH")]))
+        with open(self.directory / "worker.log", "ab") as log:
+            # Own session: the worker outlives the API process that happened to start it
+            return subprocess.Popen(
+                [sys.executable, "-m", "vectorstore.sharding", str(self.directory)],
+                env=env,
+                stdout=log,
+                stderr=subprocess.STDOUT,
+                start_new_session=True
+            )
+
+
+class ShardedStore:
+    """
+    Vector store partitioned across VECTOR_SHARDS local worker processes.
+    
+    Documents are assigned to a shard by a hash of their id; each shard is a
+    durable FAISSStore in VECTOR_SHARDS_PATH/shard-NN served by its own
+    process, so the corpus can exceed one process's memory and shards are
+    scanned in parallel. Searches are sent to every shard (or only to the
+    shards owning doc_filter) before any answer is read, and the per-shard
+    top-k lists are merged by score. Hybrid and keyword scores are computed
+    per shard (BM25 statistics and fused ranks are shard-local).
+    
+    Workers are started by the first process that needs them and are shared
+    by every API process (uvicorn --workers) using the same directory; they
+    keep running until shutdown().
+    
+    Offers the FAISSStore methods the API uses, so routes work unchanged.
+    """
+    
+    _instance = None
+    
+    def __new__(cls, root: Optional[str] = None, n_shards: Optional[int] = None):
+        """Singleton for the configured shards; a root gives a standalone instance."""
+        if root is not None:
+            store = super().__new__(cls)
+            store._initialized = False
+            return store
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance._initialized = False
+        return cls._instance
+    
+    def __init__(self, root: Optional[str] = None, n_shards: Optional[int] = None):
+        """
+        Args:
+            root: Shards directory (defaults to VECTOR_SHARDS_PATH)
+            n_shards: Number of shards (defaults to VECTOR_SHARDS); must not
+                change once documents are stored
+        """
+        if self._initialized:
+            return
+        
+        settings = get_settings()
+        self.root = Path(root or settings.vector_shards_path)
+        self.n_shards = n_shards or settings.vector_shards
+        if self.n_shards < 1:
+            raise ValueError("A sharded store needs at least one shard")
+        self._shards = [
+            _ShardClient(self.root / f"shard-{i:02d}", settings.vector_shard_start_timeout)
+            for i in range(self.n_shards)
+        ]
+        self._initialized = True
+    
+    def start(self):
+        """Attach to the shard workers, starting the ones not running yet."""
+        for shard in self._shards:
+            shard.ensure_worker()
+        pids = self._fan_out(range(self.n_shards), "ping")
+        logger.info(f"✅ Connected to {self.n_shards} vector store shards (pids {pids})")
+    
+    def _call(self, shard: int, op: str, *args, **kwargs):
+        return self._fan_out([shard], op, *args, **kwargs)[0]
+    
+    def _fan_out(self, shards: Sequence[int], op: str, *args, **kwargs) -> List[Any]:
+        """Send a request to each shard, then collect the answers in shard order."""
+        conns = []
+        try:
+            for i in shards:
+                conn = self._shards[i].checkout()
+                conns.append((i, conn))
+                conn.send((op, args, kwargs))
+            replies = []
+            for i, conn in conns:
+                replies.append(conn.recv())
+        except (EOFError, OSError) as e:
+            for i, conn in conns:
+                conn.close()
+                self._shards[i].reset()
+            raise ShardUnavailable(f"Lost connection to a shard worker during {op}: {e}")
+        
+        for i, conn in conns:
+            self._shards[i].checkin(conn)
+        results = []
+        for (i, _), reply in zip(conns, replies):
+            if reply[0] == "error":
+                _, kind, message = reply
+                error = ValueError if kind == "ValueError" else RuntimeError
+                raise error(f"Shard {i}: {message}" if error is RuntimeError else message)
+            results.append(reply[1])
+        return results
+    
+    def _targets(self, doc_filter: Optional[List[str]]) -> List[int]:
+        """Shards that can hold results: those owning doc_filter, or all."""
+        if not doc_filter:
+            return list(range(self.n_shards))
+        return sorted({shard_of(doc_id, self.n_shards) for doc_id in doc_filter})
+    
+    def add_documents(
+        self,
+        doc_id: str,
+        chunks: List[str],
+        embeddings: np.ndarray,
+        metadata: Optional[Dict] = None
+    ) -> int:
+        """Add a document to the shard owning it (see FAISSStore.add_documents)."""
+        if len(chunks) != len(embeddings):
+            raise ValueError("Number of chunks must match number of embeddings")
+        return self._call(
+            shard_of(doc_id, self.n_shards), "add_documents",
+            doc_id, chunks, np.asarray(embeddings, dtype=np.float32), metadata
+        )
+    
+    def embed_new_chunks(self, chunks: List[str], embed: Callable[[List[str]], np.ndarray]) -> np.ndarray:
+        """
+        Embed only the chunks no shard stores yet (see FAISSStore.embed_new_chunks).
+        
+        The owning document is not known here, so every shard is asked for
+        the vectors it already has.
+        """
+        embeddings = None
+        for vectors in self._fan_out(range(self.n_shards), "reusable_vectors", chunks):
+            if embeddings is None:
+                embeddings = vectors
+            else:
+                missing = np.isnan(embeddings[:, 0])
+                embeddings[missing] = vectors[missing]
+        
+        missing = np.flatnonzero(np.isnan(embeddings[:, 0]))
+        if len(missing):
+            texts = list(dict.fromkeys(chunks[i] for i in missing))
+            vectors = dict(zip(texts, embed(texts)))
+            for i in missing:
+                embeddings[i] = vectors[chunks[i]]
+        return embeddings
+    
+    def delete_document(self, doc_id: str) -> bool:
+        return self._call(shard_of(doc_id, self.n_shards), "delete_document", doc_id)
+    
+    def search(
+        self,
+        query_embedding: np.ndarray,
+        top_k: int = 5,
+        doc_filter: Optional[List[str]] = None,
+        metadata_filter: Optional[Dict[str, Any]] = None,
+        with_vectors: bool = False
+    ) -> List[Dict[str, Any]]:
+        """Search every shard in parallel and merge (see FAISSStore.search)."""
+        return self.search_batch(
+            np.asarray(query_embedding).reshape(1, -1), top_k, doc_filter, metadata_filter, with_vectors
+        )[0]
+    
+    def search_batch(
+        self,
+        queries: np.ndarray,
+        top_k: int = 5,
+        doc_filter: Optional[List[str]] = None,
+        metadata_filter: Optional[Dict[str, Any]] = None,
+        with_vectors: bool = False
+    ) -> List[List[Dict[str, Any]]]:
+        """Batched search across shards; one merged result list per query."""
+        queries = np.ascontiguousarray(queries, dtype=np.float32)
+        per_shard = self._fan_out(
+            self._targets(doc_filter), "search_batch",
+            queries, top_k=top_k, doc_filter=doc_filter, metadata_filter=metadata_filter,
+            with_vectors=with_vectors
+        )
+        return [merge_results(lists, top_k) for lists in zip(*per_shard)]
+    
+    def search_hybrid(
+        self,
+        query: str,
+        query_embedding: Optional[np.ndarray] = None,
+        top_k: int = 5,
+        doc_filter: Optional[List[str]] = None,
+        metadata_filter: Optional[Dict[str, Any]] = None,
+        with_vectors: bool = False
+    ) -> List[Dict[str, Any]]:
+        """Hybrid / keyword search on every shard, merged by shard-local score."""
+        per_shard = self._fan_out(
+            self._targets(doc_filter), "search_hybrid",
+            query, query_embedding, top_k=top_k, doc_filter=doc_filter,
+            metadata_filter=metadata_filter, with_vectors=with_vectors
+        )
+        return merge_results(per_shard, top_k)
+    
+    def search_two_stage(
+        self,
+        query_embedding: np.ndarray,
+        top_k: int = 5,
+        n_documents: Optional[int] = None,
+        doc_filter: Optional[List[str]] = None,
+        metadata_filter: Optional[Dict[str, Any]] = None,
+        with_vectors: bool = False
+    ) -> List[Dict[str, Any]]:
+        """Two-stage search on every shard (n_documents candidates each), merged."""
+        per_shard = self._fan_out(
+            self._targets(doc_filter), "search_two_stage",
+            query_embedding, top_k=top_k, n_documents=n_documents, doc_filter=doc_filter,
+            metadata_filter=metadata_filter, with_vectors=with_vectors
+        )
+        return merge_results(per_shard, top_k)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Totals across shards, and each shard's own statistics."""
+        shards = self._fan_out(range(self.n_shards), "get_stats")
+        totals = {
+            key: sum(s[key] for s in shards)
+            for key in ("total_documents", "total_chunks", "deleted_chunks", "deduplicated_chunks")
+        }
+        return {
+            **totals,
+            "index_size_mb": round(sum(s["index_size_mb"] for s in shards), 2),
+            "dimension": shards[0]["dimension"],
+            "index_type": shards[0]["index_type"],
+            "vector_storage": shards[0]["vector_storage"],
+            "shards": shards
+        }
+    
+    def warmup(self) -> List[Dict[str, Any]]:
+        return self._fan_out(range(self.n_shards), "warmup")
+    
+    def checkpoint(self):
+        self._fan_out(range(self.n_shards), "checkpoint")
+    
+    def close(self):
+        """Checkpoint every shard; the workers keep serving other API processes."""
+        self.checkpoint()
+    
+    def shutdown(self):
+        """Checkpoint and stop every shard worker."""
+        for i, shard in enumerate(self._shards):
+            try:
+                self._call(i, "shutdown")
+            except ShardUnavailable:
+                pass
+            shard.reset()
+        logger.info(f"🛑 Stopped {self.n_shards} shard workers")
+
+
+def default_store():
+    """The store requests without a collection use: sharded when VECTOR_SHARDS is set."""
+    if get_settings().vector_shards > 0:
+        return ShardedStore()
+    return FAISSStore()
+
+
+if __name__ == "__main__":
+    # Shard worker entry point: python -m vectorstore.sharding <shard directory>
+    ShardWorker(sys.argv[1]).serve()
@@ -0,0 +1,240 @@
+"""
+Healthcare Intelligence Platform - Storage Tiers
+Memory-mapped cold index shards, document access tracking and per-tier statistics
+"""
+
+import json
+import threading
+import time
+import numpy as np
+from collections import deque
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from .index_factory import build_index, min_training_points, search_parameters, train_index, with_ids
+
+
+# The in-memory index, and the memory-mapped shards documents are demoted to
+TIERS = ("hot", "cold")
+
+
+class ColdShard:
+    """
+    An immutable flat index over a set of vector ids, opened memory-mapped.
+    
+    Files: <name>.faiss (index) and <name>.ids.npy (sorted ids). The codes
+    stay in the page cache rather than the heap, so the kernel can evict
+    them under memory pressure. Ids deleted or promoted back to the hot
+    index are marked dead and skipped until the shard is rewritten.
+    """
+    
+    def __init__(self, path: Path, index, ids: np.ndarray, dead: Optional[Set[int]] = None):
+        self.path = path
+        self.index = index
+        self.ids = ids
+        self.dead: Set[int] = dead or set()
+    
+    @property
+    def name(self) -> str:
+        return self.path.name
+    
+    @property
+    def files(self) -> List[Path]:
+        return [self.path.with_suffix(".faiss"), self.path.with_suffix(".ids.npy")]
+    
+    @classmethod
+    def write(cls, faiss, path: Path, ids: np.ndarray, vectors: np.ndarray, storage: str) -> "ColdShard":
+        """
+        Build a shard from vectors and open it memory-mapped.
+        
+        Args:
+            faiss: The imported faiss module
+            path: Shard path without suffix
+            ids: Vector ids (ascending)
+            vectors: Vectors in id order
+            storage: Vector precision (float32 until there is enough data
+                to train a scalar quantizer)
+        """
+        if len(vectors) < min_training_points("flat", storage=storage):
+            storage = "float32"
+        index = build_index(faiss, "flat", vectors.shape[1], storage=storage)
+        train_index(index, vectors, len(vectors))
+        index = with_ids(faiss, index)
+        index.add_with_ids(np.ascontiguousarray(vectors, dtype=np.float32), ids.astype(np.int64))
+        
+        path.parent.mkdir(parents=True, exist_ok=True)
+        faiss.write_index(index, str(path.with_suffix(".faiss")))
+        np.save(path.with_suffix(".ids.npy"), ids.astype(np.int64))
+        return cls.open(faiss, path)
+    
+    @classmethod
+    def open(cls, faiss, path: Path, dead: Iterable[int] = ()) -> "ColdShard":
+        """Open a shard written by write(); the index codes are memory-mapped."""
+        flag = getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP)
+        index = faiss.read_index(str(path.with_suffix(".faiss")), flag)
+        ids = np.load(path.with_suffix(".ids.npy"))
+        return cls(path, index, ids, set(dead))
+    
+    def __len__(self) -> int:
+        return len(self.ids) - len(self.dead)
+    
+    @property
+    def size_bytes(self) -> int:
+        return sum(f.stat().st_size for f in self.files if f.exists())
+    
+    def holds(self, ids: np.ndarray) -> np.ndarray:
+        """Mask of the ids that live in this shard."""
+        if not len(self.ids):
+            return np.zeros(len(ids), dtype=bool)
+        positions = np.searchsorted(self.ids, ids)
+        found = self.ids[np.minimum(positions, len(self.ids) - 1)] == ids
+        if self.dead:
+            found &= ~np.isin(ids, np.fromiter(self.dead, dtype=np.int64))
+        return found
+    
+    def live_ids(self) -> np.ndarray:
+        if not self.dead:
+            return self.ids
+        return self.ids[~np.isin(self.ids, np.fromiter(self.dead, dtype=np.int64))]
+    
+    def reconstruct(self, ids: np.ndarray) -> np.ndarray:
+        return self.index.reconstruct_batch(ids.astype(np.int64))
+    
+    def search(self, faiss, queries: np.ndarray, k: int, selector=None):
+        """
+        Search the shard, skipping dead ids.
+        
+        Args:
+            faiss: The imported faiss module
+            queries: Query vectors (n_queries, dimension)
+            k: Hits per query
+            selector: Optional IDSelector restricting the ids searched
+        """
+        dead = len(self.dead)
+        k = min(k + dead, self.index.ntotal)
+        if selector is None:
+            scores, ids = self.index.search(queries, k)
+        else:
+            scores, ids = self.index.search(queries, k, params=search_parameters(faiss, "flat", selector))
+        if dead:
+            skipped = np.isin(ids, np.fromiter(self.dead, dtype=np.int64))
+            scores = np.where(skipped, -np.inf, scores)
+            ids = np.where(skipped, -1, ids)
+        return scores, ids
+
+
+class DocumentAccess:
+    """
+    Last access time per document, and hits on documents in the cold tier.
+    
+    Adding a document or returning one of its chunks counts as an access,
+    so documents that are hit often stay recently used.
+    """
+    
+    def __init__(self, promote_hits: int):
+        """
+        Args:
+            promote_hits: Hits after which a cold document is due for promotion
+        """
+        self.promote_hits = promote_hits
+        self._last: Dict[str, float] = {}
+        self._cold_hits: Dict[str, int] = {}
+        self.cold: Set[str] = set()
+        self._lock = threading.Lock()
+    
+    def touch(self, doc_ids: Iterable[str]) -> bool:
+        """Record an access; returns True if a cold document became due for promotion."""
+        now = time.monotonic()
+        due = False
+        with self._lock:
+            for doc_id in doc_ids:
+                self._last[doc_id] = now
+                if doc_id in self.cold:
+                    self._cold_hits[doc_id] = self._cold_hits.get(doc_id, 0) + 1
+                    due |= self._cold_hits[doc_id] == self.promote_hits
+        return due
+    
+    def forget(self, doc_id: str):
+        with self._lock:
+            self._last.pop(doc_id, None)
+            self._cold_hits.pop(doc_id, None)
+            self.cold.discard(doc_id)
+    
+    def least_recent(self, doc_ids: Iterable[str]) -> List[str]:
+        """Documents in least recently used order (never accessed first)."""
+        with self._lock:
+            return sorted(doc_ids, key=lambda doc_id: self._last.get(doc_id, 0.0))
+    
+    def frequent_cold(self) -> List[str]:
+        """Cold documents due for promotion, most hit first."""
+        with self._lock:
+            hits = [(n, doc_id) for doc_id, n in self._cold_hits.items() if n >= self.promote_hits]
+        return [doc_id for _, doc_id in sorted(hits, reverse=True)]
+    
+    def demoted(self, doc_ids: Iterable[str]):
+        with self._lock:
+            self.cold.update(doc_ids)
+    
+    def promoted(self, doc_ids: Iterable[str]):
+        with self._lock:
+            for doc_id in doc_ids:
+                self.cold.discard(doc_id)
+                self._cold_hits.pop(doc_id, None)
+    
+    def clear(self):
+        with self._lock:
+            self._last.clear()
+            self._cold_hits.clear()
+            self.cold.clear()
+
+
+class TierStats:
+    """Searches, hits served and search latency per tier."""
+    
+    def __init__(self, window: int = 1000):
+        """
+        Args:
+            window: Latencies kept per tier for the percentiles
+        """
+        self._lock = threading.Lock()
+        self._searches = {tier: 0 for tier in TIERS}
+        self._hits = {tier: 0 for tier in TIERS}
+        self._latencies = {tier: deque(maxlen=window) for tier in TIERS}
+    
+    def record(self, tier: str, latency_ms: float, hits: int):
+        with self._lock:
+            self._searches[tier] += 1
+            self._hits[tier] += hits
+            self._latencies[tier].append(latency_ms)
+    
+    def summary(self) -> Dict[str, Any]:
+        """Per tier: searches, hits, share of all hits, and latency (ms)."""
+        with self._lock:
+            total_hits = sum(self._hits.values())
+            summary = {}
+            for tier in TIERS:
+                latencies = np.array(self._latencies[tier])
+                summary[tier] = {
+                    "searches": self._searches[tier],
+                    "hits": self._hits[tier],
+                    "hit_rate": round(self._hits[tier] / total_hits, 3) if total_hits else None,
+                    "latency_ms_p50": round(float(np.percentile(latencies, 50)), 2) if len(latencies) else None,
+                    "latency_ms_p95": round(float(np.percentile(latencies, 95)), 2) if len(latencies) else None
+                }
+            return summary
+
+
+def save_manifest(path: Path, shards: List[ColdShard], cold_documents: Iterable[str]):
+    """Write tiers.json: the shards of a saved store and the documents in the cold tier."""
+    with open(path / "tiers.json", "w") as f:
+        json.dump({
+            "shards": [{"name": shard.name, "dead": sorted(shard.dead)} for shard in shards],
+            "cold_documents": sorted(cold_documents)
+        }, f)
+
+
+def load_manifest(path: Path) -> Dict[str, Any]:
+    if not (path / "tiers.json").exists():
+        return {"shards": [], "cold_documents": []}
+    with open(path / "tiers.json", "r") as f:
+        return json.load(f)
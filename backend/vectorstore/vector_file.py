@@ -0,0 +1,105 @@
+"""
+Healthcare Intelligence Platform - Full-Precision Vector File
+Append-only float32 vectors on disk, read through mmap
+"""
+
+import os
+import mmap
+import shutil
+import numpy as np
+from pathlib import Path
+
+
+def touch_pages(array: np.ndarray) -> int:
+    """
+    Read one value per page of a (memory-mapped) array so later reads are
+    served from the page cache.
+    
+    Returns:
+        Size of the array in bytes
+    """
+    flat = np.asarray(array).reshape(-1)
+    if flat.size == 0:
+        return 0
+    step = max(1, mmap.PAGESIZE // flat.itemsize)
+    flat[::step].sum()
+    return flat.nbytes
+
+
+class VectorFile:
+    """
+    Full-precision float32 copies of the indexed vectors, stored on disk.
+    
+    Row i holds the vector with id i, so a quantized index can keep compact
+    codes in RAM and re-score its shortlist exactly from here. Reads go
+    through a memory map; only the rows being scored are paged in.
+    """
+    
+    def __init__(self, path: str, dimension: int):
+        """
+        Args:
+            path: File path (created if missing)
+            dimension: Vector dimension
+        """
+        self.path = Path(path)
+        self.dimension = dimension
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.path.touch(exist_ok=True)
+        self._map = None
+        self._remap()
+    
+    def __len__(self) -> int:
+        return os.path.getsize(self.path) // (self.dimension * 4)
+    
+    @property
+    def size_bytes(self) -> int:
+        return os.path.getsize(self.path)
+    
+    def _remap(self):
+        n_rows = len(self)
+        self._map = (
+            np.memmap(self.path, dtype=np.float32, mode="r", shape=(n_rows, self.dimension))
+            if n_rows else np.empty((0, self.dimension), dtype=np.float32)
+        )
+    
+    def append(self, vectors: np.ndarray, start: int):
+        """
+        Append vectors whose ids start at `start`.
+        
+        Gaps (ids skipped by the caller) are zero-filled so rows stay aligned
+        with ids.
+        """
+        n_rows = len(self)
+        if start < n_rows:
+            raise ValueError(f"Vector ids must be appended in order (next id {n_rows}, got {start})")
+        
+        with open(self.path, "ab") as f:
+            if start > n_rows:
+                f.write(np.zeros((start - n_rows, self.dimension), dtype=np.float32).tobytes())
+            f.write(np.ascontiguousarray(vectors, dtype=np.float32).tobytes())
+        self._remap()
+    
+    def truncate(self, n_rows: int):
+        """Drop rows from n_rows on (e.g. rows a write-ahead log will replay)."""
+        if n_rows < len(self):
+            os.truncate(self.path, n_rows * self.dimension * 4)
+            self._remap()
+    
+    def mapped_arrays(self) -> list:
+        """The memory map itself (for warming the page cache)."""
+        return [self._map]
+    
+    def get(self, ids: np.ndarray) -> np.ndarray:
+        """Read vectors by id."""
+        return np.asarray(self._map[np.asarray(ids, dtype=np.int64)])
+    
+    def replace(self, target: "VectorFile"):
+        """Move this file over another one's path and keep serving from there."""
+        os.replace(self.path, target.path)
+        self.path = target.path
+        self._remap()
+    
+    def copy_to(self, path: str):
+        """Copy the file (used when saving the store elsewhere)."""
+        if Path(path).resolve() != self.path.resolve():
+            shutil.copyfile(self.path, path)
@@ -0,0 +1,297 @@
+"""
+Healthcare Intelligence Platform - Index Versions
+Versioned store directories with atomic activation and rollback
+"""
+
+import os
+import json
+import shutil
+import tempfile
+import threading
+import time
+import numpy as np
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+from loguru import logger
+
+from .collection_manager import CollectionManager
+from .faiss_store import FAISSStore, snapshot_lsn
+
+
+class StaleVersionError(ValueError):
+    """The live index has changes the version being activated does not contain."""
+
+
+class IndexVersions:
+    """
+    Versioned store directories under FAISS_INDEX_PATH.
+    
+        versions/v0001/     one durable store directory per version
+        versions/v0002/     (snapshot, write-ahead log, version.json)
+        current.json        {"current": "v0002", "previous": "v0001"}
+    
+    A new version is built offline from the current one (e.g. re-embedded
+    with a new model) while the API keeps serving. Activating it loads and
+    warms the new store next to the live one, flips current.json with an
+    atomic rename and swaps the store FAISSStore() returns, so requests
+    move over without downtime. Requests already using the old store finish
+    their searches against it (it is closed once the last one is done), but
+    their writes are rejected, as they would never reach the new version.
+    The previous version is kept for rollback.
+    """
+    
+    POINTER = "current.json"
+    MANIFEST = "version.json"
+    
+    # Only one activation at a time, across instances
+    _swap_lock = threading.Lock()
+    
+    def __init__(self, root: str, keep: int = 3):
+        """
+        Args:
+            root: FAISS_INDEX_PATH
+            keep: Versions to keep on disk (the current and previous one always are)
+        """
+        self.root = Path(root)
+        self.keep = keep
+    
+    @property
+    def versions_dir(self) -> Path:
+        return self.root / "versions"
+    
+    def path(self, version: str) -> Path:
+        path = self.versions_dir / version
+        if path.parent != self.versions_dir or not path.is_dir():
+            raise KeyError(f"Unknown index version: {version}")
+        return path
+    
+    def _pointer(self) -> Dict[str, Optional[str]]:
+        pointer = self.root / self.POINTER
+        if not pointer.exists():
+            return {"current": None, "previous": None}
+        with open(pointer, "r") as f:
+            return json.load(f)
+    
+    def current(self) -> Optional[str]:
+        return self._pointer()["current"]
+    
+    def previous(self) -> Optional[str]:
+        return self._pointer()["previous"]
+    
+    def _set_pointer(self, current: str, previous: Optional[str]):
+        """Point at a version; the rename is atomic, so readers see the old or new pointer."""
+        tmp = self.root / f"{self.POINTER}.tmp"
+        with open(tmp, "w") as f:
+            json.dump({
+                "current": current,
+                "previous": previous,
+                "updated_at": datetime.now().isoformat()
+            }, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.root / self.POINTER)
+    
+    def current_path(self) -> Path:
+        """
+        Directory of the current version, setting up the layout on first use.
+        
+        A store saved directly in FAISS_INDEX_PATH (before versioning) becomes
+        version v0001.
+        """
+        version = self.current()
+        if version is not None:
+            return self.path(version)
+        
+        self.root.mkdir(parents=True, exist_ok=True)
+        legacy = [p for p in self.root.iterdir() if p.name not in ("versions", self.POINTER)]
+        version, path = self.new_version()
+        for entry in legacy:
+            shutil.move(str(entry), str(path / entry.name))
+        if legacy:
+            logger.info(f"Moved the existing vector store into index version {version}")
+        self._set_pointer(version, None)
+        return path
+    
+    def new_version(self) -> tuple:
+        """Create the next (empty) version directory. Returns (version, path)."""
+        self.versions_dir.mkdir(parents=True, exist_ok=True)
+        numbers = [
+            int(p.name[1:]) for p in self.versions_dir.iterdir()
+            if p.is_dir() and p.name.startswith("v") and p.name[1:].isdigit()
+        ]
+        version = f"v{max(numbers, default=0) + 1:04d}"
+        path = self.versions_dir / version
+        path.mkdir()
+        return version, path
+    
+    def manifest(self, version: str) -> Dict[str, Any]:
+        path = self.path(version) / self.MANIFEST
+        if not path.exists():
+            return {}
+        with open(path, "r") as f:
+            return json.load(f)
+    
+    def list_versions(self) -> List[Dict[str, Any]]:
+        if not self.versions_dir.is_dir():
+            return []
+        pointer = self._pointer()
+        return [
+            {
+                "version": p.name,
+                "current": p.name == pointer["current"],
+                "previous": p.name == pointer["previous"],
+                **self.manifest(p.name)
+            }
+            for p in sorted(self.versions_dir.iterdir()) if p.is_dir()
+        ]
+    
+    def build(
+        self,
+        embed: Callable[[List[str]], np.ndarray],
+        source: Optional[str] = None,
+        embedding_model: Optional[str] = None
+    ) -> str:
+        """
+        Write a new version by re-embedding every document of a source version.
+        
+        The source is read from its last checkpoint; changes logged after it
+        are not included (activate() refuses the result while the live store
+        has such changes, unless forced).
+        
+        Args:
+            embed: Embedding function, e.g. EmbeddingService.embed_texts
+            source: Version to rebuild (defaults to the current one)
+            embedding_model: Model name recorded in the manifest
+        
+        Returns:
+            The new version name
+        """
+        source_path = self.path(source) if source else self.current_path()
+        source = source or self.current()
+        version, path = self.new_version()
+        start = time.perf_counter()
+        
+        source_lsn = snapshot_lsn(str(source_path))
+        
+        workdir = Path(tempfile.mkdtemp(prefix="index-build-"))
+        try:
+            reader = FAISSStore(metadata_path=str(workdir / "source.db"))
+            reader.load(str(source_path))
+            # Built in memory and saved once; the new version starts with an empty log
+            writer = FAISSStore(metadata_path=str(workdir / "build.db"))
+            
+            n_documents = n_chunks = 0
+            for doc_id, chunks, metadata in reader.export_documents():
+                writer.add_documents(doc_id, chunks, writer.embed_new_chunks(chunks, embed), metadata)
+                n_documents += 1
+                n_chunks += len(chunks)
+                if n_documents % 1000 == 0:
+                    logger.info(f"🏗️ Re-embedded {n_documents} documents ({n_chunks} chunks)")
+            
+            writer.save(str(path))
+        except Exception:
+            shutil.rmtree(path, ignore_errors=True)
+            raise
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+        
+        with open(path / self.MANIFEST, "w") as f:
+            json.dump({
+                "created_at": datetime.now().isoformat(),
+                "source_version": source,
+                "source_lsn": source_lsn,
+                "embedding_model": embedding_model,
+                "documents": n_documents,
+                "chunks": n_chunks,
+                "build_seconds": round(time.perf_counter() - start, 1)
+            }, f, indent=2)
+        
+        logger.info(f"✅ Built index version {version} from {source} ({n_documents} documents, {n_chunks} chunks)")
+        return version
+    
+    def activate(self, version: str, force: bool = False, warmup: bool = True) -> Dict[str, Any]:
+        """
+        Load a version next to the live store and switch to it atomically.
+        
+        Args:
+            version: Version to activate
+            force: Activate even if the live store has changes the version
+                was built without (they stay in the old version only)
+            warmup: Warm the new store before it takes traffic
+        
+        Returns:
+            Activated and previous version, and load time
+        
+        Raises:
+            KeyError: Unknown version
+            StaleVersionError: The live store changed since the version's source
+                checkpoint (and force is False)
+        """
+        with self._swap_lock:
+            current = self.current()
+            path = self.path(version)
+            if version == current:
+                raise ValueError(f"Index version {version} is already active")
+            
+            live = FAISSStore()
+            manifest = self.manifest(version)
+            if not force:
+                self._check_fresh(version, manifest, current, live.lsn)
+            
+            start = time.perf_counter()
+            store = FAISSStore(metadata_path=str(path / "metadata.work.db"))
+            store.open(str(path))
+            if warmup:
+                store.warmup()
+            
+            # No write may land on the old store between the check and the swap
+            with live.writes_blocked() as lsn:
+                if not force:
+                    try:
+                        self._check_fresh(version, manifest, current, lsn)
+                    except StaleVersionError:
+                        store.close()
+                        raise
+                self._set_pointer(version, current)
+                FAISSStore.install_default(store)
+                live.retire()
+            # Requests already holding the old store finish against it
+            CollectionManager().retire_default(live)
+            elapsed = time.perf_counter() - start
+            logger.info(f"🔀 Activated index version {version} (was {current}, {elapsed:.1f}s)")
+            
+            self.prune()
+            return {"current": version, "previous": current, "seconds": round(elapsed, 2)}
+    
+    @staticmethod
+    def _check_fresh(version: str, manifest: Dict[str, Any], current: Optional[str], lsn: Optional[int]):
+        """Raise StaleVersionError if the live store has changes the version was built without."""
+        missed = 0
+        if manifest.get("source_version") == current and lsn is not None:
+            missed = lsn - manifest.get("source_lsn", 0)
+        if missed > 0:
+            raise StaleVersionError(
+                f"Index version {version} is missing {missed} changes made to {current} "
+                "since it was built; checkpoint and rebuild, or activate with force"
+            )
+    
+    def rollback(self) -> Dict[str, Any]:
+        """Switch back to the previous version (changes made since stay in the newer one)."""
+        previous = self.previous()
+        if previous is None:
+            raise ValueError("No previous index version to roll back to")
+        return self.activate(previous, force=True)
+    
+    def prune(self) -> List[str]:
+        """Delete the oldest versions beyond `keep`, never the current or previous one."""
+        pointer = self._pointer()
+        protected = {pointer["current"], pointer["previous"]}
+        versions = sorted(p.name for p in self.versions_dir.iterdir() if p.is_dir())
+        others = [v for v in versions if v not in protected]
+        removed = others[:max(0, len(versions) - self.keep)]
+        for version in removed:
+            shutil.rmtree(self.versions_dir / version)
+        if removed:
+            logger.info(f"🧹 Removed old index versions: {', '.join(removed)}")
+        return removed
@@ -0,0 +1,143 @@
+"""
+Healthcare Intelligence Platform - Write-Ahead Log
+Append-only durability log for vector store mutations
+"""
+
+import os
+import json
+import struct
+import zlib
+import numpy as np
+from typing import List, Dict, Any, Optional, Iterator
+from pathlib import Path
+from loguru import logger
+
+
+class WriteAheadLog:
+    """
+    Append-only log of vector store mutations.
+    
+    Every add/delete is framed as (payload length, crc32, lsn) + payload and
+    appended before it is applied, so a write costs O(batch) instead of a full
+    snapshot. On startup the records newer than the last checkpoint are
+    replayed on top of the snapshot; a torn record at the tail (crash during
+    append) is detected by its checksum and discarded.
+    """
+    
+    FRAME = struct.Struct("<IIQ")  # payload length, crc32, lsn
+    HEADER_LEN = struct.Struct("<I")
+    
+    def __init__(self, path: str, fsync: bool = True):
+        """
+        Args:
+            path: Log file path
+            fsync: Flush every record to stable storage before returning
+        """
+        self.path = Path(path)
+        self._fsync = fsync
+        self._file = None
+        self._lsn = 0
+    
+    @property
+    def lsn(self) -> int:
+        """Sequence number of the last record written or replayed."""
+        return self._lsn
+    
+    @property
+    def size(self) -> int:
+        """Current log size in bytes."""
+        return self.path.stat().st_size if self.path.exists() else 0
+    
+    def replay(self, after_lsn: int = 0) -> Iterator[Dict[str, Any]]:
+        """
+        Yield logged records newer than after_lsn, in order.
+        
+        Records are dicts with an "op" key ("add", "delete" or "clear"); add
+        records carry their embeddings as a float32 array.
+        """
+        self._lsn = max(self._lsn, after_lsn)
+        if not self.path.exists():
+            return
+        
+        valid_end = 0
+        with open(self.path, "rb") as f:
+            while True:
+                frame = f.read(self.FRAME.size)
+                if len(frame) < self.FRAME.size:
+                    break
+                length, crc, lsn = self.FRAME.unpack(frame)
+                payload = f.read(length)
+                if len(payload) < length or zlib.crc32(payload) != crc:
+                    break
+                
+                valid_end = f.tell()
+                if lsn <= after_lsn:
+                    continue
+                self._lsn = lsn
+                yield self._decode(payload)
+        
+        if valid_end < self.size:
+            logger.warning(f"Discarding torn write-ahead log tail at byte {valid_end}")
+            with open(self.path, "r+b") as f:
+                f.truncate(valid_end)
+    
+    def open(self):
+        """Open the log for appending."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, "ab")
+    
+    def close(self):
+        if self._file:
+            self._file.close()
+            self._file = None
+    
+    def append_add(
+        self,
+        doc_id: str,
+        chunks: List[str],
+        embeddings: np.ndarray,
+        metadata: Optional[Dict] = None
+    ) -> int:
+        """Log an add_documents call. Returns its lsn."""
+        header = {"op": "add", "doc_id": doc_id, "chunks": chunks, "metadata": metadata}
+        return self._append(header, np.ascontiguousarray(embeddings, dtype=np.float32))
+    
+    def append_delete(self, doc_id: str) -> int:
+        """Log a delete_document call. Returns its lsn."""
+        return self._append({"op": "delete", "doc_id": doc_id})
+    
+    def append_clear(self) -> int:
+        """Log a clear call. Returns its lsn."""
+        return self._append({"op": "clear"})
+    
+    def truncate(self):
+        """Drop all records (after a checkpoint has made them redundant)."""
+        self._file.truncate(0)
+        self._file.flush()
+        if self._fsync:
+            os.fsync(self._file.fileno())
+    
+    def _append(self, header: Dict[str, Any], vectors: Optional[np.ndarray] = None) -> int:
+        if vectors is not None:
+            header["shape"] = list(vectors.shape)
+        header_bytes = json.dumps(header).encode("utf-8")
+        payload = self.HEADER_LEN.pack(len(header_bytes)) + header_bytes
+        if vectors is not None:
+            payload += vectors.tobytes()
+        
+        self._lsn += 1
+        self._file.write(self.FRAME.pack(len(payload), zlib.crc32(payload), self._lsn) + payload)
+        self._file.flush()
+        if self._fsync:
+            os.fsync(self._file.fileno())
+        return self._lsn
+    
+    def _decode(self, payload: bytes) -> Dict[str, Any]:
+        (header_len,) = self.HEADER_LEN.unpack_from(payload)
+        start = self.HEADER_LEN.size
+        record = json.loads(payload[start:start + header_len].decode("utf-8"))
+        
+        if "shape" in record:
+            vectors = np.frombuffer(payload, dtype=np.float32, offset=start + header_len)
+            record["embeddings"] = vectors.reshape(record.pop("shape"))
+        return record